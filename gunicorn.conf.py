@@ -0,0 +1,56 @@
+"""Gunicorn deployment profiles; gunicorn picks this file up automatically.
+
+SERVER_PROFILE=asgi (default)
+    ``gunicorn`` runs project1.asgi under uvicorn workers, one event loop per
+    core. The async views (ballot_position, candidate_platform, result,
+    positions, admin_dashboard, the logins) and the live tally stream then
+    wait on the database/cache without holding a worker, so one process can
+    keep thousands of ballot page loads in flight. Use DB_ENGINE=postgres with
+    DB_POOL=1 (Django closes connections after every async request, so without
+    a pool each request opens one) and CACHE_BACKEND=redis to share the cached
+    ballot, sessions and auth lookups across workers.
+    Note that under ASGI Django reads a *sync* StreamingHttpResponse iterator
+    completely into memory before sending it; streaming views must hand it
+    an async iterator (the exports do, via ``ops_app.exports.aiterate``).
+
+SERVER_PROFILE=wsgi
+    Classic threaded workers on project1.wsgi. Async views still work (each
+    runs in its own event loop on the request thread) and live_tallies
+    answers 204.
+
+Equivalent single-process command for development:
+    uvicorn project1.asgi:application --host 0.0.0.0 --port 8000
+"""
+import multiprocessing
+import os
+
+SERVER_PROFILE = os.environ.get("SERVER_PROFILE", "asgi")
+
+bind = os.environ.get("BIND", f"0.0.0.0:{os.environ.get('PORT', '8000')}")
+cores = multiprocessing.cpu_count()
+
+if SERVER_PROFILE == "asgi":
+    wsgi_app = "project1.asgi:application"
+    worker_class = "uvicorn.workers.UvicornWorker"
+    workers = int(os.environ.get("WEB_CONCURRENCY", cores))
+else:
+    wsgi_app = "project1.wsgi:application"
+    worker_class = "gthread"
+    workers = int(os.environ.get("WEB_CONCURRENCY", cores * 2 + 1))
+    threads = int(os.environ.get("GUNICORN_THREADS", "4"))
+
+# Worker heartbeat timeout. Under uvicorn workers it does not cap request length,
+# so live_tallies streams stay open.
+timeout = int(os.environ.get("GUNICORN_TIMEOUT", "60"))
+graceful_timeout = 30
+keepalive = 5
+# Recycle workers now and then so slow leaks cannot build up during an election day.
+max_requests = 10000
+max_requests_jitter = 1000
+
+
+def post_worker_init(worker):
+    """Build the in-memory eligibility index before the worker takes requests."""
+    from ops_app.eligibility import index
+
+    index.warm()
@@ -1,18 +1,39 @@
-from django.contrib import admin
-from .models import Position, Candidate, Voter, Vote
+from django.contrib import admin, messages
+from .elections import ElectionError, close_election
+from .models import Election, Position, Candidate, Voter, Vote
+
+
+@admin.register(Election)
+class ElectionAdmin(admin.ModelAdmin):
+    list_display = ("name", "status", "created_at", "closed_at", "archived_at")
+    list_filter = ("status",)
+    # Status only moves forward through close_election / archive_election.
+    readonly_fields = ("status", "closed_at", "archived_at", "archive_file", "archive_sha256")
+    actions = ["close_elections"]
+
+    @admin.action(description="Close selected elections and freeze their results")
+    def close_elections(self, request, queryset):
+        for election in queryset:
+            try:
+                close_election(election)
+            except ElectionError as e:
+                self.message_user(request, str(e), messages.ERROR)
+            else:
+                self.message_user(request, f"{election.name} closed.", messages.SUCCESS)
 
 
 @admin.register(Position)
 class PositionAdmin(admin.ModelAdmin):
-    list_display = ("description", "maximumvote")
+    list_display = ("description", "election", "maximumvote")
     search_fields = ("description",)
+    list_filter = ("election",)
 
 
 @admin.register(Candidate)
 class CandidateAdmin(admin.ModelAdmin):
     list_display = ("name", "email", "status", "position", "applied_at")
     search_fields = ("firstname", "lastname", "email")
-    list_filter = ("status", "position")
+    list_filter = ("election", "status", "position")
 
     # custom field to display full name
     def name(self, obj):
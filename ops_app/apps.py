@@ -4,4 +4,6 @@ from django.apps import AppConfig
 class OpsAppConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'ops_app'
-   
\ No newline at end of file
+
+    def ready(self):
+        from . import checks, signals  # noqa: F401
@@ -0,0 +1,36 @@
+"""Third-party front-end assets vendored into ``ops_app/static/vendor``.
+
+``manage.py fetch_vendor_assets`` downloads the pinned files below; from then on
+WhiteNoise serves them hashed, precompressed and cached forever. Until they
+have been fetched the ``{% vendor %}`` tag keeps pointing at the CDN copy.
+"""
+from functools import lru_cache
+
+from django.contrib.staticfiles import finders
+from django.templatetags.static import static
+
+VENDOR_ASSETS = {
+    "bootstrap.css": (
+        "vendor/bootstrap/5.3.2/bootstrap.min.css",
+        "https://cdn.jsdelivr.net/npm/bootstrap@5.3.2/dist/css/bootstrap.min.css",
+    ),
+    "bootstrap.js": (
+        "vendor/bootstrap/5.3.2/bootstrap.bundle.min.js",
+        "https://cdn.jsdelivr.net/npm/bootstrap@5.3.2/dist/js/bootstrap.bundle.min.js",
+    ),
+    "chart.js": (
+        "vendor/chart.js/4.4.1/chart.umd.min.js",
+        "https://cdn.jsdelivr.net/npm/chart.js@4.4.1/dist/chart.umd.min.js",
+    ),
+}
+
+
+@lru_cache(maxsize=None)
+def is_vendored(name):
+    return finders.find(VENDOR_ASSETS[name][0]) is not None
+
+
+def vendor_url(name):
+    """Static URL of a vendored asset, or its CDN URL if it was never fetched."""
+    path, cdn_url = VENDOR_ASSETS[name]
+    return static(path) if is_vendored(name) else cdn_url
@@ -0,0 +1,102 @@
+"""Cache-backed user and voter lookups for authenticated requests.
+
+With the default backend every request re-reads its ``auth_user`` row, and the
+voter views each re-query ``Voter`` for that user. Both are cached here for
+``AUTH_CACHE_SECONDS`` and evicted by signals (see ``ops_app.signals``) when the
+row changes; with a per-process cache other workers may lag by up to that TTL.
+Password checks run in the hashing pool (``ops_app.hashing``).
+"""
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.contrib.auth.backends import ModelBackend
+from django.core.cache import cache
+
+from . import hashing
+
+USER_CACHE_PREFIX = "auth_user:"
+VOTER_CACHE_PREFIX = "voter_profile:"
+NO_VOTER = 0  # cached marker for "this user has no Voter row"
+
+
+def cache_seconds():
+    return getattr(settings, "AUTH_CACHE_SECONDS", 60)
+
+
+class CachedModelBackend(ModelBackend):
+    """ModelBackend whose per-request ``get_user`` is served from the cache.
+
+    ``authenticate``/``aauthenticate`` verify passwords in the hashing pool and
+    store the re-encoded hash when the preferred hasher or its cost changed.
+    """
+
+    def authenticate(self, request, username=None, password=None, **kwargs):
+        UserModel = get_user_model()
+        if username is None:
+            username = kwargs.get(UserModel.USERNAME_FIELD)
+        if username is None or password is None:
+            return None
+        try:
+            user = UserModel._default_manager.get_by_natural_key(username)
+        except UserModel.DoesNotExist:
+            user = None
+        try:
+            if user is None:
+                hashing.make_password(password)  # same cost as a real check (Django #20760)
+                return None
+            valid, upgraded = hashing.check_password(password, user.password)
+        except hashing.HashQueueFull:
+            # Sync callers (the admin site's login form) have no busy page to
+            # show; a refused login beats a 500. The async views tell the user.
+            return None
+        if valid and upgraded:
+            user.password = upgraded
+            user.save(update_fields=["password"])
+        return user if valid and self.user_can_authenticate(user) else None
+
+    async def aauthenticate(self, request, username=None, password=None, **kwargs):
+        UserModel = get_user_model()
+        if username is None:
+            username = kwargs.get(UserModel.USERNAME_FIELD)
+        if username is None or password is None:
+            return None
+        try:
+            user = await UserModel._default_manager.aget_by_natural_key(username)
+        except UserModel.DoesNotExist:
+            await hashing.amake_password(password)
+            return None
+        valid, upgraded = await hashing.acheck_password(password, user.password)
+        if valid and upgraded:
+            user.password = upgraded
+            await user.asave(update_fields=["password"])
+        return user if valid and self.user_can_authenticate(user) else None
+
+    def get_user(self, user_id):
+        key = f"{USER_CACHE_PREFIX}{user_id}"
+        user = cache.get(key)
+        if user is None:
+            user = super().get_user(user_id)
+            if user is not None:
+                cache.set(key, user, cache_seconds())
+        return user
+
+
+def forget_user(user_id):
+    cache.delete(f"{USER_CACHE_PREFIX}{user_id}")
+
+
+def voter_profile(user):
+    """The Voter row of ``user`` (or None), cached across requests."""
+    if not user.is_authenticated:
+        return None
+    from .models import Voter
+
+    key = f"{VOTER_CACHE_PREFIX}{user.pk}"
+    voter = cache.get(key)
+    if voter is None:
+        voter = Voter.objects.filter(user=user).first() or NO_VOTER
+        cache.set(key, voter, cache_seconds())
+    return voter or None
+
+
+def forget_voter(user_id):
+    cache.delete(f"{VOTER_CACHE_PREFIX}{user_id}")
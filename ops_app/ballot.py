@@ -0,0 +1,161 @@
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.cache.utils import make_template_fragment_key
+from django.db import IntegrityError, transaction
+from django.db.models import Prefetch
+
+from .eligibility import voted_positions, votes_stored
+from .ingest import store_votes
+from .journal import journal_ballot
+from .models import Candidate, Election, Position, Vote
+
+
+BALLOT_VERSION_KEY = "ballot:version"
+
+
+class BallotError(Exception):
+    """A ballot was rejected; the message is safe to show to the voter."""
+
+
+def parse_ballot(data):
+    """Map ``position_<id>`` form fields to {position_id: [candidate_id, ...]}."""
+    selections = {}
+    for key in data:
+        if not key.startswith("position_"):
+            continue
+        try:
+            position_id = int(key[len("position_"):])
+            candidate_ids = [int(value) for value in data.getlist(key) if value]
+        except ValueError:
+            raise BallotError("Invalid ballot selection.")
+        if candidate_ids:
+            selections[position_id] = candidate_ids
+    return selections
+
+
+def build_ballot(user, selections, election):
+    """Validate ``selections`` for ``election`` and return the unsaved Vote rows for them.
+
+    Every position and its approved candidates come from one prefetched lookup,
+    so validation costs the same two queries however long the ballot is.
+    """
+    if not selections:
+        raise BallotError("Please select at least one candidate.")
+    if election is None or election.status != Election.OPEN:
+        raise BallotError("Voting is closed.")
+
+    positions = {position.id: position for position in ballot_positions(election).filter(id__in=selections)}
+
+    votes = []
+    for position_id, candidate_ids in selections.items():
+        position = positions.get(position_id)
+        if position is None:
+            raise BallotError("Invalid position on ballot.")
+        candidate_ids = list(dict.fromkeys(candidate_ids))
+        if len(candidate_ids) > position.maximumvote:
+            raise BallotError(f"Too many selections for {position.description}.")
+
+        approved = {candidate.id for candidate in position.candidates}
+        for choice, candidate_id in enumerate(candidate_ids):
+            if candidate_id not in approved:
+                raise BallotError(f"Invalid candidate selection for {position.description}.")
+            votes.append(Vote(
+                voter=user, candidate_id=candidate_id, position_id=position_id, election=election, choice=choice,
+            ))
+    return votes
+
+
+def cast_ballot(user, selections, election=None):
+    """Validate and store a whole ballot of ``election`` (default: the current one) atomically; returns the votes.
+
+    All rows go in with one ``bulk_create``. Repeat voters are turned away by
+    the in-memory has-voted index (``ops_app.eligibility``) before any query;
+    otherwise the ``(voter, position, choice)`` unique constraint is the
+    duplicate check, so a retried or concurrent submission fails as a whole
+    instead of racing a check-then-insert.
+
+    With ``VOTE_INGEST_MODE = "journal"`` the ballot is appended to the vote
+    journal instead and the returned votes are unsaved.
+    """
+    if voted_positions(user.pk, selections):
+        raise BallotError("You have already voted for one or more of these positions.")
+    votes = build_ballot(user, selections, election or Election.objects.current())
+    if settings.VOTE_INGEST_MODE == "journal":
+        # Write-behind: the drainer inserts these later, exactly once per
+        # (voter, position); the index check above only turns away repeats
+        # that have already been drained.
+        if not Election.objects.filter(pk=votes[0].election_id, status=Election.OPEN).exists():
+            raise BallotError("Voting is closed.")
+        journal_ballot(user, votes)
+        votes_stored(votes)
+        return votes
+
+    try:
+        with transaction.atomic():
+            # This worker's cached election may predate a close: check the row
+            # itself, and lock it so close_election waits for this ballot.
+            open_election = Election.objects.select_for_update().filter(pk=votes[0].election_id, status=Election.OPEN)
+            if not open_election.values_list("pk", flat=True):
+                raise BallotError("Voting is closed.")
+            store_votes(votes)
+    except IntegrityError:
+        raise BallotError("You have already voted for one or more of these positions.")
+    return votes
+
+
+# ---------------- CACHED BALLOT ----------------
+def ballot_version():
+    """Current ballot version; part of the cache key of the rendered ballot."""
+    version = cache.get(BALLOT_VERSION_KEY)
+    if version is None:
+        # Seed from the clock so a lost key can never reuse an older version.
+        cache.add(BALLOT_VERSION_KEY, time.time_ns(), None)
+        version = cache.get(BALLOT_VERSION_KEY)
+    return version
+
+
+async def aballot_version():
+    version = await cache.aget(BALLOT_VERSION_KEY)
+    if version is None:
+        await cache.aadd(BALLOT_VERSION_KEY, time.time_ns(), None)
+        version = await cache.aget(BALLOT_VERSION_KEY)
+    return version
+
+
+async def ballot_is_cached(version, election):
+    """Whether the ballot fragment of ``election`` at ``version`` is already rendered in the cache."""
+    election_id = election.pk if election else None
+    return await cache.ahas_key(make_template_fragment_key("ballot_positions", [version, election_id]))
+
+
+def ballot_cache_seconds():
+    """How long a rendered ballot may be served before it is rendered again."""
+    return getattr(settings, "BALLOT_CACHE_SECONDS", 24 * 60 * 60)
+
+
+def bump_ballot_version():
+    """Invalidate every cached ballot after a Position, Candidate or Election change.
+
+    With a per-process cache only this process sees the bump; the others
+    serve theirs until ``ballot_cache_seconds`` runs out.
+    """
+    try:
+        cache.incr(BALLOT_VERSION_KEY)
+    except ValueError:
+        cache.set(BALLOT_VERSION_KEY, time.time_ns(), None)
+
+
+def ballot_positions(election):
+    """Positions of ``election`` with their approved candidates, as rendered on the ballot.
+
+    The queryset is lazy: when the ballot fragment is cached it is never run.
+    """
+    return Position.objects.filter(election=election).prefetch_related(
+        Prefetch(
+            "candidate_set",
+            queryset=Candidate.objects.filter(status="Approved"),
+            to_attr="candidates",
+        )
+    )
@@ -0,0 +1,281 @@
+"""Load generator for the voting flow, used by ``manage.py bench_voting``.
+
+Each simulated voter logs in, loads the ballot, submits it and checks the
+results; every tenth voter also has an admin load the dashboard. The "login"
+scenario instead replays only the post-login redirect chain. Latencies
+(and, with the test client, query counts) are recorded per URL name.
+
+Everything is seeded into a dedicated benchmark election, which is never the
+current one, so real voters' ballots are untouched; every request names it
+with ``?election=``. Its rows are deleted when the run ends, leaving only
+the closed Election row, through which the ledger knows the votes went on
+purpose.
+"""
+import http.cookiejar
+import math
+import re
+import threading
+import time
+import urllib.error
+import urllib.parse
+import urllib.request
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+from django.contrib.auth.hashers import make_password
+from django.contrib.auth.models import User
+from django.db import connection, transaction
+from django.test import Client
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+from .models import Candidate, Election, Position, Vote, VoteRollup, Voter
+
+PASSWORD = "bench-password"
+
+
+class BenchmarkRefused(Exception):
+    """The benchmark would run against real data; the message says how to insist."""
+
+
+def seed(positions, candidates, voters):
+    """Create a tagged electorate in a new benchmark election.
+
+    Returns the election, the admin/voter usernames and the ballot.
+    """
+    tag = uuid.uuid4().hex[:8]
+    password = make_password(PASSWORD)  # hashed once, shared by every bench account
+
+    election = Election.objects.create(name=f"Bench {tag}", benchmark=True)
+    election_id = election.pk
+    created = Position.objects.bulk_create(
+        Position(election_id=election_id, description=f"Bench {tag} position {i}") for i in range(positions)
+    )
+    ballot = {}
+    for position in created:
+        people = Candidate.objects.bulk_create(
+            Candidate(firstname=f"Bench{i}", lastname=tag, position=position, election_id=election_id, status="Approved")
+            for i in range(candidates)
+        )
+        ballot[f"position_{position.id}"] = str(people[0].id)
+    ballot["election"] = str(election_id)
+
+    users = User.objects.bulk_create(
+        User(username=f"bench_{tag}_{i}", password=password) for i in range(voters)
+    )
+    Voter.objects.bulk_create(
+        Voter(user=user, firstname="Bench", lastname=str(i), voterid=voterid)
+        for i, (user, voterid) in enumerate(zip(users, Voter.reserve_voterids(len(users))))
+    )
+    admin = User.objects.create(
+        username=f"bench_{tag}_admin", password=password, is_staff=True, is_superuser=True
+    )
+    return election, admin.username, [user.username for user in users], ballot
+
+
+def unseed(election):
+    """Delete what ``seed`` created for ``election`` and close it; the Election row stays for the ledger."""
+    tag = election.name.removeprefix("Bench ")
+    with transaction.atomic():
+        Vote.objects.filter(election=election).delete()
+        Position.objects.filter(election=election).delete()  # candidates and counters go with them
+        VoteRollup.objects.filter(election=election).delete()
+        User.objects.filter(username__startswith=f"bench_{tag}_").delete()  # and their Voter rows
+        Election.objects.filter(pk=election.pk).update(status=Election.CLOSED, closed_at=timezone.now())
+
+
+class ClientDriver:
+    """Drives the views in-process through Django's test client, counting queries."""
+
+    def __init__(self):
+        self.client = Client()
+
+    def request(self, method, path, data=None):
+        with CaptureQueriesContext(connection) as queries:
+            response = getattr(self.client, method)(path, data or {})
+        return response.status_code, len(response.content), len(queries)
+
+    def close(self):
+        connection.close()
+
+
+class HttpDriver:
+    """Drives a running server (e.g. gunicorn) over HTTP; query counts are unavailable."""
+
+    csrf_input = re.compile(rb'name="csrfmiddlewaretoken" value="([^"]+)"')
+
+    def __init__(self, base_url):
+        self.base_url = base_url.rstrip("/")
+        self.cookies = http.cookiejar.CookieJar()
+        self.opener = urllib.request.build_opener(
+            urllib.request.HTTPCookieProcessor(self.cookies), NoRedirect()
+        )
+        self.csrf_token = ""
+
+    def request(self, method, path, data=None):
+        url = self.base_url + path
+        body = None
+        headers = {"Referer": url}
+        if method == "post":
+            body = urllib.parse.urlencode({**(data or {}), "csrfmiddlewaretoken": self.csrf_token}).encode()
+        try:
+            with self.opener.open(urllib.request.Request(url, data=body, headers=headers)) as response:
+                status, content = response.status, response.read()
+        except urllib.error.HTTPError as e:
+            status, content = e.code, e.read()
+        if match := self.csrf_input.search(content):
+            self.csrf_token = match.group(1).decode()
+        return status, len(content), None
+
+    def close(self):
+        pass
+
+
+class NoRedirect(urllib.request.HTTPRedirectHandler):
+    def redirect_request(self, *args, **kwargs):
+        return None
+
+
+def percentile(sorted_values, pct):
+    if not sorted_values:
+        return None
+    # Nearest-rank percentile.
+    index = max(0, math.ceil(pct / 100 * len(sorted_values)) - 1)
+    return sorted_values[index]
+
+
+class Recorder:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.samples = {}
+
+    def add(self, name, seconds, status, size, queries):
+        with self._lock:
+            self.samples.setdefault(name, []).append((seconds, status, size, queries))
+
+    def summary(self, elapsed):
+        views = {}
+        for name, samples in sorted(self.samples.items()):
+            latencies = sorted(s[0] * 1000 for s in samples)
+            queries = [s[3] for s in samples if s[3] is not None]
+            views[name] = {
+                "requests": len(samples),
+                "errors": sum(1 for s in samples if s[1] >= 400),
+                "throughput_rps": round(len(samples) / elapsed, 2) if elapsed else None,
+                "latency_ms": {
+                    "mean": round(sum(latencies) / len(latencies), 3),
+                    "p50": round(percentile(latencies, 50), 3),
+                    "p95": round(percentile(latencies, 95), 3),
+                    "p99": round(percentile(latencies, 99), 3),
+                    "max": round(latencies[-1], 3),
+                },
+                "queries_per_request": {
+                    "mean": round(sum(queries) / len(queries), 2),
+                    "max": max(queries),
+                } if queries else None,
+                "bytes_mean": round(sum(s[2] for s in samples) / len(samples)),
+            }
+        return views
+
+
+def timed(driver, recorder, name, method, path, data=None):
+    started = time.perf_counter()
+    status, size, queries = driver.request(method, path, data)
+    recorder.add(name, time.perf_counter() - started, status, size, queries)
+    return status
+
+
+def in_election(name, ballot):
+    """URL of view ``name`` in the ballot's (benchmark) election."""
+    return f"{reverse(name)}?election={ballot['election']}"
+
+
+def voter_session(make_driver, recorder, username, ballot):
+    driver = make_driver()
+    try:
+        timed(driver, recorder, "voter_login", "get", reverse("voter_login"))
+        timed(driver, recorder, "voter_login", "post", reverse("voter_login"),
+              {"username": username, "password": PASSWORD})
+        timed(driver, recorder, "ballot_position", "get", in_election("ballot_position", ballot))
+        timed(driver, recorder, "submit_vote", "post", in_election("submit_vote", ballot), ballot)
+        timed(driver, recorder, "result", "get", in_election("result", ballot))
+    finally:
+        driver.close()
+
+
+def login_session(make_driver, recorder, username, ballot):
+    """Poll-opening storm: log in and follow the dashboard redirect chain to the ballot."""
+    driver = make_driver()
+    try:
+        timed(driver, recorder, "voter_login", "get", reverse("voter_login"))
+        timed(driver, recorder, "voter_login", "post", reverse("voter_login"),
+              {"username": username, "password": PASSWORD})
+        timed(driver, recorder, "dashboard", "get", reverse("dashboard"))
+        timed(driver, recorder, "voter_dashboard", "get", reverse("voter_dashboard"))
+        timed(driver, recorder, "ballot_position", "get", in_election("ballot_position", ballot))
+    finally:
+        driver.close()
+
+
+SCENARIOS = {"voting": voter_session, "login": login_session}
+
+
+def admin_session(make_driver, recorder, username, ballot):
+    driver = make_driver()
+    try:
+        timed(driver, recorder, "admin_login", "get", reverse("admin_login"))
+        timed(driver, recorder, "admin_login", "post", reverse("admin_login"),
+              {"username": username, "password": PASSWORD})
+        timed(driver, recorder, "admin_dashboard", "get", in_election("admin_dashboard", ballot))
+    finally:
+        driver.close()
+
+
+def run_benchmark(
+    positions=4, candidates=5, voters=100, concurrency=8, base_url=None, scenario="voting", allow_live_data=False,
+):
+    """Seed an electorate, replay ``scenario`` for every voter and return a JSON-ready report.
+
+    "voting" is the full login/ballot/submit/result flow with an admin dashboard
+    load every tenth voter; "login" is just the login redirect chain. Against a
+    server (``base_url``) whose database holds real votes it refuses to run
+    unless ``allow_live_data`` is set.
+    """
+    if base_url and not allow_live_data and Vote.objects.filter(election__benchmark=False).exists():
+        raise BenchmarkRefused("The database already holds real votes; pass --allow-live-data to benchmark it anyway.")
+    election, admin, usernames, ballot = seed(positions, candidates, voters)
+    if base_url:
+        make_driver = lambda: HttpDriver(base_url)  # noqa: E731
+    else:
+        make_driver = ClientDriver
+    recorder = Recorder()
+
+    try:
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=concurrency) as pool:
+            futures = []
+            for i, username in enumerate(usernames):
+                futures.append(pool.submit(SCENARIOS[scenario], make_driver, recorder, username, ballot))
+                if scenario == "voting" and i % 10 == 0:
+                    futures.append(pool.submit(admin_session, make_driver, recorder, admin, ballot))
+            for future in futures:
+                future.result()
+        elapsed = time.perf_counter() - started
+    finally:
+        unseed(election)
+
+    total = sum(len(samples) for samples in recorder.samples.values())
+    return {
+        "params": {
+            "positions": positions,
+            "candidates_per_position": candidates,
+            "voters": voters,
+            "concurrency": concurrency,
+            "scenario": scenario,
+            "target": base_url or "test-client",
+        },
+        "elapsed_s": round(elapsed, 3),
+        "throughput_rps": round(total / elapsed, 2) if elapsed else None,
+        "views": recorder.summary(elapsed),
+    }
@@ -0,0 +1,19 @@
+from django.conf import settings
+from django.core import checks
+
+from .assets import VENDOR_ASSETS, is_vendored
+
+
+@checks.register(checks.Tags.staticfiles, deploy=True)
+def check_vendor_assets(app_configs, **kwargs):
+    """Flag at deploy time vendor assets that still come from the CDN; an error if ``VENDOR_ASSETS_REQUIRED``."""
+    message, check_id = (checks.Error, "ops_app.E001") if settings.VENDOR_ASSETS_REQUIRED else (checks.Warning, "ops_app.W001")
+    return [
+        message(
+            f"{path} has not been vendored, so pages load {name} from {cdn_url}.",
+            hint="Run manage.py fetch_vendor_assets and commit ops_app/static/vendor.",
+            id=check_id,
+        )
+        for name, (path, cdn_url) in VENDOR_ASSETS.items()
+        if not is_vendored(name)
+    ]
@@ -0,0 +1,355 @@
+"""Which election a request is about, its frozen results, and the archive of old ones.
+
+Views work on one election at a time: ``?election=<id>`` (or a posted
+``election`` field) selects it, otherwise the newest open election is used.
+The current election is cached for ``ELECTION_CACHE_SECONDS`` (signals also
+forget it in the process that changes an Election); the vote transaction
+re-checks that the election is open, so a worker's stale copy never lets a
+ballot into a closed election.
+
+``close_election`` stops voting and freezes the final results once: tallies
+recounted from ``Vote``, winners per position (``maximumvote`` seats) and
+turnout, stored as an immutable ``ResultSnapshot`` whose canonical JSON is
+also written to ``ELECTION_ARCHIVE_DIR`` with its SHA-256. From then on every
+results view reads ``final_results``, cached for good after one verified read.
+
+``archive_election`` moves a closed election out of the hot tables: its
+positions, candidates (with final counts) and votes are written to a gzipped
+NDJSON file under ``ELECTION_ARCHIVE_DIR``, the file's SHA-256 is stored on
+the Election, and the rows are deleted. The first line of the file holds the
+election, positions and candidates; every further line is one vote as
+``[voter_id, position_id, candidate_id, created_at]``.
+"""
+import gzip
+import hashlib
+import json
+import os
+import time
+from pathlib import Path
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Count
+from django.http import Http404
+from django.utils import timezone
+
+from .models import Candidate, Election, Position, ResultSnapshot, Vote, Voter
+
+CURRENT_ELECTION_KEY = "election:current"
+NO_ELECTION = 0  # cached marker for "no election is open"
+CHUNK_SIZE = 2000
+
+
+class ElectionError(Exception):
+    """An election operation was refused; the message is safe to show to an admin."""
+
+
+# ---------------- SELECTION ----------------
+def cache_seconds():
+    return getattr(settings, "ELECTION_CACHE_SECONDS", 5)
+
+
+def current_election():
+    """The newest open election (or None), cached for ``ELECTION_CACHE_SECONDS``."""
+    election = cache.get(CURRENT_ELECTION_KEY)
+    if election is None:
+        election = Election.objects.current() or NO_ELECTION
+        cache.set(CURRENT_ELECTION_KEY, election, cache_seconds())
+    return election or None
+
+
+async def acurrent_election():
+    election = await cache.aget(CURRENT_ELECTION_KEY)
+    if election is None:
+        election = await Election.objects.acurrent() or NO_ELECTION
+        await cache.aset(CURRENT_ELECTION_KEY, election, cache_seconds())
+    return election or None
+
+
+def forget_current_election():
+    cache.delete(CURRENT_ELECTION_KEY)
+
+
+def _requested_id(request):
+    value = request.GET.get("election") or (request.POST.get("election") if request.method == "POST" else None)
+    if value is None:
+        return None
+    if not value.isdigit():
+        raise Http404("Unknown election")
+    return int(value)
+
+
+def election_for(request):
+    """The election selected by the request, else the current one (may be None)."""
+    pk = _requested_id(request)
+    current = current_election()
+    if pk is None or (current and current.pk == pk):
+        return current
+    try:
+        return Election.objects.get(pk=pk)
+    except Election.DoesNotExist:
+        raise Http404("Unknown election")
+
+
+async def aelection_for(request):
+    pk = _requested_id(request)
+    current = await acurrent_election()
+    if pk is None or (current and current.pk == pk):
+        return current
+    try:
+        return await Election.objects.aget(pk=pk)
+    except Election.DoesNotExist:
+        raise Http404("Unknown election")
+
+
+def archive_dir():
+    return Path(getattr(settings, "ELECTION_ARCHIVE_DIR", Path(settings.BASE_DIR) / "archives"))
+
+
+# ---------------- FINAL RESULTS ----------------
+def _rank(tally, seats):
+    """Mark the ``seats`` best-placed candidates with votes as winners; flag a tie at the cut."""
+    ranked = sorted(tally["candidates"], key=lambda c: (-c["votes"], c["id"]))
+    winners = [c for c in ranked[:seats] if c["votes"] > 0]
+    for candidate in tally["candidates"]:
+        candidate["winner"] = candidate in winners
+    tally["seats"] = seats
+    tally["winners"] = [{"id": c["id"], "name": c["name"], "votes": c["votes"]} for c in winners]
+    tally["tie"] = len(ranked) > seats and ranked[seats]["votes"] > 0 and ranked[seats]["votes"] == ranked[seats - 1]["votes"]
+
+
+def compute_results(election):
+    """Final tallies, winners and turnout of ``election``, recounted from the Vote table.
+
+    Shaped like ``position_tallies`` plus, per position, ``seats``, ``winners``
+    and ``tie``; ``candidates`` holds the rows of the results page.
+    """
+    counts = dict(
+        Vote.objects.filter(election=election).values_list("candidate_id").annotate(n=Count("id")).order_by()
+    )
+    tallies = {
+        pk: {"id": pk, "position": description, "labels": [], "data": [], "candidates": [], "_seats": max(seats, 1)}
+        for pk, description, seats in Position.objects.filter(election=election)
+        .order_by("pk").values_list("pk", "description", "maximumvote")
+    }
+    rows = []
+    candidates = Candidate.objects.filter(election=election).order_by("pk").values_list(
+        "pk", "position_id", "firstname", "lastname"
+    )
+    for pk, position_id, firstname, lastname in candidates:
+        tally = tallies.get(position_id)
+        if tally is None:
+            continue
+        name = f"{firstname} {lastname}"
+        votes = counts.get(pk, 0)
+        tally["labels"].append(name)
+        tally["data"].append(votes)
+        tally["candidates"].append({"id": pk, "name": name, "votes": votes})
+        rows.append({
+            "id": pk,
+            "firstname": firstname,
+            "lastname": lastname,
+            "position": {"description": tally["position"]},
+            "vote_count": votes,
+        })
+
+    for tally in tallies.values():
+        _rank(tally, tally.pop("_seats"))
+    winners = {c["id"] for tally in tallies.values() for c in tally["winners"]}
+    for row in rows:
+        row["winner"] = row["id"] in winners
+    rows.sort(key=lambda row: (-row["vote_count"], row["id"]))
+
+    voters_voted = Vote.objects.filter(election=election).values("voter").distinct().count()
+    registered = Voter.objects.count()
+    return {
+        "election": {
+            "id": election.pk,
+            "name": election.name,
+            "closed_at": election.closed_at.isoformat() if election.closed_at else None,
+        },
+        "tallies": list(tallies.values()),
+        "candidates": rows,
+        "votes": sum(counts.values()),
+        "voters_voted": voters_voted,
+        "total_voters": User.objects.filter(is_superuser=False).count(),
+        "registered_voters": registered,
+        "turnout_pct": round(100 * voters_voted / registered, 2) if registered else None,
+    }
+
+
+def canonical_json(payload):
+    return json.dumps(payload, sort_keys=True, separators=(",", ":")).encode()
+
+
+def take_snapshot(election):
+    """Compute and store the final results of a closed election; returns the snapshot."""
+    payload = compute_results(election)
+    data = canonical_json(payload)
+    digest = hashlib.sha256(data).hexdigest()
+
+    directory = archive_dir()
+    directory.mkdir(parents=True, exist_ok=True)
+    path = directory / f"election-{election.pk}-results.json"
+    tmp = path.with_name(path.name + ".tmp")
+    tmp.write_bytes(data)
+    os.replace(tmp, path)
+    return ResultSnapshot.objects.create(election=election, payload=payload, sha256=digest, artifact=path.name)
+
+
+def close_election(election):
+    """Stop voting in ``election`` and freeze its final results; returns the snapshot.
+
+    The Election row is locked, which waits for ballots being stored, and
+    marked closed; every ballot transaction re-checks that row, so none is
+    stored afterwards, whatever a worker has cached. In journal mode, requests
+    that passed the open check just before get ``ELECTION_CLOSE_GRACE_SECONDS``
+    to finish writing the journal, which is then drained (the drainer drops
+    anything later) before the votes are counted.
+    """
+    from .journal import drain  # journal -> live -> elections
+
+    with transaction.atomic():
+        election = Election.objects.select_for_update().get(pk=election.pk)
+        if election.status != Election.OPEN:
+            raise ElectionError(f"{election.name} is already {election.status.lower()}.")
+        election.status = Election.CLOSED
+        election.closed_at = timezone.now()
+        election.save()
+
+    if settings.VOTE_INGEST_MODE == "journal":
+        time.sleep(getattr(settings, "ELECTION_CLOSE_GRACE_SECONDS", 2))
+        drain()
+    return take_snapshot(election)
+
+
+def results_key(election):
+    return f"election:{election.pk}:results"
+
+
+def final_results(election):
+    """Frozen results of a closed or archived election (see ``compute_results``), or None.
+
+    Read from the election's ResultSnapshot, checked against its digest, and
+    then cached indefinitely. None while the election is open.
+    """
+    if election is None or election.status == Election.OPEN:
+        return None
+    results = cache.get(results_key(election))
+    if results is None:
+        snapshot = ResultSnapshot.objects.filter(election=election).first()
+        if snapshot is None:
+            return None
+        if hashlib.sha256(canonical_json(snapshot.payload)).hexdigest() != snapshot.sha256:
+            raise ElectionError(f"Result snapshot of {election.name} does not match its checksum.")
+        results = snapshot.payload
+        cache.set(results_key(election), results, None)  # the snapshot never changes
+    return results
+
+
+async def afinal_results(election):
+    if election is None or election.status == Election.OPEN:
+        return None
+    results = await cache.aget(results_key(election))
+    if results is None:
+        results = await sync_to_async(final_results)(election)
+    return results
+
+
+# ---------------- ARCHIVE ----------------
+
+
+def _header(election):
+    positions = list(Position.objects.filter(election=election).order_by("pk").values("id", "description", "maximumvote"))
+    candidates = list(
+        Candidate.objects.filter(election=election)
+        .order_by("pk")
+        .values("id", "position_id", "firstname", "lastname", "status", "vote_counter__votes")
+    )
+    for candidate in candidates:
+        candidate["votes"] = candidate.pop("vote_counter__votes") or 0
+    return {
+        "election": {
+            "id": election.pk,
+            "name": election.name,
+            "created_at": election.created_at.isoformat(),
+            "closed_at": election.closed_at.isoformat() if election.closed_at else None,
+        },
+        "positions": positions,
+        "candidates": candidates,
+        "voters_voted": Vote.objects.filter(election=election).values("voter").distinct().count(),
+    }
+
+
+def _write_archive(election, path):
+    """Write the archive file atomically; returns its SHA-256."""
+    tmp = path.with_name(path.name + ".tmp")
+    with gzip.open(tmp, "wt", encoding="utf-8") as f:
+        f.write(json.dumps(_header(election), separators=(",", ":")) + "\n")
+        votes = Vote.objects.filter(election=election).order_by("pk").values_list(
+            "voter_id", "position_id", "candidate_id", "created_at"
+        )
+        for voter, position, candidate, created_at in votes.iterator(chunk_size=CHUNK_SIZE):
+            f.write(json.dumps([voter, position, candidate, created_at.isoformat() if created_at else None]) + "\n")
+    digest = file_sha256(tmp)
+    os.replace(tmp, path)
+    return digest
+
+
+def file_sha256(path):
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            h.update(block)
+    return h.hexdigest()
+
+
+def archive_election(election):
+    """Move a closed election's rows into its archive file; returns the file path."""
+    if election.status != Election.CLOSED:
+        raise ElectionError(f"{election.name} is {election.status.lower()}; only closed elections can be archived.")
+    if not ResultSnapshot.objects.filter(election=election).exists():
+        take_snapshot(election)  # closed without close_election: freeze the results before the rows go
+
+    directory = archive_dir()
+    directory.mkdir(parents=True, exist_ok=True)
+    path = directory / f"election-{election.pk}.ndjson.gz"
+    digest = _write_archive(election, path)
+
+    with transaction.atomic():
+        # Raw delete: the per-row post_delete counter updates are pointless here,
+        # the counters go with their candidates and positions below.
+        votes = Vote.objects.filter(election=election)
+        votes._raw_delete(votes.db)
+        Candidate.objects.filter(election=election).delete()
+        Position.objects.filter(election=election).delete()
+        election.status = Election.ARCHIVED
+        election.archived_at = timezone.now()
+        election.archive_file = path.name
+        election.archive_sha256 = digest
+        election.save()
+    return path
+
+
+def archive_path(election):
+    return archive_dir() / election.archive_file
+
+
+def read_archive(election):
+    """(header, iterator of vote rows) of an archived election, checksum verified."""
+    path = archive_path(election)
+    if file_sha256(path) != election.archive_sha256:
+        raise ElectionError(f"Archive {path.name} does not match its recorded checksum.")
+    with gzip.open(path, "rt", encoding="utf-8") as f:
+        header = json.loads(f.readline())
+
+    def votes():
+        with gzip.open(path, "rt", encoding="utf-8") as f:
+            f.readline()
+            for line in f:
+                yield json.loads(line)
+
+    return header, votes()
@@ -0,0 +1,171 @@
+"""In-memory eligibility and has-voted index for ballot gating.
+
+One bit per user id records whether the user has a Voter row, and one bit
+array per position records who has voted for it. The index is per process and
+shared by its threads. ``warm`` builds it from Voter and the votes of open
+elections; gunicorn calls it in every worker (``post_worker_init``), anywhere
+else the first lookup does. The vote paths mark committed votes through
+``votes_stored``, and signals on Voter and Vote keep the rest current.
+
+A set bit answers in microseconds, without touching the database. Bits are
+only trusted in the direction that lets a ballot through, where the Vote
+unique constraint still refuses a repeat. A "no" (not a voter, already
+voted) is confirmed against the database before a ballot is refused, and the
+bit is repaired, so rows stored by other processes or by bulk imports are
+picked up on their first use. Deleting a Voter is the one change that leaves
+a stale bit in other processes; it bumps the ``eligibility`` Sequence row, and
+each process reads that generation number at most every
+``ELIGIBILITY_RECHECK_SECONDS`` and rebuilds its index when it has moved. The
+number lives in the database rather than the cache, which may be per process.
+"""
+import threading
+import time
+
+from django.conf import settings
+from django.db import transaction
+
+from .models import Election, Sequence, Vote, Voter
+
+GENERATION_SEQUENCE = "eligibility"
+CHUNK_SIZE = 5000
+
+
+def _test(bits, n):
+    byte = n >> 3
+    return byte < len(bits) and bool(bits[byte] >> (n & 7) & 1)
+
+
+def _set(bits, n):
+    byte = n >> 3
+    if byte >= len(bits):
+        bits.extend(bytes(max(byte + 1, 2 * len(bits)) - len(bits)))  # grow geometrically
+    bits[byte] |= 1 << (n & 7)
+
+
+def _clear(bits, n):
+    byte = n >> 3
+    if byte < len(bits):
+        bits[byte] &= ~(1 << (n & 7)) & 0xFF
+
+
+def generation():
+    """Current value of the generation number bumped by ``voter_deleted``."""
+    return Sequence.objects.filter(name=GENERATION_SEQUENCE).values_list("value", flat=True).first() or 0
+
+
+class VoterIndex:
+    """Bit arrays of registered voters and, per position, of voters who voted.
+
+    Lookups read the arrays without locking; every change happens under
+    ``_lock``. Arrays only grow, and ``warm`` swaps in new ones whole.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._voters = bytearray()
+        self._voted = {}
+        self._generation = None
+        self._checked_at = None
+
+    def warm(self):
+        """(Re)build the index from the database."""
+        current = generation()  # read first: a bump during the load forces another
+        voters = bytearray()
+        voted = {}
+        for user_id in Voter.objects.filter(user__isnull=False).values_list("user_id", flat=True).iterator(CHUNK_SIZE):
+            _set(voters, user_id)
+        pairs = Vote.objects.filter(election__status=Election.OPEN, position__isnull=False).values_list(
+            "voter_id", "position_id"
+        )
+        for voter_id, position_id in pairs.iterator(CHUNK_SIZE):
+            _set(voted.setdefault(position_id, bytearray()), voter_id)
+        with self._lock:
+            self._voters, self._voted = voters, voted
+            self._generation = current
+            self._checked_at = time.monotonic()
+
+    def reset(self):
+        with self._lock:
+            self._voters, self._voted = bytearray(), {}
+            self._generation = self._checked_at = None
+
+    def _fresh(self):
+        """Build the index on first use; rebuild it when another process bumped the generation."""
+        if self._checked_at is None:
+            self.warm()
+            return
+        if time.monotonic() - self._checked_at < getattr(settings, "ELIGIBILITY_RECHECK_SECONDS", 1):
+            return
+        self._checked_at = time.monotonic()
+        if generation() != self._generation:
+            self.warm()
+
+    # ---- lookups ----
+    def is_voter(self, user_id):
+        """Whether ``user_id`` has a Voter row; a miss is checked in the database."""
+        self._fresh()
+        if _test(self._voters, user_id):
+            return True
+        if Voter.objects.filter(user_id=user_id).exists():
+            self.add_voter(user_id)
+            return True
+        return False
+
+    def voted_positions(self, user_id, position_ids):
+        """The ``position_ids`` that ``user_id`` has a Vote for; hits are checked in the database."""
+        self._fresh()
+        hits = [pk for pk in position_ids if _test(self._voted.get(pk, b""), user_id)]
+        if not hits:
+            return set()
+        confirmed = set(
+            Vote.objects.filter(voter_id=user_id, position_id__in=hits).values_list("position_id", flat=True)
+        )
+        stale = [(user_id, pk) for pk in hits if pk not in confirmed]
+        if stale:
+            self.forget_votes(stale)
+        return confirmed
+
+    # ---- updates ----
+    def add_voter(self, user_id):
+        with self._lock:
+            _set(self._voters, user_id)
+
+    def remove_voter(self, user_id):
+        with self._lock:
+            _clear(self._voters, user_id)
+
+    def add_votes(self, pairs):
+        """Mark ``(user_id, position_id)`` pairs as voted."""
+        with self._lock:
+            for user_id, position_id in pairs:
+                if position_id is not None:
+                    _set(self._voted.setdefault(position_id, bytearray()), user_id)
+
+    def forget_votes(self, pairs):
+        with self._lock:
+            for user_id, position_id in pairs:
+                if position_id in self._voted:
+                    _clear(self._voted[position_id], user_id)
+
+
+index = VoterIndex()
+
+
+def is_voter(user):
+    return user.is_authenticated and index.is_voter(user.pk)
+
+
+def voted_positions(user_id, position_ids):
+    return index.voted_positions(user_id, position_ids)
+
+
+def votes_stored(votes):
+    """Mark ``votes`` as voted once the current transaction commits (at once outside one)."""
+    pairs = [(vote.voter_id, vote.position_id) for vote in votes]
+    transaction.on_commit(lambda: index.add_votes(pairs))
+
+
+def voter_deleted(user_id):
+    """Drop ``user_id`` here, and make every other process rebuild its index."""
+    index.remove_voter(user_id)
+    Sequence.objects.reserve(GENERATION_SEQUENCE)
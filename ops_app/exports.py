@@ -0,0 +1,118 @@
+import csv
+import json
+import zlib
+from itertools import islice
+
+from asgiref.sync import sync_to_async
+
+from .models import Position, PositionVoteCount, Vote, Voter
+from .elections import final_results
+from .tally import position_tallies
+
+CHUNK_SIZE = 2000
+FLUSH_BYTES = 64 * 1024
+
+
+def vote_rows(election):
+    yield ("id", "created_at", "position", "candidate_id", "candidate", "voter")
+    rows = Vote.objects.filter(election=election).order_by("pk").values_list(
+        "pk",
+        "created_at",
+        "position__description",
+        "candidate_id",
+        "candidate__firstname",
+        "candidate__lastname",
+        "voter__username",
+    )
+    for pk, created_at, position, candidate_id, first, last, voter in rows.iterator(chunk_size=CHUNK_SIZE):
+        yield (pk, created_at.isoformat() if created_at else None, position, candidate_id, f"{first} {last}", voter)
+
+
+def tally_rows(election):
+    yield ("position", "candidate_id", "candidate", "votes")
+    final = final_results(election)
+    for tally in final["tallies"] if final else position_tallies(election):
+        for candidate in tally["candidates"]:
+            yield (tally["position"], candidate["id"], candidate["name"], candidate["votes"])
+
+
+def turnout_rows(election):
+    yield ("position", "votes", "registered_voters", "turnout_pct")
+    final = final_results(election)
+    if final:
+        registered = final["registered_voters"]
+        per_position = sorted((tally["position"], sum(tally["data"])) for tally in final["tallies"])
+        voted = final["voters_voted"]
+    else:
+        registered = Voter.objects.count()
+        counts = dict(PositionVoteCount.objects.filter(position__election=election).values_list("position_id", "votes"))
+        positions = Position.objects.filter(election=election).order_by("description")
+        per_position = [(description, counts.get(pk, 0)) for pk, description in positions.values_list("pk", "description")]
+        voted = Vote.objects.filter(election=election).values("voter").distinct().count()
+
+    def pct(votes):
+        return round(100 * votes / registered, 2) if registered else None
+
+    for description, votes in per_position:
+        yield (description, votes, registered, pct(votes))
+    yield ("(any position)", voted, registered, pct(voted))
+
+
+DATASETS = {
+    "votes": vote_rows,
+    "tallies": tally_rows,
+    "turnout": turnout_rows,
+}
+
+
+class _Echo:
+    """File-like object whose ``write`` just hands the line back to csv.writer."""
+
+    def write(self, value):
+        return value
+
+
+def encode(rows, fmt):
+    """Encode a header-first row iterator as CSV lines or NDJSON objects."""
+    if fmt == "csv":
+        writer = csv.writer(_Echo())
+        for row in rows:
+            yield writer.writerow(row).encode()
+    else:
+        header = next(rows)
+        for row in rows:
+            yield (json.dumps(dict(zip(header, row)), default=str) + "\n").encode()
+
+
+def gzipped(chunks):
+    """Compress a byte stream on the fly, flushing roughly every ``FLUSH_BYTES``."""
+    compressor = zlib.compressobj(6, zlib.DEFLATED, 31)  # wbits=31: gzip container
+    buffered = []
+    size = 0
+    for chunk in chunks:
+        buffered.append(chunk)
+        size += len(chunk)
+        if size >= FLUSH_BYTES:
+            if out := compressor.compress(b"".join(buffered)):
+                yield out
+            buffered, size = [], 0
+    yield compressor.compress(b"".join(buffered)) + compressor.flush()
+
+
+def export_stream(dataset, election, fmt="csv", gzip=False):
+    """Bytes of ``election``'s ``dataset`` as CSV or NDJSON; memory stays flat however many rows."""
+    chunks = encode(DATASETS[dataset](election), fmt)
+    return gzipped(chunks) if gzip else chunks
+
+
+async def aiterate(chunks, batch=32):
+    """Async iterator over the sync byte iterator ``chunks``, ``batch`` chunks per thread hop.
+
+    Under ASGI Django reads a sync streaming iterator to the end before
+    sending anything; handing it this instead keeps exports streaming. The
+    sync side always runs in the same thread, so its DB cursor stays usable.
+    """
+    pull = sync_to_async(lambda: list(islice(chunks, batch)), thread_sensitive=True)
+    while items := await pull():
+        for item in items:
+            yield item
@@ -1,14 +1,46 @@
 from django import forms
-from .models import Candidate, Position, Voter
+from .models import Candidate, Election, Position, Voter
 
 class CandidateForm(forms.ModelForm):
     class Meta:
         model = Candidate
         fields = ["position", "photo", "firstname", "lastname", "manifesto"]
+
+    def __init__(self, *args, election=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        if election is not None:
+            self.instance.election = election
+        # save() moves the candidate into its position's election, so only offer this one's.
+        election_id = self.instance.election_id or Election.objects.current_id()
+        self.fields["position"].queryset = Position.objects.filter(election_id=election_id)
+
+    def clean(self):
+        # Without a position, save() files the candidate under the open election.
+        cleaned_data = super().clean()
+        if (
+            cleaned_data.get("position") is None
+            and self.instance.election_id is None
+            and Election.objects.current_id() is None
+        ):
+            raise forms.ValidationError("No election is open; choose a position or open an election first.")
+        return cleaned_data
 class PositionForm(forms.ModelForm):
     class Meta:
         model = Position
         fields = ["description", "maximumvote"]
+
+    def __init__(self, *args, election=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        if election is not None:
+            self.instance.election = election
+
+    def clean_description(self):
+        # Unique per election; the election is not a form field, so check it here.
+        description = self.cleaned_data["description"]
+        taken = Position.objects.filter(election_id=self.instance.election_id, description=description)
+        if taken.exclude(pk=self.instance.pk).exists():
+            raise forms.ValidationError("This election already has a position with this description.")
+        return description
 class VoterForm(forms.ModelForm):
     class Meta:
         model = Voter
@@ -0,0 +1,218 @@
+"""Password hashing off the request thread.
+
+PBKDF2/scrypt/Argon2 are deliberately CPU-bound; run inline during a login
+storm they pin every worker and everything else queues behind them. Here each
+verify/encode runs in a bounded process pool (``PASSWORD_HASH_WORKERS``, 0 =
+inline) with at most ``PASSWORD_HASH_QUEUE_LIMIT`` jobs waiting; beyond that
+callers get ``HashQueueFull`` rather than an ever-growing backlog.
+
+``PASSWORD_HASH_PROFILE`` selects the preferred hasher (see settings) and
+``PASSWORD_HASH_COST`` its cost, as calibrated by
+``manage.py calibrate_password_hasher``. Logins re-encode any hash made with
+another algorithm or cost in the same worker round trip.
+"""
+import asyncio
+import math
+import multiprocessing
+import os
+import threading
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+from django.conf import settings
+from django.contrib.auth.hashers import (
+    Argon2PasswordHasher,
+    PBKDF2PasswordHasher,
+    ScryptPasswordHasher,
+    get_hasher,
+    get_hashers,
+)
+from django.utils.module_loading import import_string
+
+
+class HashQueueFull(Exception):
+    """Too many hashing jobs are already queued; the caller should retry later."""
+
+
+def _cost(default):
+    return getattr(settings, "PASSWORD_HASH_COST", None) or default
+
+
+class CalibratedPBKDF2PasswordHasher(PBKDF2PasswordHasher):
+    """PBKDF2-SHA256 with ``PASSWORD_HASH_COST`` iterations."""
+
+    @property
+    def iterations(self):
+        return _cost(PBKDF2PasswordHasher.iterations)
+
+
+class CalibratedScryptPasswordHasher(ScryptPasswordHasher):
+    """scrypt with a work factor of 2 ** ``PASSWORD_HASH_COST``."""
+
+    @property
+    def work_factor(self):
+        return 2 ** _cost(int(math.log2(ScryptPasswordHasher.work_factor)))
+
+    @property
+    def maxmem(self):
+        # scrypt needs 128 * n * r bytes; OpenSSL's 32 MiB default is too small past n=2**14.
+        return 2 * 128 * self.work_factor * self.block_size
+
+
+class CalibratedArgon2PasswordHasher(Argon2PasswordHasher):
+    """Argon2id with ``PASSWORD_HASH_COST`` passes over 100 MiB (needs argon2-cffi)."""
+
+    @property
+    def time_cost(self):
+        return _cost(Argon2PasswordHasher.time_cost)
+
+
+# ---------------- worker side ----------------
+def _hashers(paths):
+    return [import_string(path)() for path in paths]
+
+
+def _check(password, encoded, paths):
+    """(valid, new_encoded); ``new_encoded`` is set when the stored hash is outdated."""
+    hashers = _hashers(paths)
+    preferred = hashers[0]
+    algorithm = (encoded or "").split("$", 1)[0]
+    hasher = next((h for h in hashers if h.algorithm == algorithm), None)
+    if password is None or hasher is None:
+        return False, None
+    if not hasher.verify(password, encoded):
+        return False, None
+    if hasher.algorithm != preferred.algorithm or preferred.must_update(encoded):
+        return True, preferred.encode(password, preferred.salt())
+    return True, None
+
+
+def _make(password, paths):
+    hasher = _hashers(paths)[0]
+    return hasher.encode(password, hasher.salt())
+
+
+# ---------------- caller side ----------------
+class HashMetrics:
+    """Queue depth and latency of hashing jobs in this process."""
+
+    def __init__(self, window=1000):
+        self._lock = threading.Lock()
+        self.in_flight = 0
+        self.peak = 0
+        self.completed = 0
+        self.rejected = 0
+        self._latencies = deque(maxlen=window)
+
+    def admit(self, limit):
+        with self._lock:
+            if limit is not None and self.in_flight >= limit:
+                self.rejected += 1
+                raise HashQueueFull(f"{self.in_flight} password hashes already queued")
+            self.in_flight += 1
+            self.peak = max(self.peak, self.in_flight)
+
+    def done(self, kind, seconds):
+        with self._lock:
+            self.in_flight -= 1
+            self.completed += 1
+            self._latencies.append((kind, seconds * 1000))
+
+    def snapshot(self):
+        with self._lock:
+            samples = list(self._latencies)
+            report = {
+                "queue_depth": self.in_flight,
+                "peak_queue_depth": self.peak,
+                "completed": self.completed,
+                "rejected": self.rejected,
+                "workers": _worker_count(),
+            }
+        for kind in ("check", "make"):
+            values = sorted(ms for k, ms in samples if k == kind)
+            if values:
+                report[f"{kind}_ms"] = {
+                    "p50": round(values[max(0, math.ceil(len(values) / 2) - 1)], 3),
+                    "p95": round(values[max(0, math.ceil(0.95 * len(values)) - 1)], 3),
+                    "max": round(values[-1], 3),
+                }
+        return report
+
+
+metrics = HashMetrics()
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def _worker_count():
+    return getattr(settings, "PASSWORD_HASH_WORKERS", os.cpu_count() or 1)
+
+
+def _executor():
+    global _pool
+    if _worker_count() == 0:
+        return None
+    with _pool_lock:
+        if _pool is None:
+            # spawn, not fork: the parent has live DB connections and helper threads.
+            _pool = ProcessPoolExecutor(_worker_count(), mp_context=multiprocessing.get_context("spawn"))
+        return _pool
+
+
+def shutdown_pool():
+    global _pool
+    with _pool_lock:
+        if _pool is not None:
+            _pool.shutdown()
+            _pool = None
+
+
+def _hasher_paths():
+    # Resolved here rather than in the worker, so the worker needs no settings.
+    get_hasher()  # raises early for an unusable preferred hasher (e.g. argon2 not installed)
+    return [f"{type(h).__module__}.{type(h).__qualname__}" for h in get_hashers()]
+
+
+def _limit():
+    return getattr(settings, "PASSWORD_HASH_QUEUE_LIMIT", None)
+
+
+def _run(kind, fn, *args):
+    metrics.admit(_limit())
+    started = time.perf_counter()
+    try:
+        pool = _executor()
+        return fn(*args) if pool is None else pool.submit(fn, *args).result()
+    finally:
+        metrics.done(kind, time.perf_counter() - started)
+
+
+async def _arun(kind, fn, *args):
+    metrics.admit(_limit())
+    started = time.perf_counter()
+    try:
+        pool = _executor()
+        if pool is None:
+            return fn(*args)
+        return await asyncio.get_running_loop().run_in_executor(pool, fn, *args)
+    finally:
+        metrics.done(kind, time.perf_counter() - started)
+
+
+def check_password(password, encoded):
+    """(valid, upgraded_hash_or_None), computed in the hashing pool."""
+    return _run("check", _check, password, encoded, _hasher_paths())
+
+
+async def acheck_password(password, encoded):
+    return await _arun("check", _check, password, encoded, _hasher_paths())
+
+
+def make_password(password):
+    return _run("make", _make, password, _hasher_paths())
+
+
+async def amake_password(password):
+    return await _arun("make", _make, password, _hasher_paths())
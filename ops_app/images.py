@@ -0,0 +1,132 @@
+"""Upload-time image pipeline for candidate and voter photos.
+
+Uploads are stored under a content hash, so re-uploading the same picture
+reuses the existing file instead of writing ``p1_5d3FtIP.jpg`` copies. Once the
+row is committed, square thumbnails (``THUMBNAIL_SIZES``) are rendered by a
+small worker pool and written next to the original as
+``<name>.<size>.<webp|jpg>``; templates link those via the ``thumbnail`` filter.
+"""
+import hashlib
+import logging
+import os
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from io import BytesIO
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from PIL import Image, ImageOps, features
+
+logger = logging.getLogger(__name__)
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def thumbnail_sizes():
+    return tuple(sorted(getattr(settings, "THUMBNAIL_SIZES", (128, 256))))
+
+
+def thumbnail_format():
+    fmt = getattr(settings, "THUMBNAIL_FORMAT", "WEBP").upper()
+    if fmt == "WEBP" and not features.check("webp"):
+        return "JPEG"
+    return fmt
+
+
+def thumbnail_name(name, size):
+    extension = "webp" if thumbnail_format() == "WEBP" else "jpg"
+    return f"{name}.{size}.{extension}"
+
+
+def content_hash(file):
+    digest = hashlib.sha256()
+    file.seek(0)
+    for chunk in file.chunks():
+        digest.update(chunk)
+    file.seek(0)
+    return digest.hexdigest()
+
+
+def dedupe_upload(instance, field_file):
+    """Name a pending upload after its content; reuse the stored file if it exists.
+
+    Returns True when ``field_file`` holds a new upload (thumbnails are needed).
+    """
+    if not field_file or field_file._committed:
+        return False
+    extension = os.path.splitext(field_file.name)[1].lower()
+    name = field_file.field.generate_filename(instance, content_hash(field_file.file)[:32] + extension)
+    if field_file.storage.exists(name):
+        field_file.name = name
+        field_file._committed = True
+    else:
+        field_file.name = os.path.basename(name)  # upload_to is applied again on save
+    return True
+
+
+def render_thumbnail(image, size, fmt):
+    thumb = ImageOps.fit(image, (size, size), Image.Resampling.LANCZOS)
+    if fmt == "JPEG" and thumb.mode != "RGB":
+        thumb = thumb.convert("RGB")
+    buffer = BytesIO()
+    thumb.save(buffer, fmt, quality=80)
+    return buffer.getvalue()
+
+
+def generate_thumbnails(storage, name):
+    """Write any missing thumbnails of ``name``; returns the thumbnail names."""
+    fmt = thumbnail_format()
+    missing = [size for size in thumbnail_sizes() if not storage.exists(thumbnail_name(name, size))]
+    if missing:
+        with storage.open(name) as original:
+            image = ImageOps.exif_transpose(Image.open(original))
+            image.load()
+        for size in missing:
+            target = thumbnail_name(name, size)
+            saved = storage.save(target, ContentFile(render_thumbnail(image, size, fmt)))
+            if saved != target:  # another worker got there first
+                storage.delete(saved)
+    return [thumbnail_name(name, size) for size in thumbnail_sizes()]
+
+
+def _generate_logged(storage, name):
+    try:
+        return generate_thumbnails(storage, name)
+    except Exception:
+        logger.exception("Could not build thumbnails for %s", name)
+        raise
+
+
+def schedule_thumbnails(field_file):
+    """Queue thumbnail generation off the request thread.
+
+    ``THUMBNAIL_WORKERS = 0`` runs it inline, which tests and one-off scripts use.
+    """
+    storage, name = field_file.storage, field_file.name
+    workers = getattr(settings, "THUMBNAIL_WORKERS", 2)
+    if workers == 0:
+        future = Future()
+        try:
+            future.set_result(_generate_logged(storage, name))
+        except Exception as e:
+            future.set_exception(e)
+        return future
+
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="thumbnails")
+    return _pool.submit(_generate_logged, storage, name)
+
+
+def thumbnail_url(field_file, size):
+    """URL of the smallest thumbnail at least ``size`` px wide, else the original's."""
+    if not field_file:
+        return ""
+    sizes = thumbnail_sizes()
+    chosen = next((s for s in sizes if s >= size), sizes[-1])
+    name = thumbnail_name(field_file.name, chosen)
+    if field_file.storage.exists(name):
+        return field_file.storage.url(name)
+    return field_file.url
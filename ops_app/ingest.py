@@ -0,0 +1,37 @@
+"""The one place votes are stored.
+
+Every insert path (``cast_ballot``, the journal drainer) goes through
+``store_votes``, so the counters, the ledger, the rollups, the eligibility
+index and the live feed all see the same rows.
+"""
+from django.db import transaction
+
+from .eligibility import votes_stored
+from .ledger import append_votes
+from .live import publish_counts
+from .models import Vote
+from .rollups import add_votes as add_to_rollups
+from .tally import increment_counters
+
+
+def store_votes(votes):
+    """Insert unsaved ``votes`` and everything derived from them; returns the votes.
+
+    Must run inside the caller's transaction; a duplicate (voter, position)
+    raises ``IntegrityError`` and nothing is kept.
+    """
+    Vote.objects.bulk_create(votes)
+    increment_counters(votes)
+    append_votes(votes)
+    add_to_rollups(votes)
+    votes_stored(votes)
+    publish_counts({vote.candidate_id for vote in votes})
+    return votes
+
+
+def record_vote(voter, candidate):
+    """Store a single Vote of ``voter`` for ``candidate`` atomically."""
+    vote = Vote(voter=voter, candidate=candidate, position_id=candidate.position_id, election_id=candidate.election_id)
+    with transaction.atomic():
+        store_votes([vote])
+    return vote
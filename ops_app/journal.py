@@ -0,0 +1,271 @@
+import fcntl
+import json
+import logging
+import os
+import threading
+import time
+from pathlib import Path
+
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.utils import timezone
+
+from .ingest import store_votes
+from .models import Candidate, Election, Vote
+
+logger = logging.getLogger(__name__)
+
+
+class _Batch:
+    """Lines that go out in one write; ``error`` is set if they never made it."""
+
+    def __init__(self):
+        self.lines = []
+        self.done = False
+        self.error = None
+
+
+class VoteJournal:
+    """Append-only ballot journal with group commit.
+
+    ``append`` blocks until its record is on disk, but concurrent appends that
+    arrive within ``batch_window`` seconds share one write and one fsync. The
+    file is opened ``O_APPEND`` and each batch goes out in a single write, so
+    several worker processes can share one journal.
+
+    A failed write or fsync is retried ``write_attempts`` times, reopening the
+    file with a growing pause in between; only the appends of a batch that
+    still fails get the error. A retry may repeat records or leave a torn
+    line, both of which the drainer already takes in its stride.
+    """
+
+    def __init__(self, path, batch_window=0.005, write_attempts=3, retry_delay=0.05):
+        self.path = Path(path)
+        self.batch_window = batch_window
+        self.write_attempts = write_attempts
+        self.retry_delay = retry_delay
+        self._cond = threading.Condition()
+        self._batch = None
+        self._fd = None
+        self._thread = None
+
+    def append(self, record):
+        line = json.dumps(record, separators=(",", ":")) + "\n"
+        with self._cond:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._flush_forever, name="vote-journal", daemon=True)
+                self._thread.start()
+            if self._batch is None:
+                self._batch = _Batch()
+            batch = self._batch
+            batch.lines.append(line.encode())
+            self._cond.notify_all()
+            while not batch.done:
+                self._cond.wait()
+        if batch.error is not None:
+            raise batch.error
+
+    def _open(self):
+        fd = os.open(self.path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o640)
+        # A crash mid-write can leave a torn last line; terminate it so the next
+        # record starts on a line of its own (the drainer skips the fragment).
+        if os.fstat(fd).st_size:
+            with open(self.path, "rb") as f:
+                f.seek(-1, os.SEEK_END)
+                if f.read(1) != b"\n":
+                    os.write(fd, b"\n")
+        return fd
+
+    def _write(self, data):
+        """Write and fsync ``data``, reopening and retrying on failure; returns the last error, or None."""
+        error = None
+        for attempt in range(self.write_attempts):
+            if attempt:
+                time.sleep(self.retry_delay * 2 ** (attempt - 1))
+            try:
+                if self._fd is None:
+                    self._fd = self._open()
+                os.write(self._fd, data)
+                os.fsync(self._fd)
+                return None
+            except OSError as e:
+                logger.exception("Vote journal write failed (attempt %d of %d)", attempt + 1, self.write_attempts)
+                error = e
+                if self._fd is not None:
+                    try:
+                        os.close(self._fd)
+                    except OSError:
+                        pass
+                    self._fd = None
+        return error
+
+    def _flush_forever(self):
+        while True:
+            with self._cond:
+                while self._batch is None:
+                    self._cond.wait()
+            time.sleep(self.batch_window)  # let concurrent appends join this batch
+            with self._cond:
+                batch, self._batch = self._batch, None
+            error = self._write(b"".join(batch.lines))
+            with self._cond:
+                batch.error = error
+                batch.done = True
+                self._cond.notify_all()
+
+
+_journal = None
+_journal_lock = threading.Lock()
+
+
+def get_journal():
+    """The process-wide journal for ``settings.VOTE_JOURNAL_PATH``."""
+    global _journal
+    with _journal_lock:
+        if _journal is None or _journal.path != Path(settings.VOTE_JOURNAL_PATH):
+            _journal = VoteJournal(settings.VOTE_JOURNAL_PATH, settings.VOTE_JOURNAL_BATCH_MS / 1000)
+        return _journal
+
+
+def journal_ballot(user, votes):
+    """Durably record an accepted ballot for the drainer to insert later."""
+    get_journal().append({
+        "voter": user.pk,
+        "votes": [[vote.position_id, vote.candidate_id] for vote in votes],
+        "at": timezone.now().isoformat(),
+    })
+
+
+# ---------------- DRAINING ----------------
+def _offset_path(path):
+    return Path(f"{path}.offset")
+
+
+def read_offset(path):
+    try:
+        return int(_offset_path(path).read_text())
+    except FileNotFoundError:
+        return 0
+
+
+def write_offset(path, offset):
+    target = _offset_path(path)
+    tmp = target.with_name(target.name + ".tmp")
+    tmp.write_text(str(offset))
+    os.replace(tmp, target)
+
+
+def read_records(path, offset, limit):
+    """Up to ``limit`` complete records after ``offset``; returns (records, new offset)."""
+    records = []
+    with open(path, "rb") as f:
+        f.seek(offset)
+        while len(records) < limit:
+            line = f.readline()
+            if not line.endswith(b"\n"):
+                break  # still being written (or empty): pick it up next time
+            offset += len(line)
+            try:
+                records.append(json.loads(line))
+            except ValueError:
+                logger.error("Skipping torn vote journal line at byte %d", offset - len(line))
+    return records, offset
+
+
+def store_records(records):
+    """Insert the votes in ``records`` exactly once per (voter, position).
+
+    Pairs that already have a Vote (a replay after a crash, or a voter who was
+    journaled twice) are skipped, so draining the same records again is a no-op;
+    the first record of a pair brings all its choices. Votes for candidates
+    that are gone or whose election is no longer open are dropped.
+
+    The elections' rows are locked first, as ``cast_ballot`` does, so no vote
+    can land between the check for existing pairs and the insert. Should a
+    pair still conflict, the batch is stored pair by pair and the conflicting
+    ones are skipped: one bad record never holds up the drain.
+    """
+    pairs = {}
+    for record in records:
+        choices = {}
+        for position_id, candidate_id in record["votes"]:
+            choices.setdefault((record["voter"], position_id), []).append(candidate_id)
+        for pair, candidate_ids in choices.items():
+            pairs.setdefault(pair, candidate_ids)
+    if not pairs:
+        return []
+
+    with transaction.atomic():
+        candidates = {candidate for candidate_ids in pairs.values() for candidate in candidate_ids}
+        live_candidates = dict(
+            Candidate.objects.filter(id__in=candidates, election__status=Election.OPEN)
+            .values_list("id", "election_id")
+        )
+        still_open = set(
+            Election.objects.select_for_update()
+            .filter(pk__in=set(live_candidates.values()), status=Election.OPEN)
+            .values_list("pk", flat=True)
+        )
+        live_candidates = {pk: election for pk, election in live_candidates.items() if election in still_open}
+        voters = {voter for voter, _ in pairs}
+        positions = {position for _, position in pairs}
+        existing = set(
+            Vote.objects.filter(voter_id__in=voters, position_id__in=positions).values_list("voter_id", "position_id")
+        )
+        votes = [
+            Vote(
+                voter_id=voter, position_id=position, candidate_id=candidate,
+                election_id=live_candidates[candidate], choice=choice,
+            )
+            for (voter, position), candidate_ids in pairs.items()
+            if (voter, position) not in existing
+            for choice, candidate in enumerate(c for c in candidate_ids if c in live_candidates)
+        ]
+        dropped = sum(1 for candidate_ids in pairs.values() for c in candidate_ids if c not in live_candidates)
+        if dropped:
+            logger.warning("Dropped %d journaled votes for removed candidates or closed elections", dropped)
+        try:
+            with transaction.atomic():
+                return store_votes(votes)
+        except IntegrityError:
+            return _store_pair_by_pair(votes)
+
+
+def _store_pair_by_pair(votes):
+    """``store_votes`` per (voter, position), skipping the pairs that conflict."""
+    by_pair = {}
+    for vote in votes:
+        vote.pk = None  # the failed bulk insert may have assigned some
+        by_pair.setdefault((vote.voter_id, vote.position_id), []).append(vote)
+    stored = []
+    for pair, pair_votes in by_pair.items():
+        try:
+            with transaction.atomic():
+                stored += store_votes(pair_votes)
+        except IntegrityError:
+            logger.warning("Skipped journaled vote of voter %d for position %s: already stored", *pair)
+    return stored
+
+
+def drain(path=None, batch_size=500):
+    """Move every complete journal record into Vote rows; returns the votes stored.
+
+    The offset checkpoint is advanced only after each batch commits, so a crash
+    at any point replays from the last committed batch. A lock file keeps
+    concurrent drainers from interleaving.
+    """
+    path = Path(path or settings.VOTE_JOURNAL_PATH)
+    if not path.exists():
+        return 0
+
+    stored = 0
+    with open(f"{path}.lock", "w") as lock:
+        fcntl.flock(lock, fcntl.LOCK_EX)
+        offset = read_offset(path)
+        while True:
+            records, new_offset = read_records(path, offset, batch_size)
+            if new_offset == offset:
+                return stored
+            stored += len(store_records(records))
+            write_offset(path, new_offset)
+            offset = new_offset
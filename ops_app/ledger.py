@@ -0,0 +1,262 @@
+"""Tamper-evident, hash-chained ledger of committed votes.
+
+Every vote is appended to ``LedgerEntry`` in the transaction that inserts it.
+Each entry hashes the vote's fields (the leaf) together with the previous
+entry's hash, so changing, removing or reordering any entry breaks every hash
+after it. Appends take the ``ledger`` Sequence row lock, which also numbers the
+entries; ballots therefore commit one at a time while appending, much like the
+shared vote counters they already bump.
+
+``verify`` checks the ledger in segments of ``LEDGER_SEGMENT_SIZE`` entries.
+Each segment is rehashed from the chain hash before it, its entries are
+compared with the current Vote rows, and its Merkle root is computed. A
+segment that passes is stored as a ``LedgerCheckpoint``. By default only
+entries after the last checkpoint are rehashed, and the checkpointed ones are
+compared with the Vote table in a single anti-join in the database, so an
+edited or deleted old vote is still caught; ``full=True`` also rehashes every
+checkpointed segment against its stored root. Segments are independent, so
+they are hashed in parallel in a process pool.
+"""
+import hashlib
+import multiprocessing
+import os
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timezone
+
+import django
+from django.conf import settings
+from django.db import transaction
+from django.db.models import BigIntegerField, DateTimeField, Exists, OuterRef, Q, Value
+from django.db.models.functions import Coalesce
+
+from .models import Election, LedgerCheckpoint, LedgerEntry, Sequence, Vote
+
+LEDGER_SEQUENCE = "ledger"
+GENESIS = "0" * 64
+FIELDS = ("vote_id", "election_id", "voter_id", "position_id", "candidate_id", "created_at")
+
+
+# ---------------- HASHING ----------------
+def record(vote_id, election_id, voter_id, position_id, candidate_id, created_at):
+    """Canonical bytes of one vote; ``created_at`` is an aware datetime or None."""
+    stamp = created_at.isoformat() if created_at else ""
+    return f"{vote_id}|{election_id}|{voter_id}|{position_id or ''}|{candidate_id}|{stamp}".encode()
+
+
+def leaf_hash(data):
+    return hashlib.sha256(b"\x00" + data).digest()
+
+
+def chain(prev_hex, leaf):
+    return hashlib.sha256(bytes.fromhex(prev_hex) + leaf).hexdigest()
+
+
+def merkle_root(leaves):
+    """RFC 6962-style root: interior nodes are sha256(0x01 | left | right); an odd node is promoted."""
+    if not leaves:
+        return hashlib.sha256(b"").hexdigest()
+    level = list(leaves)
+    while len(level) > 1:
+        paired = [hashlib.sha256(b"\x01" + level[i] + level[i + 1]).digest() for i in range(0, len(level) - 1, 2)]
+        if len(level) % 2:
+            paired.append(level[-1])
+        level = paired
+    return level[0].hex()
+
+
+# ---------------- APPENDING ----------------
+def append_votes(votes):
+    """Append saved ``votes`` to the ledger; call inside the transaction that inserted them."""
+    votes = [vote for vote in votes if vote.pk is not None]
+    if not votes:
+        return []
+    with transaction.atomic():
+        seqs = Sequence.objects.reserve(LEDGER_SEQUENCE, len(votes))  # holds the ledger lock until commit
+        prev = LedgerEntry.objects.filter(seq__lt=seqs[0]).order_by("-seq").values_list("entry_hash", flat=True).first()
+        prev = prev or GENESIS
+        entries = []
+        for seq, vote in zip(seqs, votes):
+            fields = (vote.pk, vote.election_id, vote.voter_id, vote.position_id, vote.candidate_id, vote.created_at)
+            prev = chain(prev, leaf_hash(record(*fields)))
+            entries.append(LedgerEntry(seq=seq, **dict(zip(FIELDS, fields)), entry_hash=prev))
+        return LedgerEntry.objects.bulk_create(entries)
+
+
+def unledgered_votes():
+    """Votes with no ledger entry: inserted around the application, or before the ledger existed."""
+    return Vote.objects.filter(~Exists(LedgerEntry.objects.filter(vote_id=OuterRef("pk")))).order_by("pk")
+
+
+# ---------------- VERIFYING ----------------
+def check_segment(start_hash, rows):
+    """Verify one segment; runs in a worker process.
+
+    ``rows`` holds ``(seq, fields, entry_hash, current)`` per entry, where
+    ``current`` is the Vote row's fields now, None if it is gone, or True when
+    the vote is not expected in the Vote table (archived and finished benchmark elections).
+    Returns (chain hash at the end, Merkle root, [(seq, problem), ...]).
+    """
+    prev = start_hash
+    leaves = []
+    problems = []
+    for seq, fields, entry_hash, current in rows:
+        leaf = leaf_hash(record(*fields))
+        leaves.append(leaf)
+        prev = chain(prev, leaf)
+        if prev != entry_hash:
+            problems.append((seq, "hash chain broken"))
+            prev = entry_hash  # report each break once, not every entry after it
+        if current is None:
+            problems.append((seq, f"vote {fields[0]} deleted"))
+        elif current is not True and current != fields:
+            problems.append((seq, f"vote {fields[0]} modified"))
+    return prev, merkle_root(leaves), problems
+
+
+def _segment_rows(first_seq, last_seq, archived):
+    entries = list(
+        LedgerEntry.objects.filter(seq__gte=first_seq, seq__lte=last_seq)
+        .order_by("seq")
+        .values_list("seq", *FIELDS, "entry_hash")
+    )
+    vote_ids = [entry[1] for entry in entries]
+    current = {
+        row[0]: row
+        for row in Vote.objects.filter(pk__in=vote_ids).values_list(
+            "pk", "election_id", "voter_id", "position_id", "candidate_id", "created_at"
+        )
+    }
+    rows = []
+    for seq, *fields, entry_hash in entries:
+        fields = tuple(fields)
+        now = True if fields[1] in archived else current.get(fields[0])
+        rows.append((seq, fields, entry_hash, now))
+    return rows
+
+
+def _changed_votes(last_seq, archived):
+    """(seq, vote_id, Vote row still there) of entries up to ``last_seq`` whose Vote row no longer matches.
+
+    The comparison runs in the database, so checkpointed segments are covered
+    without fetching or rehashing their rows.
+    """
+    no_position = Value(0, output_field=BigIntegerField())
+    no_stamp = Value(datetime(1970, 1, 1, tzinfo=timezone.utc), output_field=DateTimeField())
+    unchanged = Vote.objects.alias(
+        ledger_position=Coalesce("position_id", no_position),
+        ledger_stamp=Coalesce("created_at", no_stamp),
+    ).filter(
+        pk=OuterRef("vote_id"),
+        election_id=OuterRef("election_id"),
+        voter_id=OuterRef("voter_id"),
+        candidate_id=OuterRef("candidate_id"),
+        ledger_position=Coalesce(OuterRef("position_id"), no_position),
+        ledger_stamp=Coalesce(OuterRef("created_at"), no_stamp),
+    )
+    return (
+        LedgerEntry.objects.filter(seq__lte=last_seq)
+        .exclude(election_id__in=archived)
+        .filter(~Exists(unchanged))
+        .annotate(present=Exists(Vote.objects.filter(pk=OuterRef("vote_id"))))
+        .order_by("seq")
+        .values_list("seq", "vote_id", "present")
+    )
+
+
+def _segments(full):
+    """(first_seq, last_seq, start_hash, checkpoint or None) for every segment to check."""
+    size = getattr(settings, "LEDGER_SEGMENT_SIZE", 10_000)
+    checkpoints = list(LedgerCheckpoint.objects.order_by("first_seq"))
+    segments = []
+    start_hash = GENESIS
+    for checkpoint in checkpoints:
+        if full:
+            segments.append((checkpoint.first_seq, checkpoint.last_seq, start_hash, checkpoint))
+        start_hash = checkpoint.chain_hash
+
+    next_seq = checkpoints[-1].last_seq + 1 if checkpoints else 1
+    tail = list(LedgerEntry.objects.filter(seq__gte=next_seq).order_by("seq").values_list("seq", "entry_hash"))
+    for i in range(0, len(tail), size):
+        chunk = tail[i:i + size]
+        segments.append((chunk[0][0], chunk[-1][0], start_hash, None))
+        start_hash = chunk[-1][1]  # checked by the segment itself; lets the next one start in parallel
+    return segments
+
+
+def verify(full=False, workers=None):
+    """Check the ledger; returns a report dict.
+
+    New segments that pass become checkpoints. ``problems`` lists
+    ``(seq, description)``; ``unledgered`` the ids of votes missing from the
+    ledger (first 1000).
+    """
+    if workers is None:
+        workers = os.cpu_count() or 1
+    # Votes whose rows are gone on purpose: archived elections and benchmark runs.
+    archived = set(
+        Election.objects.filter(Q(status=Election.ARCHIVED) | Q(benchmark=True)).values_list("pk", flat=True)
+    )
+    segments = _segments(full)
+
+    pool = None
+    if workers > 1 and len(segments) > 1:
+        # spawn, not fork: the parent holds live DB connections. Workers need
+        # the app registry to import this module, but never touch the DB.
+        pool = ProcessPoolExecutor(
+            workers, mp_context=multiprocessing.get_context("spawn"), initializer=django.setup
+        )
+
+    problems = []
+    entries = 0
+    new_checkpoints = []
+    checkpointed = LedgerCheckpoint.objects.order_by("-last_seq").values_list("last_seq", flat=True).first()
+    if not full and checkpointed:
+        problems.extend(
+            (seq, f"vote {vote_id} {'modified' if present else 'deleted'}")
+            for seq, vote_id, present in _changed_votes(checkpointed, archived)[:1000]
+        )
+
+    def collect(first_seq, last_seq, checkpoint, count, result):
+        nonlocal entries
+        end_hash, root, segment_problems = result if pool is None else result.result()
+        entries += count
+        if count != last_seq - first_seq + 1:
+            segment_problems.append((first_seq, f"{last_seq - first_seq + 1 - count} entries missing in #{first_seq}-#{last_seq}"))
+        if checkpoint is not None and (root, end_hash) != (checkpoint.merkle_root, checkpoint.chain_hash):
+            segment_problems.append((first_seq, f"segment #{first_seq}-#{last_seq} differs from its checkpoint"))
+        problems.extend(segment_problems)
+        if checkpoint is None and not problems:  # never checkpoint past a failure
+            new_checkpoints.append(LedgerCheckpoint(
+                first_seq=first_seq, last_seq=last_seq, merkle_root=root, chain_hash=end_hash,
+            ))
+
+    try:
+        pending = deque()
+        for first_seq, last_seq, start_hash, checkpoint in segments:
+            rows = _segment_rows(first_seq, last_seq, archived)
+            if pool is None:
+                collect(first_seq, last_seq, checkpoint, len(rows), check_segment(start_hash, rows))
+                continue
+            pending.append((first_seq, last_seq, checkpoint, len(rows), pool.submit(check_segment, start_hash, rows)))
+            if len(pending) > 2 * workers:  # bound the rows held in memory
+                collect(*pending.popleft())
+        while pending:
+            collect(*pending.popleft())
+    finally:
+        if pool is not None:
+            pool.shutdown()
+
+    last = LedgerEntry.objects.order_by("-seq").values_list("seq", flat=True).first() or 0
+    issued = Sequence.objects.filter(name=LEDGER_SEQUENCE).values_list("value", flat=True).first() or 0
+    if last < issued:
+        problems.append((last + 1, f"entries #{last + 1}-#{issued} missing at the end of the ledger"))
+
+    LedgerCheckpoint.objects.bulk_create(new_checkpoints)
+    return {
+        "entries": entries,
+        "segments": len(segments),
+        "checkpoints": len(new_checkpoints),
+        "problems": problems,
+        "unledgered": list(unledgered_votes().values_list("pk", flat=True)[:1000]),
+    }
@@ -0,0 +1,117 @@
+import asyncio
+import json
+import threading
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db import transaction
+
+from .models import CandidateVoteCount
+from .elections import current_election, final_results
+from .tally import position_tallies
+
+RESYNC = object()
+
+
+class TallyFanout:
+    """In-process pub/sub: vote commits publish once, every SSE stream receives.
+
+    Only votes stored by this process get here; ``tally_stream`` covers the
+    other workers' with periodic snapshots.
+
+    Publishers may run on any thread (sync views, signals); each subscriber queue
+    belongs to an event loop and is fed through ``call_soon_threadsafe``.
+    """
+
+    def __init__(self, max_queue=256):
+        self.max_queue = max_queue
+        self._lock = threading.Lock()
+        self._subscribers = {}
+
+    def has_subscribers(self):
+        return bool(self._subscribers)
+
+    def subscribe(self):
+        queue = asyncio.Queue(maxsize=self.max_queue)
+        with self._lock:
+            self._subscribers[queue] = asyncio.get_running_loop()
+        return queue
+
+    def unsubscribe(self, queue):
+        with self._lock:
+            self._subscribers.pop(queue, None)
+
+    def publish(self, event):
+        with self._lock:
+            subscribers = list(self._subscribers.items())
+        for queue, loop in subscribers:
+            try:
+                loop.call_soon_threadsafe(self._offer, queue, event)
+            except RuntimeError:
+                # The subscriber's loop has shut down.
+                self.unsubscribe(queue)
+
+    @staticmethod
+    def _offer(queue, event):
+        try:
+            queue.put_nowait(event)
+        except asyncio.QueueFull:
+            # A slow reader loses its backlog and gets a fresh snapshot instead.
+            while not queue.empty():
+                queue.get_nowait()
+            queue.put_nowait(RESYNC)
+
+
+fanout = TallyFanout()
+
+
+def publish_counts(candidate_ids):
+    """Publish the new counters of ``candidate_ids`` when the transaction commits.
+
+    Called inside the transaction that changed the counters, so the values read
+    here are the ones being committed. Nothing is read unless someone is watching.
+    """
+    if not candidate_ids or not fanout.has_subscribers():
+        return
+    counts = dict(
+        CandidateVoteCount.objects.filter(candidate_id__in=candidate_ids).values_list("candidate_id", "votes")
+    )
+    transaction.on_commit(lambda: fanout.publish({"candidates": counts}))
+
+
+def sse(event, data):
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+
+def election_tallies(election):
+    election = election or current_election()
+    final = final_results(election)
+    return final["tallies"] if final else position_tallies(election)
+
+
+async def tally_stream(election=None, resync=None):
+    """Server-Sent Events: snapshots of ``election``'s tallies, with per-candidate count updates between them.
+
+    Updates only cover votes stored by this process, so a fresh snapshot (read
+    from the counters, which every worker shares) goes out every ``resync``
+    seconds; it also keeps the connection alive.
+    """
+    resync = resync or getattr(settings, "LIVE_RESYNC_SECONDS", 5)
+    loop = asyncio.get_running_loop()
+    queue = fanout.subscribe()
+    try:
+        snapshot_due = loop.time()
+        while True:
+            if loop.time() >= snapshot_due:
+                yield sse("snapshot", await sync_to_async(election_tallies)(election))
+                snapshot_due = loop.time() + resync
+            try:
+                event = await asyncio.wait_for(queue.get(), snapshot_due - loop.time())
+            except asyncio.TimeoutError:
+                continue
+            if event is RESYNC:
+                snapshot_due = loop.time()
+            else:
+                yield sse("counts", event)
+    finally:
+        fanout.unsubscribe(queue)
@@ -0,0 +1,22 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from ops_app.elections import ElectionError, archive_election
+from ops_app.models import Election
+
+
+class Command(BaseCommand):
+    help = "Move a closed election's positions, candidates and votes into its read-only archive file."
+
+    def add_arguments(self, parser):
+        parser.add_argument("election", type=int, help="Election id.")
+
+    def handle(self, *args, **options):
+        try:
+            election = Election.objects.get(pk=options["election"])
+        except Election.DoesNotExist:
+            raise CommandError(f"No election with id {options['election']}.")
+        try:
+            path = archive_election(election)
+        except ElectionError as e:
+            raise CommandError(str(e))
+        self.stdout.write(self.style.SUCCESS(f"{election.name} archived to {path} (sha256 {election.archive_sha256})."))
@@ -0,0 +1,91 @@
+import json
+import subprocess
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.test.utils import (
+    override_settings,
+    setup_databases,
+    setup_test_environment,
+    teardown_databases,
+    teardown_test_environment,
+)
+
+from ops_app.bench import BenchmarkRefused, run_benchmark
+
+
+def git_revision():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            cwd=settings.BASE_DIR, capture_output=True, text=True, check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+class Command(BaseCommand):
+    help = (
+        "Benchmark login -> ballot_position -> submit_vote -> result/admin_dashboard and print "
+        "per-view p50/p95/p99 latency, throughput and queries per request as JSON."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--positions", type=int, default=4)
+        parser.add_argument("--candidates", type=int, default=5, help="Candidates per position.")
+        parser.add_argument("--voters", type=int, default=200)
+        parser.add_argument("--concurrency", type=int, default=8)
+        parser.add_argument(
+            "--scenario", choices=["voting", "login"], default="voting",
+            help="Full voting flow, or only login -> dashboard -> voter_dashboard -> ballot_position.",
+        )
+        parser.add_argument(
+            "--base-url",
+            help="Drive a running server (e.g. http://127.0.0.1:8000) instead of the test client. "
+                 "Bench data is then seeded into the configured database, in a benchmark election "
+                 "that is deleted again afterwards.",
+        )
+        parser.add_argument(
+            "--allow-live-data", action="store_true",
+            help="With --base-url, run even though the database already holds real votes.",
+        )
+        parser.add_argument("--output", help="Write the JSON report here instead of stdout.")
+
+    def handle(self, *args, **options):
+        params = {
+            "positions": options["positions"],
+            "candidates": options["candidates"],
+            "voters": options["voters"],
+            "concurrency": options["concurrency"],
+            "scenario": options["scenario"],
+            "base_url": options["base_url"],
+        }
+
+        if options["base_url"]:
+            try:
+                report = run_benchmark(**params, allow_live_data=options["allow_live_data"])
+            except BenchmarkRefused as e:
+                raise CommandError(str(e))
+        else:
+            # The test client runs against a throwaway test database, and like the
+            # test suite it renders {% static %} without a collectstatic manifest.
+            # Every simulated voter shares one address, so rate limits are off.
+            setup_test_environment()
+            old_config = setup_databases(verbosity=0, interactive=False)
+            try:
+                with override_settings(RATE_LIMIT_ENABLED=False, STORAGES={
+                    **settings.STORAGES,
+                    "staticfiles": {"BACKEND": "django.contrib.staticfiles.storage.StaticFilesStorage"},
+                }):
+                    report = run_benchmark(**params)
+            finally:
+                teardown_databases(old_config, verbosity=0)
+                teardown_test_environment()
+
+        report["revision"] = git_revision()
+        output = json.dumps(report, indent=2)
+        if options["output"]:
+            with open(options["output"], "w") as f:
+                f.write(output + "\n")
+        else:
+            self.stdout.write(output)
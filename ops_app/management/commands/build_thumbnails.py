@@ -0,0 +1,31 @@
+from django.core.management.base import BaseCommand
+
+from ops_app.images import generate_thumbnails
+from ops_app.models import Candidate, Voter
+
+
+class Command(BaseCommand):
+    help = "Generate any missing thumbnails for existing candidate and voter photos."
+
+    def handle(self, *args, **options):
+        names = set()
+        for model, field in ((Candidate, "photo"), (Voter, "image")):
+            storage = model._meta.get_field(field).storage
+            photos = model.objects.exclude(**{field: ""}).exclude(**{f"{field}__isnull": True})
+            for name in photos.values_list(field, flat=True).distinct():
+                names.add((storage, name))
+
+        built = failed = 0
+        for storage, name in sorted(names, key=lambda item: item[1]):
+            if not storage.exists(name):
+                self.stderr.write(f"{name}: missing original")
+                failed += 1
+                continue
+            try:
+                generate_thumbnails(storage, name)
+            except OSError as e:
+                self.stderr.write(f"{name}: {e}")
+                failed += 1
+            else:
+                built += 1
+        self.stdout.write(self.style.SUCCESS(f"Thumbnails ready for {built} photo(s), {failed} skipped."))
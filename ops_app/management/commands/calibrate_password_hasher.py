@@ -0,0 +1,60 @@
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.test.utils import override_settings
+from django.utils.module_loading import import_string
+
+HASHERS = {
+    "pbkdf2": "ops_app.hashing.CalibratedPBKDF2PasswordHasher",
+    "scrypt": "ops_app.hashing.CalibratedScryptPasswordHasher",
+    "argon2": "ops_app.hashing.CalibratedArgon2PasswordHasher",
+}
+
+
+def time_hash(hasher_class, cost, rounds=3):
+    """Best-of-``rounds`` milliseconds to encode one password at ``cost``."""
+    with override_settings(PASSWORD_HASH_COST=cost):
+        hasher = hasher_class()
+        best = None
+        for _ in range(rounds):
+            started = time.perf_counter()
+            hasher.encode("calibration password", hasher.salt())
+            elapsed = (time.perf_counter() - started) * 1000
+            best = elapsed if best is None else min(best, elapsed)
+    return best
+
+
+class Command(BaseCommand):
+    help = "Find the PASSWORD_HASH_COST whose hash takes about --target-ms on this machine."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--profile", choices=sorted(HASHERS), default=settings.PASSWORD_HASH_PROFILE)
+        parser.add_argument("--target-ms", type=float, default=250)
+
+    def handle(self, *args, **options):
+        profile, target = options["profile"], options["target_ms"]
+        hasher_class = import_string(HASHERS[profile])
+        if profile == "argon2":
+            try:
+                hasher_class()._load_library()
+            except ValueError as e:  # argon2-cffi is not installed
+                raise CommandError(str(e))
+
+        if profile == "pbkdf2":
+            # Cost is linear in iterations: scale one measurement, then confirm it.
+            probe = 100_000
+            cost = max(10_000, round(probe * target / time_hash(hasher_class, probe) / 10_000) * 10_000)
+        else:
+            # scrypt (log2 work factor) and Argon2 (passes): step up until the target is reached.
+            cost = 10 if profile == "scrypt" else 1
+            limit = 20 if profile == "scrypt" else 50
+            while cost < limit and time_hash(hasher_class, cost) < target:
+                cost += 1
+
+        elapsed = time_hash(hasher_class, cost)
+        self.stdout.write(f"PASSWORD_HASH_PROFILE={profile}")
+        self.stdout.write(f"PASSWORD_HASH_COST={cost}")
+        self.stdout.write(self.style.SUCCESS(
+            f"~{elapsed:.0f} ms per hash; each hashing worker handles ~{1000 / elapsed:.1f} logins/s."
+        ))
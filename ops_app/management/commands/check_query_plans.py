@@ -0,0 +1,98 @@
+import json
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+
+from ops_app.models import Candidate, CandidateVoteCount, Position, Vote, Voter
+from ops_app.tally import tally_rows
+
+
+def hot_queries():
+    """(name, queryset, tables allowed to be scanned) for the hot read paths."""
+    return [
+        ("tally", tally_rows(1), set()),
+        ("turnout", Vote.objects.filter(election_id=1).values("voter").distinct(), set()),
+        ("ballot_positions", Position.objects.filter(election_id=1), set()),
+        ("ballot_candidates", Candidate.objects.filter(status="Approved", position_id__in=[1, 2]), set()),
+        (
+            "candidates_by_status",
+            Candidate.objects.filter(election_id=1, status="Approved").order_by("-pk")[:51],
+            set(),
+        ),
+        (
+            "candidates_by_position",
+            Candidate.objects.filter(position_id=1, status="Approved").order_by("-pk")[:51],
+            set(),
+        ),
+        ("votes_by_election", Vote.objects.filter(election_id=1).order_by("-pk")[:51], set()),
+        ("votes_by_position", Vote.objects.filter(election_id=1, position_id=1).order_by("-pk")[:51], set()),
+        ("votes_by_candidate", Vote.objects.filter(candidate_id=1), set()),
+        ("voter_ballot", Vote.objects.filter(voter_id=1, position_id__in=[1, 2]), set()),
+        ("voter_profile", Voter.objects.filter(user_id=1), set()),
+        ("candidate_counters", CandidateVoteCount.objects.filter(candidate_id__in=[1, 2]), set()),
+    ]
+
+
+def sqlite_scans(cursor, sql, params):
+    """Tables SQLite reads without an index ("SCAN t" rather than "SEARCH t USING ...")."""
+    cursor.execute("EXPLAIN QUERY PLAN " + sql, params)
+    plan = [row[-1] for row in cursor.fetchall()]
+    scanned = set()
+    for detail in plan:
+        words = detail.split()
+        if words[:1] == ["SCAN"] and len(words) > 1 and "INDEX" not in detail and "PRIMARY KEY" not in detail:
+            scanned.add(words[1])
+    return plan, scanned
+
+
+def postgres_scans(cursor, sql, params):
+    """Tables Postgres still seq-scans when the planner is told to avoid it."""
+    with transaction.atomic():
+        cursor.execute("SET LOCAL enable_seqscan = off")
+        cursor.execute("EXPLAIN (FORMAT JSON) " + sql, params)
+        plan = cursor.fetchone()[0]
+    if isinstance(plan, str):
+        plan = json.loads(plan)
+
+    scanned = set()
+    nodes = [plan[0]["Plan"]]
+    while nodes:
+        node = nodes.pop()
+        if node["Node Type"] == "Seq Scan":
+            scanned.add(node["Relation Name"])
+        nodes.extend(node.get("Plans", ()))
+    return [json.dumps(plan, indent=2)], scanned
+
+
+class Command(BaseCommand):
+    help = "EXPLAIN the hot tally/ballot/listing queries and fail if any of them scans a table."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--verbose-plans", action="store_true", help="Print every plan, not just failures.")
+
+    def handle(self, *args, **options):
+        if connection.vendor == "sqlite":
+            explain = sqlite_scans
+        elif connection.vendor == "postgresql":
+            explain = postgres_scans
+        else:
+            raise CommandError(f"Query plans cannot be checked on {connection.vendor}.")
+
+        failures = []
+        with connection.cursor() as cursor:
+            for name, queryset, allowed in hot_queries():
+                sql, params = queryset.query.get_compiler(using=queryset.db).as_sql()
+                plan, scanned = explain(cursor, sql, params)
+                bad = sorted(scanned - allowed)
+                if bad:
+                    failures.append(name)
+                    self.stdout.write(self.style.ERROR(f"{name}: full scan of {', '.join(bad)}"))
+                else:
+                    self.stdout.write(f"{name}: ok")
+                if bad or options["verbose_plans"]:
+                    for line in plan:
+                        self.stdout.write(f"    {line}")
+
+        if failures:
+            raise CommandError(f"{len(failures)} hot query(ies) scan a table: {', '.join(failures)}")
+        self.stdout.write(self.style.SUCCESS("All hot queries use an index."))
@@ -0,0 +1,29 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from ops_app.elections import ElectionError, close_election
+from ops_app.models import Election
+
+
+class Command(BaseCommand):
+    help = "Close an election and freeze its final tallies, winners and turnout in a checksummed snapshot."
+
+    def add_arguments(self, parser):
+        parser.add_argument("election", type=int, help="Election id.")
+
+    def handle(self, *args, **options):
+        try:
+            election = Election.objects.get(pk=options["election"])
+        except Election.DoesNotExist:
+            raise CommandError(f"No election with id {options['election']}.")
+        try:
+            snapshot = close_election(election)
+        except ElectionError as e:
+            raise CommandError(str(e))
+
+        for tally in snapshot.payload["tallies"]:
+            names = ", ".join(winner["name"] for winner in tally["winners"]) or "-"
+            tie = " (tie at the last seat)" if tally["tie"] else ""
+            self.stdout.write(f"{tally['position']}: {names}{tie}")
+        self.stdout.write(self.style.SUCCESS(
+            f"{election.name} closed; results snapshot {snapshot.artifact} (sha256 {snapshot.sha256})."
+        ))
@@ -0,0 +1,37 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from ops_app.models import Election
+from ops_app.rollups import compact, rebuild
+
+
+class Command(BaseCommand):
+    help = (
+        "Fold per-minute vote rollups into hourly and daily rows and prune old minute rows. "
+        "With --rebuild, recount the rollups from the Vote table first."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--rebuild", action="store_true", help="Recount from Vote (e.g. after upgrading).")
+        parser.add_argument("--election", type=int, default=None, help="Only rebuild this election.")
+        parser.add_argument("--follow", action="store_true", help="Keep compacting every --interval seconds.")
+        parser.add_argument("--interval", type=float, default=60.0, help="Seconds between runs with --follow.")
+
+    def handle(self, *args, **options):
+        if options["rebuild"]:
+            election = None
+            if options["election"] is not None:
+                try:
+                    election = Election.objects.get(pk=options["election"])
+                except Election.DoesNotExist:
+                    raise CommandError(f"No election with id {options['election']}.")
+            hours, days, pruned = rebuild(election)
+            self.stdout.write(f"Rebuilt rollups: {hours} hour and {days} day rows, {pruned} old minute rows dropped.")
+        while True:
+            hours, days, pruned = compact()
+            if hours or days or pruned or not options["follow"]:
+                self.stdout.write(f"Compacted {hours} hour and {days} day rows; dropped {pruned} minute rows.")
+            if not options["follow"]:
+                return
+            time.sleep(options["interval"])
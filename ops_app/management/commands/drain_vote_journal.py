@@ -0,0 +1,29 @@
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from ops_app.journal import drain
+
+
+class Command(BaseCommand):
+    help = (
+        "Insert ballots from the write-behind vote journal into Vote rows. "
+        "Safe to re-run after a crash: replays are applied exactly once per (voter, position)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--path", default=None, help="Journal file (default: settings.VOTE_JOURNAL_PATH).")
+        parser.add_argument("--batch-size", type=int, default=500, help="Ballots per transaction.")
+        parser.add_argument("--follow", action="store_true", help="Keep draining as new ballots arrive.")
+        parser.add_argument("--interval", type=float, default=1.0, help="Seconds between polls with --follow.")
+
+    def handle(self, *args, **options):
+        path = options["path"] or settings.VOTE_JOURNAL_PATH
+        while True:
+            stored = drain(path, options["batch_size"])
+            if stored or not options["follow"]:
+                self.stdout.write(f"Stored {stored} votes from {path}.")
+            if not options["follow"]:
+                return
+            time.sleep(options["interval"])
@@ -0,0 +1,25 @@
+import json
+
+from django.core.management.base import BaseCommand
+
+from ops_app.middleware import published_snapshots
+
+
+class Command(BaseCommand):
+    help = (
+        "Print the per-URL query/timing histograms each server process last published to the cache. "
+        "Needs a cache shared with the servers (CACHE_BACKEND=file or redis)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--view", help="Only show this URL name.")
+
+    def handle(self, *args, **options):
+        snapshots = published_snapshots()
+        if options["view"]:
+            snapshots = {
+                pid: {options["view"]: views[options["view"]]}
+                for pid, views in snapshots.items()
+                if options["view"] in views
+            }
+        self.stdout.write(json.dumps(snapshots, indent=2, sort_keys=True))
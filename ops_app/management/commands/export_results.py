@@ -0,0 +1,40 @@
+import sys
+
+from django.core.management.base import BaseCommand, CommandError
+
+from ops_app.elections import current_election
+from ops_app.exports import DATASETS, export_stream
+from ops_app.models import Election
+
+
+class Command(BaseCommand):
+    help = "Stream votes, per-position tallies or turnout as CSV or NDJSON, optionally gzipped."
+
+    def add_arguments(self, parser):
+        parser.add_argument("dataset", choices=sorted(DATASETS))
+        parser.add_argument("--format", choices=["csv", "ndjson"], default="csv")
+        parser.add_argument("--gzip", action="store_true")
+        parser.add_argument("--election", type=int, help="Election id (default: the current election).")
+        parser.add_argument("-o", "--output", help="File to write (default: stdout).")
+
+    def handle(self, *args, **options):
+        if options["election"]:
+            try:
+                election = Election.objects.get(pk=options["election"])
+            except Election.DoesNotExist:
+                raise CommandError(f"No election with id {options['election']}.")
+        else:
+            election = current_election()
+        chunks = export_stream(options["dataset"], election, options["format"], options["gzip"])
+        if options["output"]:
+            with open(options["output"], "wb") as f:
+                for chunk in chunks:
+                    f.write(chunk)
+        elif options["gzip"]:
+            out = sys.stdout.buffer
+            for chunk in chunks:
+                out.write(chunk)
+            out.flush()
+        else:
+            for chunk in chunks:
+                self.stdout.write(chunk.decode(), ending="")
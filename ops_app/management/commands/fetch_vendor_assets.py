@@ -0,0 +1,31 @@
+import urllib.request
+from pathlib import Path
+
+from django.core.management.base import BaseCommand, CommandError
+
+from ops_app.assets import VENDOR_ASSETS
+
+STATIC_DIR = Path(__file__).resolve().parents[2] / "static"
+
+
+class Command(BaseCommand):
+    help = "Download the pinned Bootstrap/Chart.js builds into ops_app/static/vendor."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--force", action="store_true", help="Re-download files that already exist.")
+
+    def handle(self, *args, **options):
+        for name, (path, url) in VENDOR_ASSETS.items():
+            target = STATIC_DIR / path
+            if target.exists() and not options["force"]:
+                self.stdout.write(f"{name}: already vendored")
+                continue
+            try:
+                with urllib.request.urlopen(url, timeout=30) as response:
+                    body = response.read()
+            except OSError as e:
+                raise CommandError(f"Could not download {url}: {e}")
+            target.parent.mkdir(parents=True, exist_ok=True)
+            target.write_bytes(body)
+            self.stdout.write(f"{name}: {len(body)} bytes -> {target.relative_to(STATIC_DIR)}")
+        self.stdout.write(self.style.SUCCESS("Vendor assets ready; run collectstatic to fingerprint them."))
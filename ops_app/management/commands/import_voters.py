@@ -0,0 +1,164 @@
+import csv
+import json
+import multiprocessing
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from itertools import islice
+from pathlib import Path
+
+import django
+from django.contrib.auth.hashers import identify_hasher, make_password
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from ops_app.models import Voter
+
+
+def read_rows(path, fmt):
+    """Yield one dict per voter from a CSV (with header) or JSONL roll, streaming."""
+    with open(path, newline="", encoding="utf-8") as f:
+        if fmt == "csv":
+            yield from csv.DictReader(f)
+        else:
+            for line in f:
+                if line.strip():
+                    yield json.loads(line)
+
+
+def chunked(rows, size):
+    rows = iter(rows)
+    while chunk := list(islice(rows, size)):
+        yield chunk
+
+
+def prepared_password(row):
+    """Password hash for ``row``: a precomputed ``password_hash`` is kept as is."""
+    encoded = row.get("password_hash")
+    if encoded:
+        identify_hasher(encoded)  # rejects anything Django could not verify later
+        return encoded
+    return make_password(row.get("password") or None)
+
+
+class Command(BaseCommand):
+    help = (
+        "Bulk-enrol voters from a CSV or JSONL roll "
+        "(username, email, firstname, lastname and password or password_hash)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("path", help="CSV or JSONL file with one voter per row.")
+        parser.add_argument("--format", choices=["csv", "jsonl"], help="Defaults to the file extension.")
+        parser.add_argument("--chunk-size", type=int, default=1000)
+        parser.add_argument(
+            "--workers",
+            type=int,
+            default=os.cpu_count(),
+            help="Processes used for password hashing; 0 hashes in this process.",
+        )
+        parser.add_argument(
+            "--no-passwords",
+            action="store_true",
+            help="Skip hashing and give every account an unusable password (set later via reset).",
+        )
+        parser.add_argument("--checkpoint", help="Progress file (default: <path>.checkpoint).")
+        parser.add_argument("--restart", action="store_true", help="Ignore an existing checkpoint.")
+
+    def handle(self, *args, **options):
+        path = Path(options["path"])
+        if not path.exists():
+            raise CommandError(f"{path} does not exist.")
+        fmt = options["format"] or ("jsonl" if path.suffix in (".jsonl", ".ndjson") else "csv")
+        checkpoint = Path(options["checkpoint"] or f"{path}.checkpoint")
+
+        done = 0
+        if checkpoint.exists() and not options["restart"]:
+            done = json.loads(checkpoint.read_text())["rows"]
+            self.stdout.write(f"Resuming after row {done}.")
+
+        pool = None
+        if not options["no_passwords"] and options["workers"]:
+            # Spawned, not forked: a fork would copy this process's open DB connection.
+            pool = ProcessPoolExecutor(
+                max_workers=options["workers"], mp_context=multiprocessing.get_context("spawn"), initializer=django.setup
+            )
+
+        started = time.monotonic()
+        created = skipped = 0
+        try:
+            for chunk in chunked(islice(read_rows(path, fmt), done, None), options["chunk_size"]):
+                chunk_started = time.monotonic()
+                new, dupes = self.import_chunk(chunk, pool, options["no_passwords"])
+                created += new
+                skipped += dupes
+                done += len(chunk)
+                self.write_checkpoint(checkpoint, done)
+
+                elapsed = time.monotonic() - chunk_started
+                self.stdout.write(
+                    f"{done} rows read, {created} created, {skipped} skipped "
+                    f"({len(chunk) / elapsed if elapsed else 0:.0f} rows/s)"
+                )
+        finally:
+            if pool is not None:
+                pool.shutdown()
+
+        elapsed = time.monotonic() - started
+        checkpoint.unlink(missing_ok=True)
+        self.stdout.write(self.style.SUCCESS(
+            f"Imported {created} voters, skipped {skipped} in {elapsed:.1f}s "
+            f"({created / elapsed if elapsed else 0:.0f} voters/s)."
+        ))
+
+    def import_chunk(self, chunk, pool, no_passwords):
+        """Create the Users and Voters for one chunk in a single transaction."""
+        rows = [row for row in chunk if row.get("username")]
+        existing = set(
+            User.objects.filter(username__in=[row["username"] for row in rows])
+            .values_list("username", flat=True)
+        )
+        seen = set()
+        fresh = []
+        for row in rows:
+            if row["username"] not in existing and row["username"] not in seen:
+                seen.add(row["username"])
+                fresh.append(row)
+        if not fresh:
+            return 0, len(chunk)
+
+        if no_passwords:
+            passwords = [make_password(None)] * len(fresh)
+        elif pool is not None:
+            passwords = list(pool.map(prepared_password, fresh, chunksize=max(1, len(fresh) // 64)))
+        else:
+            passwords = [prepared_password(row) for row in fresh]
+
+        with transaction.atomic():
+            users = User.objects.bulk_create(
+                User(
+                    username=row["username"],
+                    email=row.get("email") or "",
+                    first_name=row.get("firstname") or "",
+                    last_name=row.get("lastname") or "",
+                    password=password,
+                )
+                for row, password in zip(fresh, passwords)
+            )
+            voterids = Voter.reserve_voterids(len(users))
+            Voter.objects.bulk_create(
+                Voter(
+                    user=user,
+                    firstname=row.get("firstname") or "",
+                    lastname=row.get("lastname") or "",
+                    voterid=voterid,
+                )
+                for user, row, voterid in zip(users, fresh, voterids)
+            )
+        return len(fresh), len(chunk) - len(fresh)
+
+    def write_checkpoint(self, checkpoint, rows):
+        tmp = checkpoint.with_name(checkpoint.name + ".tmp")
+        tmp.write_text(json.dumps({"rows": rows}))
+        os.replace(tmp, checkpoint)
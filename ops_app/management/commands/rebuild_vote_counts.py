@@ -0,0 +1,27 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from ops_app.tally import counter_mismatches, rebuild_counters
+
+
+class Command(BaseCommand):
+    help = "Rebuild the materialized candidate/position vote counters from the Vote table."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--verify",
+            action="store_true",
+            help="Only compare the counters with Vote and fail if any disagree.",
+        )
+
+    def handle(self, *args, **options):
+        if options["verify"]:
+            mismatches = counter_mismatches()
+            for kind, pk, stored, actual in mismatches:
+                self.stdout.write(f"{kind} {pk}: counter={stored} votes={actual}")
+            if mismatches:
+                raise CommandError(f"{len(mismatches)} counter(s) out of date; run without --verify to rebuild.")
+            self.stdout.write(self.style.SUCCESS("Vote counters match the Vote table."))
+            return
+
+        rebuild_counters()
+        self.stdout.write(self.style.SUCCESS("Vote counters rebuilt."))
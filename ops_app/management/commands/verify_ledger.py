@@ -0,0 +1,45 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from ops_app.ledger import append_votes, unledgered_votes, verify
+
+
+class Command(BaseCommand):
+    help = "Verify the hash-chained vote ledger against itself, its checkpoints and the Vote table."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--full",
+            action="store_true",
+            help=(
+                "Also rehash every checkpointed segment. Without it, checkpointed entries are only "
+                "compared with the Vote table, and only entries added since the last checkpoint are rehashed."
+            ),
+        )
+        parser.add_argument("--workers", type=int, default=None, help="Worker processes (default: one per core).")
+        parser.add_argument(
+            "--append-missing",
+            action="store_true",
+            help="First append votes that have no ledger entry (e.g. stored before the ledger existed).",
+        )
+
+    def handle(self, *args, **options):
+        if options["append_missing"]:
+            appended = len(append_votes(list(unledgered_votes())))
+            self.stdout.write(f"Appended {appended} vote(s) to the ledger.")
+
+        report = verify(full=options["full"], workers=options["workers"])
+        for seq, problem in report["problems"][:100]:
+            self.stdout.write(f"#{seq}: {problem}")
+        if report["unledgered"]:
+            ids = ", ".join(str(pk) for pk in report["unledgered"][:20])
+            self.stdout.write(f"Votes missing from the ledger: {ids}{' ...' if len(report['unledgered']) > 20 else ''}")
+        summary = (
+            f"{report['entries']} entries in {report['segments']} segment(s) checked; "
+            f"{report['checkpoints']} new checkpoint(s)."
+        )
+        if report["problems"] or report["unledgered"]:
+            raise CommandError(
+                f"{summary} {len(report['problems'])} problem(s), "
+                f"{len(report['unledgered'])} unledgered vote(s)."
+            )
+        self.stdout.write(self.style.SUCCESS(summary))
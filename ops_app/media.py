@@ -0,0 +1,102 @@
+"""Cache-friendly serving of uploaded photos (``MEDIA_URL``).
+
+Responses carry an ETag and Last-Modified so repeat loads revalidate with a
+304, honour single ``Range: bytes=`` requests, and content-hashed names (see
+``ops_app.images``) are marked immutable so browsers skip revalidation entirely.
+"""
+import mimetypes
+import re
+from pathlib import Path
+
+from django.conf import settings
+from django.http import FileResponse, Http404, HttpResponse, HttpResponseNotModified
+from django.utils.http import http_date, parse_http_date_safe
+from django.views.decorators.http import require_safe
+
+IMMUTABLE_NAME = re.compile(r"^[0-9a-f]{32}\.")
+RANGE = re.compile(r"^bytes=(\d*)-(\d*)$")
+CHUNK_SIZE = 64 * 1024
+
+
+def media_file(path):
+    """Absolute path of ``path`` under MEDIA_ROOT, limited to MEDIA_SERVE_DIRS."""
+    root = Path(settings.MEDIA_ROOT).resolve()
+    full = (root / path).resolve()
+    if not any(Path(root, folder) in full.parents for folder in settings.MEDIA_SERVE_DIRS) or not full.is_file():
+        raise Http404("Not a media file")
+    return full
+
+
+def parse_range(header, size):
+    """(start, end) inclusive for a single satisfiable byte range, else None."""
+    match = RANGE.match(header or "")
+    if not match or match.groups() == ("", ""):
+        return None
+    first, last = match.groups()
+    if first:
+        start, end = int(first), int(last) if last else size - 1
+    else:
+        start, end = max(0, size - int(last)), size - 1
+    if start > end or start >= size:
+        raise ValueError("unsatisfiable range")
+    return start, min(end, size - 1)
+
+
+def _range_file(handle, start, length):
+    handle.seek(start)
+    try:
+        while length > 0:
+            chunk = handle.read(min(CHUNK_SIZE, length))
+            if not chunk:
+                break
+            length -= len(chunk)
+            yield chunk
+    finally:
+        handle.close()
+
+
+@require_safe
+def serve_media(request, path):
+    full = media_file(path)
+    stat = full.stat()
+    etag = f'"{stat.st_size:x}-{stat.st_mtime_ns:x}"'
+    if IMMUTABLE_NAME.match(full.name):
+        cache_control = "public, max-age=31536000, immutable"
+    else:
+        cache_control = f"public, max-age={settings.MEDIA_MAX_AGE}"
+    headers = {
+        "ETag": etag,
+        "Last-Modified": http_date(stat.st_mtime),
+        "Cache-Control": cache_control,
+        "Accept-Ranges": "bytes",
+    }
+
+    if_none_match = request.headers.get("If-None-Match")
+    if_modified_since = parse_http_date_safe(request.headers.get("If-Modified-Since", ""))
+    if (if_none_match and etag in [tag.strip() for tag in if_none_match.split(",")]) or (
+        not if_none_match and if_modified_since is not None and int(stat.st_mtime) <= if_modified_since
+    ):
+        response = HttpResponseNotModified()
+        for name, value in headers.items():
+            response[name] = value
+        return response
+
+    content_type = mimetypes.guess_type(full.name)[0] or "application/octet-stream"
+    byte_range = None
+    if "Range" in request.headers and request.headers.get("If-Range", etag) == etag:
+        try:
+            byte_range = parse_range(request.headers["Range"], stat.st_size)
+        except ValueError:
+            return HttpResponse(status=416, headers={"Content-Range": f"bytes */{stat.st_size}"})
+
+    handle = open(full, "rb")
+    if byte_range is None:
+        response = FileResponse(handle, content_type=content_type)
+    else:
+        start, end = byte_range
+        response = FileResponse(_range_file(handle, start, end - start + 1), content_type=content_type, status=206)
+        response["Content-Range"] = f"bytes {start}-{end}/{stat.st_size}"
+        response["Content-Length"] = str(end - start + 1)
+    for name, value in headers.items():
+        response[name] = value
+    return response
@@ -0,0 +1,262 @@
+import logging
+import math
+import os
+import threading
+import time
+from collections import deque
+from contextvars import ContextVar
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connection
+from django.db.backends.signals import connection_created
+from django.template.backends.django import Template
+from django.utils.decorators import sync_and_async_middleware
+from django.utils.functional import SimpleLazyObject
+
+from .auth import voter_profile
+
+logger = logging.getLogger(__name__)
+
+STATS_CACHE_PREFIX = "request_stats:"
+STATS_PIDS_KEY = STATS_CACHE_PREFIX + "pids"
+
+# Histogram bucket upper bounds per metric; the last bucket is open-ended.
+BUCKETS = {
+    "queries": (1, 2, 5, 10, 20, 50, 100),
+    "sql_ms": (1, 5, 10, 25, 50, 100, 250, 1000),
+    "render_ms": (1, 5, 10, 25, 50, 100, 250, 1000),
+    "total_ms": (5, 10, 25, 50, 100, 250, 500, 1000, 2500),
+    "bytes": (1024, 10240, 102400, 1048576),
+}
+
+
+def percentile(sorted_values, pct):
+    return sorted_values[max(0, math.ceil(pct / 100 * len(sorted_values)) - 1)]
+
+
+class RequestStats:
+    """Rolling window of the last ``window`` requests per URL name."""
+
+    def __init__(self, window=1000):
+        self.window = window
+        self._lock = threading.Lock()
+        self._samples = {}
+
+    def record(self, name, **metrics):
+        with self._lock:
+            self._samples.setdefault(name, deque(maxlen=self.window)).append(metrics)
+
+    def reset(self):
+        with self._lock:
+            self._samples.clear()
+
+    def snapshot(self):
+        with self._lock:
+            samples = {name: list(rows) for name, rows in self._samples.items()}
+
+        report = {}
+        for name, rows in sorted(samples.items()):
+            report[name] = {"requests": len(rows)}
+            for metric, bounds in BUCKETS.items():
+                values = sorted(row[metric] for row in rows)
+                histogram = {f"<={bound}": 0 for bound in bounds}
+                histogram[f">{bounds[-1]}"] = 0
+                for value in values:
+                    bound = next((b for b in bounds if value <= b), None)
+                    histogram[f"<={bound}" if bound is not None else f">{bounds[-1]}"] += 1
+                report[name][metric] = {
+                    "p50": round(percentile(values, 50), 3),
+                    "p95": round(percentile(values, 95), 3),
+                    "p99": round(percentile(values, 99), 3),
+                    "max": round(values[-1], 3),
+                    "histogram": histogram,
+                }
+        return report
+
+
+stats = RequestStats(getattr(settings, "REQUEST_STATS_WINDOW", 1000))
+
+_render_ms = ContextVar("render_ms", default=None)
+_render_timer_installed = False
+
+
+def install_render_timer():
+    """Time the top-level Django template render of each request.
+
+    Only the backend ``Template.render`` (what ``render()`` calls) is wrapped, so
+    ``{% include %}``/``{% extends %}`` are not double counted.
+    """
+    global _render_timer_installed
+    if _render_timer_installed:
+        return
+    _render_timer_installed = True
+    original = Template.render
+
+    def render(self, *args, **kwargs):
+        started = time.perf_counter()
+        try:
+            return original(self, *args, **kwargs)
+        finally:
+            spent = _render_ms.get()
+            if spent is not None:
+                spent[0] += (time.perf_counter() - started) * 1000
+
+    Template.render = render
+
+
+_queries = ContextVar("query_collector", default=None)
+
+
+class QueryCollector:
+    """Counts and times the queries run while it is the current collector."""
+
+    def __init__(self, keep_sql):
+        self.keep_sql = keep_sql
+        self.count = 0
+        self.ms = 0.0
+        self.sql = []
+
+    def __call__(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.count += 1
+            self.ms += (time.perf_counter() - started) * 1000
+            if self.keep_sql:
+                self.sql.append(sql)
+
+
+def _collect(execute, sql, params, many, context):
+    collector = _queries.get()
+    if collector is None:
+        return execute(sql, params, many, context)
+    return collector(execute, sql, params, many, context)
+
+
+def install_query_collector(connection, **kwargs):
+    """Route ``connection``'s queries to the request's collector.
+
+    The collector lives in a ContextVar rather than on the connection, so async
+    views, whose ORM calls run on a different thread (and connection) than the
+    event loop, are still counted: asgiref copies the context into that thread.
+    """
+    if _collect not in connection.execute_wrappers:
+        connection.execute_wrappers.append(_collect)
+
+
+connection_created.connect(install_query_collector)
+
+
+@sync_and_async_middleware
+class QueryStatsMiddleware:
+    """Records query count, SQL time, template render time and size per URL name.
+
+    Requests that run more than ``REQUEST_STATS_QUERY_THRESHOLD`` queries log
+    their SQL. Each process also publishes its snapshot to the cache every
+    ``REQUEST_STATS_PUBLISH_SECONDS`` for ``manage.py dump_request_stats``.
+    Works for both sync and async (ASGI) request paths.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.threshold = getattr(settings, "REQUEST_STATS_QUERY_THRESHOLD", None)
+        self.publish_every = getattr(settings, "REQUEST_STATS_PUBLISH_SECONDS", 30)
+        self._published_at = time.monotonic()
+        self.is_async = iscoroutinefunction(get_response)
+        if self.is_async:
+            markcoroutinefunction(self)
+        install_render_timer()
+
+    def __call__(self, request):
+        if self.is_async:
+            return self.__acall__(request)
+        install_query_collector(connection)  # opened before this middleware existed
+        collector, tokens = self._start()
+        started = time.perf_counter()
+        try:
+            response = self.get_response(request)
+        finally:
+            render_ms = self._stop(tokens)
+        self._record(request, response, collector, render_ms, started)
+        return response
+
+    async def __acall__(self, request):
+        collector, tokens = self._start()
+        started = time.perf_counter()
+        try:
+            response = await self.get_response(request)
+        finally:
+            render_ms = self._stop(tokens)
+        self._record(request, response, collector, render_ms, started)
+        return response
+
+    def _start(self):
+        collector = QueryCollector(keep_sql=self.threshold is not None)
+        return collector, (_queries.set(collector), _render_ms.set([0.0]))
+
+    def _stop(self, tokens):
+        render_ms = _render_ms.get()[0]
+        _queries.reset(tokens[0])
+        _render_ms.reset(tokens[1])
+        return render_ms
+
+    def _record(self, request, response, collector, render_ms, started):
+        total_ms = (time.perf_counter() - started) * 1000
+        match = request.resolver_match
+        name = match.view_name if match else "<unresolved>"
+        stats.record(
+            name,
+            queries=collector.count,
+            sql_ms=collector.ms,
+            render_ms=render_ms,
+            total_ms=total_ms,
+            bytes=0 if response.streaming else len(response.content),
+        )
+        if self.threshold is not None and collector.count > self.threshold:
+            logger.warning(
+                "%s ran %d queries (threshold %d):\n%s",
+                name, collector.count, self.threshold, "\n".join(collector.sql),
+            )
+
+        if time.monotonic() - self._published_at >= self.publish_every:
+            self._published_at = time.monotonic()
+            publish_snapshot()
+
+
+def publish_snapshot():
+    """Store this process's snapshot in the cache for out-of-process readers."""
+    pid = os.getpid()
+    cache.set(f"{STATS_CACHE_PREFIX}{pid}", stats.snapshot(), 24 * 60 * 60)
+    pids = set(cache.get(STATS_PIDS_KEY) or ())
+    pids.add(pid)
+    cache.set(STATS_PIDS_KEY, sorted(pids), None)
+
+
+def published_snapshots():
+    """{pid: snapshot} for every process that has published recently."""
+    pids = cache.get(STATS_PIDS_KEY) or ()
+    found = cache.get_many([f"{STATS_CACHE_PREFIX}{pid}" for pid in pids])
+    return {int(key[len(STATS_CACHE_PREFIX):]): snapshot for key, snapshot in found.items()}
+
+
+@sync_and_async_middleware
+class VoterProfileMiddleware:
+    """Attach ``request.voter``: the user's Voter row, looked up at most once.
+
+    The lookup is lazy and cached across requests (``ops_app.auth``); the
+    object is falsy for anonymous users and users without a Voter row. Async
+    views must only touch it inside ``sync_to_async``.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.is_async = iscoroutinefunction(get_response)
+        if self.is_async:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        request.voter = SimpleLazyObject(lambda: voter_profile(request.user))
+        return self.get_response(request)
@@ -0,0 +1,53 @@
+# Generated by Django 5.2.5 on 2026-10-18 20:03
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models import Count
+
+
+def backfill_counters(apps, schema_editor):
+    Candidate = apps.get_model("ops_app", "Candidate")
+    Position = apps.get_model("ops_app", "Position")
+    Vote = apps.get_model("ops_app", "Vote")
+    CandidateVoteCount = apps.get_model("ops_app", "CandidateVoteCount")
+    PositionVoteCount = apps.get_model("ops_app", "PositionVoteCount")
+
+    per_candidate = dict(Vote.objects.values_list("candidate").annotate(n=Count("id")))
+    per_position = dict(
+        Vote.objects.filter(position__isnull=False).values_list("position").annotate(n=Count("id"))
+    )
+    CandidateVoteCount.objects.bulk_create(
+        CandidateVoteCount(candidate_id=pk, votes=per_candidate.get(pk, 0))
+        for pk in Candidate.objects.values_list("id", flat=True)
+    )
+    PositionVoteCount.objects.bulk_create(
+        PositionVoteCount(position_id=pk, votes=per_position.get(pk, 0))
+        for pk in Position.objects.values_list("id", flat=True)
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('ops_app', '0007_voter_user_alter_voter_voterid'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CandidateVoteCount',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('votes', models.PositiveIntegerField(default=0)),
+                ('candidate', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='vote_counter', to='ops_app.candidate')),
+            ],
+        ),
+        migrations.CreateModel(
+            name='PositionVoteCount',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('votes', models.PositiveIntegerField(default=0)),
+                ('position', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='vote_counter', to='ops_app.position')),
+            ],
+        ),
+        migrations.RunPython(backfill_counters, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,35 @@
+# Generated by Django 5.2.5 on 2026-10-18 20:11
+
+from django.db import migrations, models
+
+
+def seed_voterid_sequence(apps, schema_editor):
+    Sequence = apps.get_model("ops_app", "Sequence")
+    Voter = apps.get_model("ops_app", "Voter")
+
+    last = 0
+    for voterid in Voter.objects.filter(voterid__startswith="VOTER-").values_list("voterid", flat=True):
+        try:
+            last = max(last, int(voterid.split("-")[1]))
+        except ValueError:
+            continue
+    Sequence.objects.create(name="voterid", value=last)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('ops_app', '0008_vote_counters'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Sequence',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=50, unique=True)),
+                ('value', models.BigIntegerField(default=0)),
+            ],
+        ),
+        migrations.RunPython(seed_voterid_sequence, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,96 @@
+# Generated by Django 5.2.5 on 2026-10-18 22:05
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.conf import settings
+from django.db import migrations, models
+
+import ops_app.models
+
+
+def assign_default_election(apps, schema_editor):
+    """Put every existing position, candidate and vote into one "General election"."""
+    Election = apps.get_model("ops_app", "Election")
+    election = Election.objects.create(name="General election")
+    for model in ("Position", "Candidate", "Vote"):
+        apps.get_model("ops_app", model).objects.update(election=election)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('ops_app', '0010_tally_indexes'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Election',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=100)),
+                ('status', models.CharField(choices=[('Open', 'Open'), ('Closed', 'Closed'), ('Archived', 'Archived')], default='Open', max_length=20)),
+                ('created_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('closed_at', models.DateTimeField(blank=True, null=True)),
+                ('archived_at', models.DateTimeField(blank=True, null=True)),
+                ('archive_file', models.CharField(blank=True, max_length=255)),
+                ('archive_sha256', models.CharField(blank=True, max_length=64)),
+            ],
+        ),
+        migrations.AddField(
+            model_name='position',
+            name='election',
+            field=models.ForeignKey(null=True, on_delete=django.db.models.deletion.CASCADE, to='ops_app.election'),
+        ),
+        migrations.AddField(
+            model_name='candidate',
+            name='election',
+            field=models.ForeignKey(null=True, on_delete=django.db.models.deletion.CASCADE, to='ops_app.election'),
+        ),
+        migrations.AddField(
+            model_name='vote',
+            name='election',
+            field=models.ForeignKey(null=True, on_delete=django.db.models.deletion.CASCADE, to='ops_app.election'),
+        ),
+        migrations.RunPython(assign_default_election, migrations.RunPython.noop),
+        migrations.AlterField(
+            model_name='position',
+            name='election',
+            field=models.ForeignKey(default=ops_app.models.current_election_id, on_delete=django.db.models.deletion.CASCADE, to='ops_app.election'),
+        ),
+        migrations.AlterField(
+            model_name='candidate',
+            name='election',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='ops_app.election'),
+        ),
+        migrations.AlterField(
+            model_name='vote',
+            name='election',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='ops_app.election'),
+        ),
+        migrations.AlterField(
+            model_name='position',
+            name='description',
+            field=models.CharField(max_length=100),
+        ),
+        migrations.AddConstraint(
+            model_name='position',
+            constraint=models.UniqueConstraint(fields=('election', 'description'), name='position_election_description_uniq'),
+        ),
+        migrations.RemoveIndex(
+            model_name='candidate',
+            name='candidate_status_idx',
+        ),
+        migrations.AddIndex(
+            model_name='candidate',
+            index=models.Index(fields=['election', 'status'], name='candidate_election_status_idx'),
+        ),
+        migrations.AlterUniqueTogether(
+            name='vote',
+            unique_together=set(),
+        ),
+        migrations.AddConstraint(
+            model_name='vote',
+            constraint=models.UniqueConstraint(fields=('election', 'voter', 'position'), name='vote_election_voter_position_uniq'),
+        ),
+    ]
@@ -0,0 +1,26 @@
+# Generated by Django 5.2.5 on 2026-10-18 21:00
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('ops_app', '0011_elections'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ResultSnapshot',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('created_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('payload', models.JSONField()),
+                ('sha256', models.CharField(max_length=64)),
+                ('artifact', models.CharField(max_length=255)),
+                ('election', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='result_snapshot', to='ops_app.election')),
+            ],
+        ),
+    ]
@@ -0,0 +1,49 @@
+# Generated by Django 5.2.5 on 2026-10-18 21:03
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+def seed_ledger_sequence(apps, schema_editor):
+    """Create the ledger counter up front so appends never race to create it.
+
+    Votes stored before this migration are appended by
+    `manage.py verify_ledger --append-missing`.
+    """
+    apps.get_model("ops_app", "Sequence").objects.get_or_create(name="ledger")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('ops_app', '0012_result_snapshot'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='LedgerCheckpoint',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('first_seq', models.BigIntegerField(unique=True)),
+                ('last_seq', models.BigIntegerField(unique=True)),
+                ('merkle_root', models.CharField(max_length=64)),
+                ('chain_hash', models.CharField(max_length=64)),
+                ('created_at', models.DateTimeField(default=django.utils.timezone.now)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='LedgerEntry',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('seq', models.BigIntegerField(unique=True)),
+                ('vote_id', models.BigIntegerField(unique=True)),
+                ('election_id', models.BigIntegerField()),
+                ('voter_id', models.BigIntegerField()),
+                ('position_id', models.BigIntegerField(null=True)),
+                ('candidate_id', models.BigIntegerField()),
+                ('created_at', models.DateTimeField(null=True)),
+                ('entry_hash', models.CharField(max_length=64)),
+            ],
+        ),
+        migrations.RunPython(seed_ledger_sequence, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,29 @@
+# Generated by Django 5.2.5 on 2026-10-18 21:12
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('ops_app', '0013_vote_ledger'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='VoteRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('position_id', models.BigIntegerField(default=0)),
+                ('resolution', models.PositiveIntegerField(choices=[(60, 'Minute'), (3600, 'Hour'), (86400, 'Day')])),
+                ('bucket', models.DateTimeField()),
+                ('votes', models.PositiveIntegerField(default=0)),
+                ('voters', models.PositiveIntegerField(default=0)),
+                ('election', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='ops_app.election')),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('election', 'resolution', 'position_id', 'bucket'), name='voterollup_bucket_uniq')],
+            },
+        ),
+    ]
@@ -0,0 +1,19 @@
+# Generated by Django 5.2.5 on 2026-10-18 21:28
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('ops_app', '0014_vote_rollups'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='position',
+            name='election',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='ops_app.election'),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.5 on 2026-10-18 21:52
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('ops_app', '0015_position_election_no_default'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='election',
+            name='benchmark',
+            field=models.BooleanField(default=False),
+        ),
+    ]
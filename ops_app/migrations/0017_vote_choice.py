@@ -0,0 +1,28 @@
+# Generated by Django 5.2.5 on 2026-10-18 21:55
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('ops_app', '0016_election_benchmark'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.RemoveConstraint(
+            model_name='vote',
+            name='vote_election_voter_position_uniq',
+        ),
+        migrations.AddField(
+            model_name='vote',
+            name='choice',
+            field=models.PositiveSmallIntegerField(default=0),
+        ),
+        migrations.AddConstraint(
+            model_name='vote',
+            constraint=models.UniqueConstraint(fields=('election', 'voter', 'position', 'choice'), name='vote_election_voter_position_choice_uniq'),
+        ),
+    ]
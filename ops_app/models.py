@@ -1,14 +1,102 @@
 import uuid
-from django.db import models
+from django.db import IntegrityError, models, transaction
+from django.db.models import F
 from django.contrib.auth.models import User
 from django.utils import timezone
 
 
+class ElectionManager(models.Manager):
+    def open_elections(self):
+        """Elections ``current`` chooses from, newest first: open ones, benchmark runs excepted."""
+        return self.filter(status=Election.OPEN, benchmark=False).order_by("-pk")
+
+    def current(self):
+        """The newest open election, or None."""
+        return self.open_elections().first()
+
+    async def acurrent(self):
+        return await self.open_elections().afirst()
+
+    def current_id(self):
+        return self.open_elections().values_list("pk", flat=True).first()
+
+
+class Election(models.Model):
+    """One election (a department vote, a round, a re-run); scopes positions, candidates and votes."""
+    OPEN = "Open"
+    CLOSED = "Closed"
+    ARCHIVED = "Archived"
+    STATUS_CHOICES = (
+        (OPEN, "Open"),
+        (CLOSED, "Closed"),
+        (ARCHIVED, "Archived"),
+    )
+
+    name = models.CharField(max_length=100)
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default=OPEN)
+    created_at = models.DateTimeField(default=timezone.now)
+    closed_at = models.DateTimeField(null=True, blank=True)
+    # Set once the election's rows have moved to the read-only archive (ops_app.elections).
+    archived_at = models.DateTimeField(null=True, blank=True)
+    archive_file = models.CharField(max_length=255, blank=True)
+    archive_sha256 = models.CharField(max_length=64, blank=True)
+    # Seeded by ``manage.py bench_voting`` (ops_app.bench): never the current
+    # election, and its rows are deleted again when the run ends.
+    benchmark = models.BooleanField(default=False)
+
+    objects = ElectionManager()
+
+    def __str__(self):
+        return f"{self.name} ({self.status})"
+
+
+class ResultSnapshot(models.Model):
+    """Final results of a closed election, computed once at close and never updated.
+
+    ``sha256`` is the digest of the canonical JSON of ``payload``; the same
+    bytes are written to ``artifact`` in ``ELECTION_ARCHIVE_DIR``.
+    """
+    election = models.OneToOneField(Election, on_delete=models.CASCADE, related_name="result_snapshot")
+    created_at = models.DateTimeField(default=timezone.now)
+    payload = models.JSONField()
+    sha256 = models.CharField(max_length=64)
+    artifact = models.CharField(max_length=255)
+
+    def save(self, *args, **kwargs):
+        if not self._state.adding:
+            raise ValueError("Result snapshots are immutable.")
+        super().save(*args, **kwargs)
+
+    def __str__(self):
+        return f"{self.election_id}: {self.sha256[:12]}"
+
+
+def current_election_id():
+    """Id of the newest open election, or None; only reads.
+
+    Kept for migration 0011, which calls it before later Election columns
+    exist; everything else uses ``Election.objects.current_id``.
+    """
+    return Election.objects.filter(status=Election.OPEN).order_by("-pk").values_list("pk", flat=True).first()
+
+
 class Position(models.Model):
     """Election positions (e.g., President, Vice President, Secretary, Treasurer)."""
-    description = models.CharField(max_length=100, unique=True)
+    # Chosen by the caller; save() falls back to the newest open election.
+    election = models.ForeignKey(Election, on_delete=models.CASCADE)
+    description = models.CharField(max_length=100)
     maximumvote = models.IntegerField(default=1)
 
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=["election", "description"], name="position_election_description_uniq"),
+        ]
+
+    def save(self, *args, **kwargs):
+        if self.election_id is None:
+            self.election_id = Election.objects.current_id()
+        super().save(*args, **kwargs)
+
     def __str__(self):
         return self.description
 
@@ -27,26 +115,76 @@ class Candidate(models.Model):
     status = models.CharField(max_length=20, choices=STATUS_CHOICES, default="Pending")
     applied_at = models.DateTimeField(default=timezone.now)  # ✅ FIXED
     position = models.ForeignKey(Position, on_delete=models.CASCADE, null=True, blank=True)
+    # Copied from the position on save, so per-election listings need no join.
+    election = models.ForeignKey(Election, on_delete=models.CASCADE)
     photo = models.ImageField(upload_to="candidates/", null=True, blank=True)
 
+    class Meta:
+        indexes = [
+            # Ballot: approved candidates of the listed positions.
+            models.Index(fields=["position", "status"], name="candidate_position_status_idx"),
+            # Admin listings of one election filtered by status.
+            models.Index(fields=["election", "status"], name="candidate_election_status_idx"),
+        ]
+
+    def save(self, *args, **kwargs):
+        if self.position_id is not None:
+            self.election_id = self.position.election_id
+        elif self.election_id is None:
+            self.election_id = Election.objects.current_id()
+        super().save(*args, **kwargs)
+
     def __str__(self):
         return f"{self.firstname} {self.lastname} - {self.position.description} ({self.status})"
 
 
+class SequenceManager(models.Manager):
+    def reserve(self, name, count=1):
+        """Atomically reserve ``count`` consecutive numbers from sequence ``name``.
+
+        The counter row is bumped with a single UPDATE, which holds its row lock
+        until commit, so concurrent callers always get disjoint ranges.
+        """
+        with transaction.atomic():
+            if not self.filter(name=name).update(value=F("value") + count):
+                try:
+                    with transaction.atomic():
+                        self.create(name=name, value=count)
+                except IntegrityError:
+                    # Someone else created the row first; bump theirs instead.
+                    self.filter(name=name).update(value=F("value") + count)
+            end = self.filter(name=name).values_list("value", flat=True).get()
+        return range(end - count + 1, end + 1)
+
+
+class Sequence(models.Model):
+    """Named counter used to hand out IDs without reading the table being numbered."""
+    name = models.CharField(max_length=50, unique=True)
+    value = models.BigIntegerField(default=0)
+
+    objects = SequenceManager()
+
+    def __str__(self):
+        return f"{self.name}={self.value}"
+
+
 class Voter(models.Model):
+    VOTERID_SEQUENCE = "voterid"
+
     user = models.OneToOneField(User, on_delete=models.CASCADE, null=True, blank=True)
     firstname = models.CharField(max_length=50)
     lastname = models.CharField(max_length=50)
     voterid = models.CharField(max_length=20, unique=True, editable=False)
     image = models.ImageField(upload_to='voter_images/', blank=True, null=True, default='default.png')
+
+    @classmethod
+    def reserve_voterids(cls, count):
+        """Reserve a block of ``count`` voter IDs (e.g. for bulk imports) in one round trip."""
+        return [f"VOTER-{n:04d}" for n in Sequence.objects.reserve(cls.VOTERID_SEQUENCE, count)]
+
     def save(self, *args, **kwargs):
         if not self.voterid:
-            last_voter = Voter.objects.order_by('-id').first()
-            if last_voter and last_voter.voterid.startswith("VOTER-"):
-                last_number = int(last_voter.voterid.split('-')[1])
-                self.voterid = f"VOTER-{last_number+1:04d}"
-            else:
-                self.voterid = "VOTER-0001"
+            self.voterid = self.reserve_voterids(1)[0]
         super().save(*args, **kwargs)
 
     def __str__(self):
@@ -57,10 +195,105 @@ class Vote(models.Model):
     voter = models.ForeignKey(User, on_delete=models.CASCADE)
     candidate = models.ForeignKey(Candidate, on_delete=models.CASCADE)
     position = models.ForeignKey(Position, on_delete=models.CASCADE, null=True, blank=True)
+    # Copied from the position; bulk inserts must set it themselves.
+    election = models.ForeignKey(Election, on_delete=models.CASCADE)
     created_at = models.DateTimeField(auto_now_add=True, null=True, blank=True)
+    # 0 .. maximumvote - 1: a position with several seats takes that many choices.
+    choice = models.PositiveSmallIntegerField(default=0)
     class Meta:
-        unique_together = ("voter", "position")  # prevents duplicate votes per position
+        constraints = [
+            # One vote per voter, position and choice, so any repeat ballot
+            # collides on choice 0; also serves "who voted in this election".
+            models.UniqueConstraint(
+                fields=["election", "voter", "position", "choice"], name="vote_election_voter_position_choice_uniq"
+            ),
+        ]
+        indexes = [
+            # Per-position tallies grouped by candidate, and the votes listing filter.
+            models.Index(fields=["position", "candidate"], name="vote_position_candidate_idx"),
+        ]
 
+    def save(self, *args, **kwargs):
+        if self.election_id is None:
+            self.election_id = (self.position or self.candidate).election_id
+        super().save(*args, **kwargs)
 
     def __str__(self):
         return f"{self.voter.username} voted {self.candidate.firstname} {self.candidate.lastname}"
+
+
+class CandidateVoteCount(models.Model):
+    """Denormalized vote counter per candidate, bumped in the same transaction as each Vote."""
+    candidate = models.OneToOneField(Candidate, on_delete=models.CASCADE, related_name="vote_counter")
+    votes = models.PositiveIntegerField(default=0)
+
+    def __str__(self):
+        return f"{self.candidate_id}: {self.votes}"
+
+
+class PositionVoteCount(models.Model):
+    """Denormalized vote counter per position, bumped in the same transaction as each Vote."""
+    position = models.OneToOneField(Position, on_delete=models.CASCADE, related_name="vote_counter")
+    votes = models.PositiveIntegerField(default=0)
+
+    def __str__(self):
+        return f"{self.position_id}: {self.votes}"
+
+
+class LedgerEntry(models.Model):
+    """One committed vote in the hash-chained ledger (ops_app.ledger); never updated.
+
+    The vote's fields are copied rather than referenced, so the entry outlives
+    any edit or delete of the Vote row it records.
+    """
+    seq = models.BigIntegerField(unique=True)
+    vote_id = models.BigIntegerField(unique=True)
+    election_id = models.BigIntegerField()
+    voter_id = models.BigIntegerField()
+    position_id = models.BigIntegerField(null=True)
+    candidate_id = models.BigIntegerField()
+    created_at = models.DateTimeField(null=True)
+    entry_hash = models.CharField(max_length=64)
+
+    def __str__(self):
+        return f"#{self.seq} vote {self.vote_id}"
+
+
+class LedgerCheckpoint(models.Model):
+    """A verified ledger segment: its Merkle root and the chain hash at its last entry."""
+    first_seq = models.BigIntegerField(unique=True)
+    last_seq = models.BigIntegerField(unique=True)
+    merkle_root = models.CharField(max_length=64)
+    chain_hash = models.CharField(max_length=64)
+    created_at = models.DateTimeField(default=timezone.now)
+
+    def __str__(self):
+        return f"#{self.first_seq}-#{self.last_seq} {self.merkle_root[:12]}"
+
+
+class VoteRollup(models.Model):
+    """Votes of an election per time bucket, overall and per position (ops_app.rollups)."""
+    MINUTE = 60
+    HOUR = 60 * 60
+    DAY = 24 * 60 * 60
+    RESOLUTION_CHOICES = [(MINUTE, "Minute"), (HOUR, "Hour"), (DAY, "Day")]
+    ALL_POSITIONS = 0
+
+    election = models.ForeignKey(Election, on_delete=models.CASCADE)
+    # A plain id (0 = all positions) so archiving an election's positions keeps its history.
+    position_id = models.BigIntegerField(default=ALL_POSITIONS)
+    resolution = models.PositiveIntegerField(choices=RESOLUTION_CHOICES)
+    bucket = models.DateTimeField()  # start of the bucket, UTC
+    votes = models.PositiveIntegerField(default=0)
+    voters = models.PositiveIntegerField(default=0)  # voters whose first vote in the election fell here
+
+    class Meta:
+        constraints = [
+            # Also serves the chart: one election, resolution and position, by bucket.
+            models.UniqueConstraint(
+                fields=["election", "resolution", "position_id", "bucket"], name="voterollup_bucket_uniq"
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.bucket:%Y-%m-%d %H:%M} /{self.resolution}s position {self.position_id}: {self.votes}"
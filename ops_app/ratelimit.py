@@ -0,0 +1,299 @@
+"""Token-bucket rate limiting and admission control for the write endpoints.
+
+Wrap a view in ``ops_app/urls.py``::
+
+    path("submit_vote/", rate_limit(views.submit_vote, user="5/m", ip="120/m", total="200/s"), ...)
+
+Each rate ``"N/s|m|h"`` is a token bucket holding up to N tokens that refills
+at N per period, kept per URL name and per user, per client IP, and
+globally. Before login the "user" bucket is per client IP and submitted
+username, so nobody can lock a voter out by failing logins in their name. Buckets are stored
+in-process (``RATE_LIMIT_BACKEND = "local"``) or in the Django cache
+(``"cache"``, shared by every worker using it; best effort, as concurrent
+hits can race). Requests that pass are then admitted through a per-process
+gate of ``ADMISSION_MAX_INFLIGHT`` concurrent requests, with at most
+``ADMISSION_MAX_QUEUE`` waiting up to ``ADMISSION_QUEUE_TIMEOUT`` seconds.
+Anything refused gets a 429 with Retry-After before the view touches the ORM.
+"""
+import asyncio
+import math
+import threading
+import time
+from functools import wraps
+
+from asgiref.sync import iscoroutinefunction
+from django.conf import settings
+from django.core.cache import cache
+from django.http import HttpResponse
+
+PERIODS = {"s": 1, "m": 60, "h": 3600}
+CACHE_PREFIX = "ratelimit:"
+
+
+def parse_rate(rate):
+    """"5/m" -> (seconds per token, bucket size)."""
+    count, _, unit = rate.partition("/")
+    count = int(count)
+    return PERIODS[unit] / count, count
+
+
+# ---------------- BUCKETS ----------------
+# Buckets use GCRA: the state is one "theoretical arrival time" per key, which
+# behaves exactly like a token bucket without a separate refill step.
+def _gcra(tat, now, interval, burst):
+    """(new_tat or None, retry_after) for one request against a bucket."""
+    tat = max(tat or now, now)
+    new_tat = tat + interval
+    allow_at = new_tat - burst * interval
+    if allow_at > now:
+        return None, allow_at - now
+    return new_tat, 0
+
+
+def _gcra_all(tats, now, requests):
+    """({key: new_tat}, 0) if every ``(key, interval, burst)`` request passes, else (None, longest wait).
+
+    Nothing is consumed unless all pass, so a request refused by one bucket
+    does not use up another.
+    """
+    updates = {}
+    wait = 0
+    for key, interval, burst in requests:
+        new_tat, retry_after = _gcra(tats.get(key), now, interval, burst)
+        updates[key] = new_tat
+        wait = max(wait, retry_after)
+    return (None, wait) if wait else (updates, 0)
+
+
+class LocalBuckets:
+    """Buckets in a dict of this process."""
+
+    def __init__(self, max_keys=100_000):
+        self.max_keys = max_keys
+        self._lock = threading.Lock()
+        self._tats = {}
+
+    def hit(self, key, interval, burst):
+        return self.hit_all([(key, interval, burst)])
+
+    def hit_all(self, requests):
+        now = time.monotonic()
+        with self._lock:
+            updates, retry_after = _gcra_all(self._tats, now, requests)
+            if updates:
+                if len(self._tats) >= self.max_keys:
+                    # Drop buckets that have fully refilled; they carry no state.
+                    self._tats = {k: t for k, t in self._tats.items() if t > now}
+                self._tats.update(updates)
+        return retry_after
+
+    async def ahit_all(self, requests):
+        return self.hit_all(requests)  # no I/O: a dict under a short lock
+
+    def reset(self):
+        with self._lock:
+            self._tats.clear()
+
+
+class CacheBuckets:
+    """Buckets in the default cache, shared by every process using it."""
+
+    def hit(self, key, interval, burst):
+        return self.hit_all([(key, interval, burst)])
+
+    def hit_all(self, requests):
+        now = time.time()
+        requests = [(CACHE_PREFIX + key, interval, burst) for key, interval, burst in requests]
+        updates, retry_after = _gcra_all(cache.get_many([key for key, _, _ in requests]), now, requests)
+        if updates:
+            cache.set_many(updates, math.ceil(max(updates.values()) - now) + 1)
+        return retry_after
+
+    async def ahit_all(self, requests):
+        """``hit_all`` through the async cache API, so a network cache never blocks the event loop."""
+        now = time.time()
+        requests = [(CACHE_PREFIX + key, interval, burst) for key, interval, burst in requests]
+        updates, retry_after = _gcra_all(await cache.aget_many([key for key, _, _ in requests]), now, requests)
+        if updates:
+            await cache.aset_many(updates, math.ceil(max(updates.values()) - now) + 1)
+        return retry_after
+
+    def reset(self):
+        pass  # entries expire as soon as their bucket is full again
+
+
+local_buckets = LocalBuckets()
+cache_buckets = CacheBuckets()
+
+
+def buckets():
+    return cache_buckets if getattr(settings, "RATE_LIMIT_BACKEND", "local") == "cache" else local_buckets
+
+
+# ---------------- ADMISSION ----------------
+class Admission:
+    """Bounded number of in-flight requests with a short, bounded wait queue."""
+
+    def __init__(self):
+        self._cond = threading.Condition()
+        self.in_flight = 0
+        self.waiting = 0
+        self.shed = 0
+
+    def _limits(self):
+        return (
+            getattr(settings, "ADMISSION_MAX_INFLIGHT", 32),
+            getattr(settings, "ADMISSION_MAX_QUEUE", 128),
+            getattr(settings, "ADMISSION_QUEUE_TIMEOUT", 2.0),
+        )
+
+    def _try_enter(self, limit):
+        if self.in_flight < limit:
+            self.in_flight += 1
+            return True
+        return False
+
+    def acquire(self):
+        limit, max_queue, timeout = self._limits()
+        deadline = time.monotonic() + timeout
+        with self._cond:
+            if self._try_enter(limit):
+                return True
+            if self.waiting >= max_queue:
+                self.shed += 1
+                return False
+            self.waiting += 1
+            try:
+                while not self._try_enter(limit):
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        self.shed += 1
+                        return False
+                    self._cond.wait(remaining)
+                return True
+            finally:
+                self.waiting -= 1
+
+    async def aacquire(self):
+        limit, max_queue, timeout = self._limits()
+        deadline = time.monotonic() + timeout
+        with self._cond:
+            if self._try_enter(limit):
+                return True
+            if self.waiting >= max_queue:
+                self.shed += 1
+                return False
+            self.waiting += 1
+        try:
+            # Poll rather than block: the event loop must stay free meanwhile.
+            while time.monotonic() < deadline:
+                await asyncio.sleep(0.005)
+                with self._cond:
+                    if self._try_enter(limit):
+                        return True
+            with self._cond:
+                self.shed += 1
+            return False
+        finally:
+            with self._cond:
+                self.waiting -= 1
+
+    def release(self):
+        with self._cond:
+            self.in_flight -= 1
+            self._cond.notify()
+
+
+admission = Admission()
+
+
+# ---------------- DECORATOR ----------------
+def client_ip(request):
+    if getattr(settings, "RATE_LIMIT_TRUST_FORWARDED_FOR", False):
+        forwarded = request.headers.get("X-Forwarded-For", "")
+        if forwarded:
+            return forwarded.split(",")[0].strip()
+    return request.META.get("REMOTE_ADDR", "")
+
+
+def _user_key(user, request):
+    if user is not None and user.is_authenticated:
+        return f"id:{user.pk}"
+    username = request.POST.get("username")
+    return f"name:{client_ip(request)}:{username.lower()}" if username else None
+
+
+def too_many_requests(retry_after):
+    response = HttpResponse("Too many requests, please retry shortly.", status=429, content_type="text/plain")
+    response["Retry-After"] = str(max(1, math.ceil(retry_after)))
+    return response
+
+
+def _bucket_requests(request, limits, user):
+    name = request.resolver_match.url_name if request.resolver_match else "unnamed"
+    keys = {"user": _user_key(user, request), "ip": client_ip(request), "global": "*"}
+    return [
+        (f"{name}:{scope}:{keys[scope]}", interval, burst)
+        for scope, (interval, burst) in limits
+        if keys[scope] is not None
+    ]
+
+
+def check_limits(request, limits, user):
+    """Seconds until the request would be allowed, or 0 if it is allowed now."""
+    return buckets().hit_all(_bucket_requests(request, limits, user))
+
+
+async def acheck_limits(request, limits, user):
+    return await buckets().ahit_all(_bucket_requests(request, limits, user))
+
+
+def rate_limit(view, user=None, ip=None, total=None, methods=("POST",), admit=True):
+    """Wrap ``view`` with per-user/per-IP/global token buckets and admission control.
+
+    Only ``methods`` are limited (GETs of the form pages pass straight through).
+    Disabled entirely when ``RATE_LIMIT_ENABLED`` is false.
+    """
+    limits = [
+        (scope, parse_rate(spec))
+        for scope, spec in (("user", user), ("ip", ip), ("global", total))
+        if spec
+    ]
+
+    def applies(request):
+        return getattr(settings, "RATE_LIMIT_ENABLED", True) and request.method in methods
+
+    if iscoroutinefunction(view):
+        @wraps(view)
+        async def wrapped(request, *args, **kwargs):
+            if not applies(request):
+                return await view(request, *args, **kwargs)
+            retry_after = await acheck_limits(request, limits, await request.auser())
+            if retry_after:
+                return too_many_requests(retry_after)
+            if not admit:
+                return await view(request, *args, **kwargs)
+            if not await admission.aacquire():
+                return too_many_requests(1)
+            try:
+                return await view(request, *args, **kwargs)
+            finally:
+                admission.release()
+    else:
+        @wraps(view)
+        def wrapped(request, *args, **kwargs):
+            if not applies(request):
+                return view(request, *args, **kwargs)
+            retry_after = check_limits(request, limits, request.user)
+            if retry_after:
+                return too_many_requests(retry_after)
+            if not admit:
+                return view(request, *args, **kwargs)
+            if not admission.acquire():
+                return too_many_requests(1)
+            try:
+                return view(request, *args, **kwargs)
+            finally:
+                admission.release()
+
+    return wrapped
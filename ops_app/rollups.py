@@ -0,0 +1,227 @@
+"""Per-minute, hourly and daily vote counts behind the turnout charts.
+
+Every vote insert adds to the minute buckets of its election, one row per
+position plus an overall row (``position_id`` 0) that also counts the voters
+casting their first vote of the election, i.e. turnout. ``compact`` (run by
+``manage.py compact_vote_rollups``) folds finished minutes into hour rows and
+finished hours into day rows, and drops minute rows older than
+``VOTE_ROLLUP_MINUTE_RETENTION_DAYS``. ``series`` reads one tier, topped up
+with the finer rows the compactor has not reached yet, so a chart costs a
+few indexed reads of at most a day's worth of buckets, however many votes
+there are.
+
+Rollups record arrivals: deleting a vote later does not take it out again.
+"""
+from collections import Counter, defaultdict
+from datetime import datetime, timedelta, timezone as dt_timezone
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Count, F, Max, Min
+from django.db.models.functions import Trunc
+from django.utils import timezone
+
+from .models import Vote, VoteRollup
+
+TIERS = {"minute": VoteRollup.MINUTE, "hour": VoteRollup.HOUR, "day": VoteRollup.DAY}
+LATE_SECONDS = 120  # votes commit a moment after their created_at; leave the newest buckets alone that long
+
+
+def floor(moment, resolution):
+    """Start of the ``resolution``-second bucket holding ``moment`` (UTC)."""
+    seconds = int(moment.timestamp())
+    return datetime.fromtimestamp(seconds - seconds % resolution, tz=dt_timezone.utc)
+
+
+# ---------------- ON INSERT ----------------
+def _upsert(resolution, increments):
+    """Add ``increments`` ({(election_id, position_id, bucket): (votes, voters)}) to their rows."""
+    VoteRollup.objects.bulk_create(
+        [
+            VoteRollup(election_id=election_id, position_id=position_id, resolution=resolution, bucket=bucket)
+            for election_id, position_id, bucket in increments
+        ],
+        ignore_conflicts=True,
+    )
+    groups = defaultdict(list)
+    for (election_id, position_id, bucket), delta in increments.items():
+        groups[election_id, bucket, delta].append(position_id)
+    for (election_id, bucket, (votes, voters)), position_ids in sorted(groups.items()):
+        VoteRollup.objects.filter(
+            election_id=election_id, resolution=resolution, position_id__in=position_ids, bucket=bucket
+        ).update(votes=F("votes") + votes, voters=F("voters") + voters)
+
+
+def add_votes(votes):
+    """Count freshly inserted ``votes`` in their minute buckets.
+
+    Must run inside the transaction that inserts them; costs the same four
+    queries for a ballot of any length.
+    """
+    votes = [vote for vote in votes if vote.pk is not None and vote.created_at is not None]
+    if not votes:
+        return
+    returning = set(
+        Vote.objects.filter(
+            election_id__in={vote.election_id for vote in votes},
+            voter_id__in={vote.voter_id for vote in votes},
+        )
+        .exclude(pk__in=[vote.pk for vote in votes])
+        .values_list("election_id", "voter_id")
+        .distinct()
+    )
+
+    counts = Counter()
+    first_votes = {}
+    for vote in votes:
+        bucket = floor(vote.created_at, VoteRollup.MINUTE)
+        counts[vote.election_id, vote.position_id or VoteRollup.ALL_POSITIONS, bucket] += 1
+        if vote.position_id:
+            counts[vote.election_id, VoteRollup.ALL_POSITIONS, bucket] += 1
+        key = (vote.election_id, vote.voter_id)
+        if key not in returning:
+            first_votes[key] = min(first_votes.get(key, bucket), bucket)
+    voters = Counter((election_id, VoteRollup.ALL_POSITIONS, bucket) for (election_id, _), bucket in first_votes.items())
+
+    _upsert(VoteRollup.MINUTE, {key: (n, voters.get(key, 0)) for key, n in counts.items()})
+
+
+# ---------------- COMPACTION ----------------
+def _fold(source, target, until, election=None):
+    """Rewrite the ``target`` rows before ``until`` from the ``source`` rows; returns rows written.
+
+    Starts again at the newest ``target`` bucket, so votes that landed after
+    it was folded are picked up on the next run; for one ``election`` it
+    starts from the beginning.
+    """
+    rows = VoteRollup.objects.filter(resolution=source, bucket__lt=until)
+    if election is not None:
+        rows = rows.filter(election=election)
+    else:
+        start = VoteRollup.objects.filter(resolution=target).aggregate(last=Max("bucket"))["last"]
+        if start is not None:
+            rows = rows.filter(bucket__gte=start)
+    totals = defaultdict(lambda: [0, 0])
+    for election_id, position_id, bucket, votes, voters in rows.values_list(
+        "election_id", "position_id", "bucket", "votes", "voters"
+    ).iterator(chunk_size=5000):
+        total = totals[election_id, position_id, floor(bucket, target)]
+        total[0] += votes
+        total[1] += voters
+    VoteRollup.objects.bulk_create(
+        [
+            VoteRollup(
+                election_id=election_id, position_id=position_id, resolution=target, bucket=bucket,
+                votes=votes, voters=voters,
+            )
+            for (election_id, position_id, bucket), (votes, voters) in totals.items()
+        ],
+        update_conflicts=True,
+        unique_fields=["election", "resolution", "position_id", "bucket"],
+        update_fields=["votes", "voters"],
+    )
+    return len(totals)
+
+
+def compact(now=None, election=None):
+    """Fold finished minutes into hours and finished hours into days, then prune old minutes.
+
+    Returns ``(hour rows written, day rows written, minute rows deleted)``.
+    """
+    settled = (now or timezone.now()) - timedelta(seconds=LATE_SECONDS)
+    with transaction.atomic():
+        hours = _fold(VoteRollup.MINUTE, VoteRollup.HOUR, floor(settled, VoteRollup.HOUR), election)
+        days = _fold(VoteRollup.HOUR, VoteRollup.DAY, floor(settled, VoteRollup.DAY), election)
+        keep_days = getattr(settings, "VOTE_ROLLUP_MINUTE_RETENTION_DAYS", 7)
+        cutoff = min(floor(settled, VoteRollup.HOUR), settled - timedelta(days=keep_days))
+        pruned, _ = VoteRollup.objects.filter(resolution=VoteRollup.MINUTE, bucket__lt=cutoff).delete()
+    return hours, days, pruned
+
+
+def rebuild(election=None):
+    """Recount the minute rows from the Vote table (all elections, or one) and fold them again."""
+    votes = Vote.objects.filter(created_at__isnull=False)
+    rollups = VoteRollup.objects.all()
+    if election is not None:
+        votes = votes.filter(election=election)
+        rollups = rollups.filter(election=election)
+
+    counts = Counter()
+    per_minute = (
+        votes.annotate(bucket=Trunc("created_at", "minute", tzinfo=dt_timezone.utc))
+        .values("election_id", "position_id", "bucket")
+        .annotate(n=Count("pk"))
+        .values_list("election_id", "position_id", "bucket", "n")
+        .order_by()
+    )
+    for election_id, position_id, bucket, n in per_minute.iterator(chunk_size=5000):
+        counts[election_id, position_id or VoteRollup.ALL_POSITIONS, bucket] += n
+        if position_id:
+            counts[election_id, VoteRollup.ALL_POSITIONS, bucket] += n
+    voters = Counter()
+    first_votes = votes.values("election_id", "voter_id").annotate(first=Min("created_at")).values_list(
+        "election_id", "first"
+    ).order_by()
+    for election_id, first in first_votes.iterator(chunk_size=5000):
+        voters[election_id, VoteRollup.ALL_POSITIONS, floor(first, VoteRollup.MINUTE)] += 1
+
+    with transaction.atomic():
+        rollups.delete()
+        VoteRollup.objects.bulk_create(
+            [
+                VoteRollup(
+                    election_id=election_id, position_id=position_id, resolution=VoteRollup.MINUTE,
+                    bucket=bucket, votes=n, voters=voters.get((election_id, position_id, bucket), 0),
+                )
+                for (election_id, position_id, bucket), n in counts.items()
+            ],
+            batch_size=5000,
+        )
+        return compact(election=election)
+
+
+# ---------------- READING ----------------
+class SeriesTooLong(ValueError):
+    """The requested series would have more than ``MAX_POINTS`` buckets."""
+
+
+MAX_POINTS = 5000
+
+
+def series(election, resolution=VoteRollup.HOUR, position_id=VoteRollup.ALL_POSITIONS):
+    """Dense ``(bucket, votes, first-time voters)`` rows of ``election``, oldest first.
+
+    ``resolution`` is in seconds and may be any multiple of a minute (300 for
+    five-minute buckets). Each tier that divides it is read from where the
+    coarser one ends, so folded and not-yet-folded buckets are counted once.
+    """
+    totals = {}
+    covered = None
+    for source in (VoteRollup.DAY, VoteRollup.HOUR, VoteRollup.MINUTE):
+        if resolution % source:
+            continue
+        rows = VoteRollup.objects.filter(election=election, resolution=source, position_id=position_id)
+        if covered is not None:
+            rows = rows.filter(bucket__gte=covered)
+        last = None
+        for bucket, votes, voters in rows.order_by("bucket").values_list("bucket", "votes", "voters"):
+            total = totals.setdefault(floor(bucket, resolution), [0, 0])
+            total[0] += votes
+            total[1] += voters
+            last = bucket
+        if last is not None:
+            covered = last + timedelta(seconds=source)
+    if not totals:
+        return []
+
+    first, last = min(totals), max(totals)
+    if (last - first).total_seconds() / resolution >= MAX_POINTS:
+        raise SeriesTooLong(f"More than {MAX_POINTS} buckets; use a coarser resolution.")
+    step = timedelta(seconds=resolution)
+    rows = []
+    bucket = first
+    while bucket <= last:
+        votes, voters = totals.get(bucket, (0, 0))
+        rows.append((bucket, votes, voters))
+        bucket += step
+    return rows
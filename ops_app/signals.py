@@ -0,0 +1,89 @@
+from django.contrib.auth.models import User
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+
+from .auth import forget_user, forget_voter
+from .ballot import bump_ballot_version
+from .elections import forget_current_election
+from .eligibility import index as voter_index, voter_deleted
+from .images import dedupe_upload, schedule_thumbnails
+from .live import publish_counts
+from .models import Candidate, Election, Position, Vote, Voter
+from .tally import increment_counters
+
+
+@receiver(post_delete, sender=Vote)
+def vote_deleted(sender, instance, origin=None, **kwargs):
+    """Keep the vote counters in step when a Vote is removed (admin, cascades).
+
+    Counters whose candidate or position goes in the same cascade are being
+    deleted with it and are left alone.
+    """
+    model = getattr(origin, "model", type(origin))  # origin is an instance or a queryset
+    if not issubclass(model, (Position, Election)):
+        increment_counters([instance], sign=-1, candidates=not issubclass(model, Candidate))
+    publish_counts([instance.candidate_id])
+    voter_index.forget_votes([(instance.voter_id, instance.position_id)])
+
+
+@receiver(post_save, sender=Position)
+@receiver(post_delete, sender=Position)
+@receiver(post_save, sender=Candidate)
+@receiver(post_delete, sender=Candidate)
+def ballot_changed(sender, **kwargs):
+    """Any Position/Candidate change invalidates the cached ballot once committed."""
+    transaction.on_commit(bump_ballot_version)
+
+
+@receiver(post_save, sender=Election)
+@receiver(post_delete, sender=Election)
+def election_changed(sender, **kwargs):
+    """A new, closed or archived election changes the current election and its ballot.
+
+    The cached current election is dropped now and again on commit, so a
+    request that re-cached the old one in between cannot keep it.
+    """
+    forget_current_election()
+    transaction.on_commit(forget_current_election)
+    transaction.on_commit(bump_ballot_version)
+
+
+IMAGE_FIELDS = {Candidate: "photo", Voter: "image"}
+
+
+@receiver(pre_save, sender=Candidate)
+@receiver(pre_save, sender=Voter)
+def photo_uploading(sender, instance, **kwargs):
+    """Store new photos under their content hash, reusing identical files."""
+    instance._photo_uploaded = dedupe_upload(instance, getattr(instance, IMAGE_FIELDS[sender]))
+
+
+@receiver(post_save, sender=Candidate)
+@receiver(post_save, sender=Voter)
+def photo_uploaded(sender, instance, **kwargs):
+    """Build the thumbnails of a new photo once the row is committed."""
+    if getattr(instance, "_photo_uploaded", False):
+        instance._photo_uploaded = False
+        field_file = getattr(instance, IMAGE_FIELDS[sender])
+        transaction.on_commit(lambda: schedule_thumbnails(field_file))
+
+
+@receiver(post_save, sender=User)
+@receiver(post_delete, sender=User)
+def user_changed(sender, instance, **kwargs):
+    """Evict the cached auth user so permissions/password changes apply."""
+    forget_user(instance.pk)
+
+
+@receiver(post_save, sender=Voter)
+@receiver(post_delete, sender=Voter)
+def voter_changed(sender, instance, signal, **kwargs):
+    """Evict the cached Voter row and update the eligibility index once committed."""
+    if instance.user_id:
+        forget_voter(instance.user_id)
+        user_id = instance.user_id
+        if signal is post_delete:
+            transaction.on_commit(lambda: voter_deleted(user_id))
+        else:
+            transaction.on_commit(lambda: voter_index.add_voter(user_id))
@@ -0,0 +1,151 @@
+from collections import Counter, defaultdict
+
+from django.db import transaction
+from django.db.models import Count, F, Value
+from django.db.models.functions import Coalesce
+
+from .models import Candidate, CandidateVoteCount, Position, PositionVoteCount, Vote
+
+
+def tally_rows(election):
+    """Flat position/candidate/counter rows behind ``position_tallies``."""
+    return (
+        Position.objects
+        .filter(election=election)
+        .values(
+            "id",
+            "description",
+            "candidate__id",
+            "candidate__firstname",
+            "candidate__lastname",
+        )
+        .annotate(votes=Coalesce("candidate__vote_counter__votes", Value(0)))
+        .order_by("id", "candidate__id")
+    )
+
+
+def position_tallies(election):
+    """Per-position, per-candidate vote counts for every Position of ``election`` in one query.
+
+    Counts are read from the materialized counters, so the cost grows with the
+    number of candidates rather than the number of votes. Returns a list of dicts
+    shaped for the dashboard charts::
+
+        [{"id": 1, "position": "President",
+          "labels": ["Jane Doe", ...], "data": [12, ...],
+          "candidates": [{"id": 4, "name": "Jane Doe", "votes": 12}, ...]}, ...]
+    """
+    return group_tallies(tally_rows(election))
+
+
+async def aposition_tallies(election):
+    """``position_tallies`` for async views."""
+    return group_tallies([row async for row in tally_rows(election)])
+
+
+def group_tallies(rows):
+    tallies = []
+    current = None
+    for row in rows:
+        if current is None or current["id"] != row["id"]:
+            current = {
+                "id": row["id"],
+                "position": row["description"],
+                "labels": [],
+                "data": [],
+                "candidates": [],
+            }
+            tallies.append(current)
+
+        # Positions without candidates still come back once from the outer join.
+        if row["candidate__id"] is None:
+            continue
+
+        name = f"{row['candidate__firstname']} {row['candidate__lastname']}"
+        current["labels"].append(name)
+        current["data"].append(row["votes"])
+        current["candidates"].append({"id": row["candidate__id"], "name": name, "votes": row["votes"]})
+
+    return tallies
+
+
+# ---------------- COUNTERS ----------------
+def _bump(model, field, counts):
+    """Add ``counts`` ({pk: delta}) to ``model.votes`` with conditional UPDATEs.
+
+    Missing counter rows are created first with a conflict-ignoring insert, so the
+    cost is a fixed number of queries per distinct delta, never a read-modify-write.
+    Decrements never insert: a missing row has nothing to take away, and its
+    parent may be the row being deleted.
+    """
+    if not counts:
+        return
+    increments = [pk for pk, delta in counts.items() if delta > 0]
+    if increments:
+        model.objects.bulk_create([model(**{field: pk}) for pk in increments], ignore_conflicts=True)
+
+    by_delta = defaultdict(list)
+    for pk, delta in counts.items():
+        if delta:
+            by_delta[delta].append(pk)
+    for delta, pks in by_delta.items():
+        rows = model.objects.filter(**{f"{field}__in": pks})
+        if delta < 0:
+            rows = rows.filter(votes__gte=-delta)
+        rows.update(votes=F("votes") + delta)
+
+
+def increment_counters(votes, sign=1, candidates=True, positions=True):
+    """Apply ``votes`` to the candidate and/or position counters.
+
+    Must run inside the transaction that inserts (or deletes) the votes.
+    """
+    if candidates:
+        counts = Counter(v.candidate_id for v in votes)
+        _bump(CandidateVoteCount, "candidate_id", {pk: n * sign for pk, n in counts.items()})
+    if positions:
+        counts = Counter(v.position_id for v in votes if v.position_id)
+        _bump(PositionVoteCount, "position_id", {pk: n * sign for pk, n in counts.items()})
+
+
+def counted_votes():
+    """Vote totals recomputed from the Vote table: ({candidate_id: n}, {position_id: n})."""
+    per_candidate = dict(Vote.objects.values_list("candidate").annotate(n=Count("id")).order_by())
+    per_position = dict(
+        Vote.objects.filter(position__isnull=False)
+        .values_list("position").annotate(n=Count("id")).order_by()
+    )
+    return per_candidate, per_position
+
+
+def counter_mismatches():
+    """List of (kind, pk, stored, actual) for every counter that disagrees with Vote."""
+    per_candidate, per_position = counted_votes()
+    stored_candidates = dict(CandidateVoteCount.objects.values_list("candidate_id", "votes"))
+    stored_positions = dict(PositionVoteCount.objects.values_list("position_id", "votes"))
+
+    mismatches = []
+    for kind, ids, stored, actual in (
+        ("candidate", Candidate.objects.values_list("id", flat=True), stored_candidates, per_candidate),
+        ("position", Position.objects.values_list("id", flat=True), stored_positions, per_position),
+    ):
+        for pk in ids:
+            if stored.get(pk, 0) != actual.get(pk, 0):
+                mismatches.append((kind, pk, stored.get(pk, 0), actual.get(pk, 0)))
+    return mismatches
+
+
+def rebuild_counters():
+    """Replace every counter row with totals recomputed from the Vote table."""
+    with transaction.atomic():
+        per_candidate, per_position = counted_votes()
+        CandidateVoteCount.objects.all().delete()
+        PositionVoteCount.objects.all().delete()
+        CandidateVoteCount.objects.bulk_create(
+            CandidateVoteCount(candidate_id=pk, votes=per_candidate.get(pk, 0))
+            for pk in Candidate.objects.values_list("id", flat=True)
+        )
+        PositionVoteCount.objects.bulk_create(
+            PositionVoteCount(position_id=pk, votes=per_position.get(pk, 0))
+            for pk in Position.objects.values_list("id", flat=True)
+        )
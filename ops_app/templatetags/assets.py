@@ -0,0 +1,11 @@
+from django import template
+
+from ops_app.assets import vendor_url
+
+register = template.Library()
+
+
+@register.simple_tag
+def vendor(name):
+    """``{% vendor "bootstrap.css" %}`` -> URL of a vendored front-end asset."""
+    return vendor_url(name)
@@ -0,0 +1,11 @@
+from django import template
+
+from ops_app.images import thumbnail_url
+
+register = template.Library()
+
+
+@register.filter
+def thumbnail(field_file, size):
+    """``{{ candidate.photo|thumbnail:70 }}`` -> URL of a thumbnail at least 70px wide."""
+    return thumbnail_url(field_file, int(size))
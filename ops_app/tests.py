@@ -1,3 +1,1404 @@
-from django.test import TestCase
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta, timezone as dt_timezone
+import asyncio
+import gzip
+import hashlib
+import json
+import threading
+import tempfile
+from io import BytesIO, StringIO
+from pathlib import Path
 
-# Create your tests here.
+from django.contrib.auth import authenticate
+from django.contrib.auth.hashers import make_password
+from django.contrib.messages import get_messages
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.db import OperationalError, connection
+from django.test import Client, TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from PIL import Image
+
+from .assets import VENDOR_ASSETS, is_vendored, vendor_url
+from .ballot import BallotError, cast_ballot
+from .checks import check_vendor_assets
+from .bench import BenchmarkRefused, run_benchmark
+from .elections import CURRENT_ELECTION_KEY, ElectionError, archive_election, close_election, current_election, final_results, read_archive
+from .eligibility import GENERATION_SEQUENCE, index as voter_index, is_voter
+from .forms import CandidateForm, PositionForm
+from . import hashing
+from .hashing import _check, _make, metrics as hashing_metrics, shutdown_pool
+from .images import thumbnail_url
+from .ingest import record_vote
+from .journal import VoteJournal, _store_pair_by_pair, drain, read_offset, write_offset
+from .ledger import verify
+from .live import TallyFanout, fanout, tally_stream
+from .middleware import publish_snapshot, stats
+from .ratelimit import LocalBuckets, admission, local_buckets
+from .rollups import compact, rebuild, series
+from .models import Candidate, CandidateVoteCount, Election, LedgerEntry, ResultSnapshot, Position, PositionVoteCount, Sequence, Vote, VoteRollup, Voter
+from .tally import counter_mismatches, position_tallies
+
+
+class TallyTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.president = Position.objects.create(description="President")
+        cls.treasurer = Position.objects.create(description="Treasurer")
+        Position.objects.create(description="Auditor")
+        cls.alice = Candidate.objects.create(firstname="Alice", lastname="A", position=cls.president, status="Approved")
+        cls.bob = Candidate.objects.create(firstname="Bob", lastname="B", position=cls.president, status="Approved")
+        cls.carol = Candidate.objects.create(firstname="Carol", lastname="C", position=cls.treasurer, status="Approved")
+        for i in range(3):
+            voter = User.objects.create_user(username=f"voter{i}", password="pw")
+            record_vote(voter, cls.alice if i else cls.bob)
+            record_vote(voter, cls.carol)
+
+    def test_counts_every_position_in_one_query(self):
+        with self.assertNumQueries(1):
+            tallies = position_tallies(self.president.election_id)
+
+        by_position = {t["position"]: t for t in tallies}
+        self.assertEqual(set(by_position), {"President", "Treasurer", "Auditor"})
+        self.assertEqual(by_position["President"]["labels"], ["Alice A", "Bob B"])
+        self.assertEqual(by_position["President"]["data"], [2, 1])
+        self.assertEqual(by_position["Treasurer"]["data"], [3])
+        self.assertEqual(by_position["Auditor"]["candidates"], [])
+
+    def test_admin_dashboard_renders_all_positions(self):
+        User.objects.create_superuser(username="admin", password="pw")
+        self.client.login(username="admin", password="pw")
+        response = self.client.get(reverse("admin_dashboard"))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.context["total_positions"], 3)
+        self.assertEqual(response.context["total_candidates"], 3)
+        self.assertContains(response, 'id="positionChart%d"' % self.treasurer.id)
+
+
+class VoteCounterTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.position = Position.objects.create(description="President")
+        cls.alice = Candidate.objects.create(firstname="Alice", lastname="A", position=cls.position, status="Approved")
+        cls.bob = Candidate.objects.create(firstname="Bob", lastname="B", position=cls.position, status="Approved")
+        cls.voters = [User.objects.create_user(username=f"voter{i}", password="pw") for i in range(3)]
+
+    def counts(self):
+        return (
+            dict(CandidateVoteCount.objects.values_list("candidate_id", "votes")),
+            PositionVoteCount.objects.get(position=self.position).votes,
+        )
+
+    def test_record_vote_bumps_counters(self):
+        record_vote(self.voters[0], self.alice)
+        record_vote(self.voters[1], self.alice)
+        record_vote(self.voters[2], self.bob)
+        self.assertEqual(self.counts(), ({self.alice.id: 2, self.bob.id: 1}, 3))
+
+    def test_deleting_a_vote_decrements_counters(self):
+        vote = record_vote(self.voters[0], self.alice)
+        vote.delete()
+        self.assertEqual(self.counts(), ({self.alice.id: 0}, 0))
+
+    def test_deleting_a_candidate_or_position_with_votes(self):
+        record_vote(self.voters[0], self.alice)
+        record_vote(self.voters[1], self.bob)
+        self.client.force_login(User.objects.create_superuser(username="admin", password="pw"))
+        response = self.client.get(reverse("delete_candidate", args=[self.alice.id]))
+        self.assertRedirects(response, reverse("candidates_admin"), fetch_redirect_response=False)
+        self.assertEqual(self.counts(), ({self.bob.id: 1}, 1))
+
+        response = self.client.get(reverse("delete_position", args=[self.position.id]))
+        self.assertRedirects(response, reverse("positions"), fetch_redirect_response=False)
+        self.assertFalse(Vote.objects.exists())
+        self.assertFalse(CandidateVoteCount.objects.exists() or PositionVoteCount.objects.exists())
+        connection.check_constraints()
+
+    def test_result_orders_by_counter(self):
+        record_vote(self.voters[0], self.bob)
+        self.client.login(username="voter1", password="pw")
+        response = self.client.get(reverse("result"))
+        self.assertEqual([c.id for c in response.context["candidates"]], [self.bob.id, self.alice.id])
+        self.assertEqual(response.context["candidates"][0].vote_count, 1)
+
+    def test_rebuild_command_repairs_drift(self):
+        Vote.objects.create(voter=self.voters[0], candidate=self.alice, position=self.position)
+        with self.assertRaises(CommandError):
+            call_command("rebuild_vote_counts", "--verify", stdout=StringIO())
+
+        call_command("rebuild_vote_counts", stdout=StringIO())
+        self.assertEqual(self.counts(), ({self.alice.id: 1, self.bob.id: 0}, 1))
+        call_command("rebuild_vote_counts", "--verify", stdout=StringIO())
+
+
+class BallotTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.positions = [Position.objects.create(description=f"Position {i}") for i in range(3)]
+        cls.candidates = [
+            Candidate.objects.create(firstname=f"Cand{i}", lastname="X", position=p, status="Approved")
+            for i, p in enumerate(cls.positions)
+        ]
+        cls.pending = Candidate.objects.create(firstname="Pending", lastname="X", position=cls.positions[0])
+        cls.users = []
+        for i in range(2):
+            user = User.objects.create_user(username=f"voter{i}", password="pw")
+            Voter.objects.create(user=user, firstname="V", lastname=str(i))
+            cls.users.append(user)
+
+    def setUp(self):
+        cache.clear()  # cached users/voters would otherwise skip queries for some users only
+        current_election()  # ...and so would the cached current election
+        voter_index.warm()  # ...and a cold eligibility index
+
+    def ballot(self, candidates):
+        return {f"position_{c.position_id}": str(c.id) for c in candidates}
+
+    def submit(self, user, candidates):
+        self.client.force_login(user)
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.post(reverse("submit_vote"), self.ballot(candidates))
+        return response, len(queries)
+
+    def test_whole_ballot_is_stored_with_constant_queries(self):
+        response, one_position = self.submit(self.users[0], self.candidates[:1])
+        self.assertTemplateUsed(response, "vote_success.html")
+        response, three_positions = self.submit(self.users[1], self.candidates)
+        self.assertTemplateUsed(response, "vote_success.html")
+
+        self.assertEqual(one_position, three_positions)
+        self.assertEqual(Vote.objects.filter(voter=self.users[1]).count(), 3)
+        self.assertEqual(PositionVoteCount.objects.get(position=self.positions[0]).votes, 2)
+
+    def test_resubmission_is_rejected_as_a_whole(self):
+        cast_ballot(self.users[0], {self.positions[0].id: [self.candidates[0].id]})
+        with self.assertRaises(BallotError):
+            cast_ballot(self.users[0], {c.position_id: [c.id] for c in self.candidates})
+        self.assertEqual(Vote.objects.filter(voter=self.users[0]).count(), 1)
+        self.assertFalse(CandidateVoteCount.objects.filter(candidate=self.candidates[1], votes__gt=0).exists())
+
+    def test_rejects_unapproved_and_extra_selections(self):
+        with self.assertRaises(BallotError):
+            cast_ballot(self.users[0], {self.positions[0].id: [self.pending.id]})
+        with self.assertRaises(BallotError):
+            cast_ballot(self.users[0], {self.positions[0].id: [self.candidates[0].id, self.candidates[1].id]})
+        with self.assertRaises(BallotError):
+            cast_ballot(self.users[0], {})
+        self.assertFalse(Vote.objects.exists())
+
+    def test_positions_with_several_seats_take_that_many_choices(self):
+        board = Position.objects.create(description="Board", maximumvote=2)
+        members = [
+            Candidate.objects.create(firstname=f"Member{i}", lastname="X", position=board, status="Approved")
+            for i in range(3)
+        ]
+        self.assertContains(self.client.get(reverse("ballot_position")), 'type="checkbox"', count=3)
+        with self.assertRaises(BallotError):
+            cast_ballot(self.users[0], {board.id: [m.id for m in members]})
+
+        cast_ballot(self.users[0], {board.id: [members[0].id, members[2].id]})
+        self.assertEqual(
+            list(Vote.objects.filter(position=board).order_by("choice").values_list("candidate", "choice")),
+            [(members[0].id, 0), (members[2].id, 1)],
+        )
+        voter_index.forget_votes([(self.users[0].pk, board.id)])  # leave the repeat to the unique constraint
+        with self.assertRaises(BallotError):
+            cast_ballot(self.users[0], {board.id: [members[1].id]})
+
+    def test_error_redirects_back_to_ballot(self):
+        self.client.force_login(self.users[0])
+        response = self.client.post(reverse("submit_vote"), {f"position_{self.positions[0].id}": str(self.pending.id)})
+        self.assertRedirects(response, reverse("ballot_position"))
+
+
+class ConcurrentBallotTests(TransactionTestCase):
+    """Parallel ballot submissions against the configured database profile."""
+
+    workers = 8
+
+    def setUp(self):
+        election = Election.objects.create(name="Concurrent")
+        self.positions = [Position.objects.create(election=election, description=f"Position {i}") for i in range(3)]
+        self.candidates = [
+            Candidate.objects.create(firstname=f"Cand{i}", lastname="X", position=p, status="Approved")
+            for i, p in enumerate(self.positions)
+        ]
+        self.users = []
+        for i in range(self.workers * 2):
+            user = User.objects.create_user(username=f"voter{i}", password="pw")
+            Voter.objects.create(user=user, firstname="V", lastname=str(i))
+            self.users.append(user)
+
+    def submit(self, user):
+        client = Client()
+        client.force_login(user)
+        ballot = {f"position_{c.position_id}": str(c.id) for c in self.candidates}
+        try:
+            # Every voter also retries once; the unique constraint must absorb it.
+            return [client.post(reverse("submit_vote"), ballot).status_code for _ in range(2)]
+        except OperationalError as e:
+            return e
+        finally:
+            connection.close()
+
+    def test_parallel_submissions_do_not_hit_lock_errors(self):
+        with ThreadPoolExecutor(max_workers=self.workers) as pool:
+            results = list(pool.map(self.submit, self.users))
+
+        errors = [r for r in results if isinstance(r, Exception)]
+        self.assertEqual(errors, [])
+        self.assertEqual(Vote.objects.count(), len(self.users) * len(self.positions))
+        self.assertEqual(counter_mismatches(), [])
+
+
+class VoterIdTests(TestCase):
+    def test_ids_are_sequential(self):
+        first = Voter.objects.create(firstname="A", lastname="A")
+        second = Voter.objects.create(firstname="B", lastname="B")
+        number = int(first.voterid.split("-")[1])
+        self.assertEqual(second.voterid, f"VOTER-{number + 1:04d}")
+
+    def test_block_reservation_cost_does_not_grow(self):
+        Sequence.objects.reserve(Voter.VOTERID_SEQUENCE)
+        with CaptureQueriesContext(connection) as single:
+            Voter.reserve_voterids(1)
+        with self.assertNumQueries(len(single)):
+            ids = Voter.reserve_voterids(1000)
+        self.assertEqual(len(set(ids)), 1000)
+        self.assertEqual(Voter.objects.create(firstname="A", lastname="A").voterid[6:], str(int(ids[-1][6:]) + 1))
+
+
+class ConcurrentVoterIdTests(TransactionTestCase):
+    def test_parallel_registrations_get_distinct_ids(self):
+        def register(i):
+            try:
+                return Voter.objects.create(firstname="V", lastname=str(i)).voterid
+            finally:
+                connection.close()
+
+        with ThreadPoolExecutor(max_workers=8) as pool:
+            ids = list(pool.map(register, range(40)))
+        self.assertEqual(len(set(ids)), 40)
+
+
+class ImportVotersTests(TestCase):
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.roll = Path(tmp.name) / "roll.csv"
+        lines = ["username,email,firstname,lastname,password"]
+        lines += [f"user{i},user{i}@example.com,First{i},Last{i},secret-{i}" for i in range(5)]
+        self.roll.write_text("\n".join(lines) + "\n")
+
+    def test_imports_roll_in_chunks(self):
+        User.objects.create_user(username="user3", password="pw")
+        out = StringIO()
+        call_command("import_voters", str(self.roll), "--chunk-size=2", "--workers=0", stdout=out)
+
+        self.assertIn("Imported 4 voters, skipped 1", out.getvalue())
+        self.assertEqual(Voter.objects.count(), 4)
+        self.assertEqual(len(set(Voter.objects.values_list("voterid", flat=True))), 4)
+        self.assertTrue(User.objects.get(username="user4").check_password("secret-4"))
+        self.assertFalse(Path(f"{self.roll}.checkpoint").exists())
+
+    def test_resumes_from_checkpoint(self):
+        Path(f"{self.roll}.checkpoint").write_text(json.dumps({"rows": 3}))
+        call_command("import_voters", str(self.roll), "--no-passwords", stdout=StringIO())
+
+        self.assertEqual(
+            sorted(Voter.objects.values_list("user__username", flat=True)), ["user3", "user4"]
+        )
+        self.assertFalse(User.objects.get(username="user3").has_usable_password())
+
+
+class CachedBallotTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.position = Position.objects.create(description="President")
+        Candidate.objects.create(firstname="Alice", lastname="A", position=cls.position, status="Approved")
+        cls.pending = Candidate.objects.create(firstname="Pending", lastname="P", position=cls.position)
+
+    def setUp(self):
+        # TestCase never commits, so the on_commit version bumps from setUpTestData don't run.
+        cache.clear()
+
+    def test_ballot_is_served_from_cache_until_candidates_change(self):
+        self.assertContains(self.client.get(reverse("ballot_position")), "Alice A")
+        with self.assertNumQueries(0):
+            response = self.client.get(reverse("ballot_position"))
+        self.assertContains(response, "Alice A")
+        self.assertNotContains(response, "Pending P")
+
+        admin = User.objects.create_superuser(username="admin", password="pw")
+        self.client.force_login(admin)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.get(reverse("approve_candidate", args=[self.pending.id]))
+
+        self.assertContains(self.client.get(reverse("ballot_position")), "Pending P")
+
+    @override_settings(BALLOT_CACHE_SECONDS=0)
+    def test_ballot_cache_lifetime_is_configurable(self):
+        # Under locmem other workers never see a version bump, so copies must expire on their own.
+        self.client.get(reverse("ballot_position"))
+        with CaptureQueriesContext(connection) as queries:
+            self.assertContains(self.client.get(reverse("ballot_position")), "Alice A")
+        self.assertTrue(queries)
+
+    def test_csrf_token_is_rendered_per_request(self):
+        first = self.client.get(reverse("ballot_position"))
+        self.client.cookies.clear()
+        second = self.client.get(reverse("ballot_position"))
+        self.assertNotEqual(first.context["csrf_token"], second.context["csrf_token"])
+        self.assertContains(second, str(second.context["csrf_token"]))
+
+
+class LiveTallyTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.position = Position.objects.create(description="President")
+        cls.alice = Candidate.objects.create(firstname="Alice", lastname="A", position=cls.position, status="Approved")
+        cls.admin = User.objects.create_superuser(username="admin", password="pw")
+        cls.voter = User.objects.create_user(username="voter", password="pw")
+
+    async def test_fanout_delivers_across_threads(self):
+        hub = TallyFanout()
+        queues = [hub.subscribe(), hub.subscribe()]
+        thread = threading.Thread(target=hub.publish, args=({"candidates": {1: 3}},))
+        thread.start()
+        thread.join()
+        for queue in queues:
+            self.assertEqual(await asyncio.wait_for(queue.get(), 1), {"candidates": {1: 3}})
+
+    async def test_stream_starts_with_snapshot_then_counts(self):
+        self.addCleanup(fanout._subscribers.clear)
+        await self.async_client.aforce_login(self.admin)
+        response = await self.async_client.get(reverse("live_tallies"))
+        self.assertEqual(response["Content-Type"], "text/event-stream")
+        stream = aiter(response.streaming_content)
+
+        first = (await anext(stream)).decode()
+        self.assertTrue(first.startswith("event: snapshot"))
+        self.assertIn('"Alice A"', first)
+
+        fanout.publish({"candidates": {str(self.alice.id): 7}})
+        second = (await anext(stream)).decode()
+        self.assertEqual(second, f'event: counts\ndata: {{"candidates": {{"{self.alice.id}": 7}}}}\n\n')
+        await stream.aclose()
+
+    async def test_stream_resyncs_votes_stored_by_other_workers(self):
+        stream = tally_stream(resync=0.01)
+        self.assertIn('"votes": 0', await anext(stream))
+        # Another worker's vote moves the shared counter but never reaches this fanout.
+        await CandidateVoteCount.objects.aupdate_or_create(candidate=self.alice, defaults={"votes": 4})
+        second = await anext(stream)
+        self.assertTrue(second.startswith("event: snapshot"))
+        self.assertIn('"votes": 4', second)
+        await stream.aclose()
+
+    def test_every_store_path_publishes_new_counts(self):
+        watcher = object()
+        fanout._subscribers[watcher] = None
+        self.addCleanup(fanout._subscribers.pop, watcher)
+        published = []
+        self.addCleanup(setattr, fanout, "publish", fanout.publish)
+        fanout.publish = published.append
+
+        with self.captureOnCommitCallbacks(execute=True):
+            cast_ballot(self.voter, {self.position.id: [self.alice.id]})
+        with self.captureOnCommitCallbacks(execute=True):
+            record_vote(self.admin, self.alice)
+        self.assertEqual(published, [{"candidates": {self.alice.id: 1}}, {"candidates": {self.alice.id: 2}}])
+
+    def test_only_admins_over_asgi_get_a_stream(self):
+        self.client.force_login(self.voter)
+        self.assertEqual(self.client.get(reverse("live_tallies")).status_code, 403)
+        self.client.force_login(self.admin)
+        self.assertEqual(self.client.get(reverse("live_tallies")).status_code, 204)
+
+
+class VoteJournalTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.positions = [Position.objects.create(description=f"Position {i}") for i in range(2)]
+        cls.candidates = [
+            Candidate.objects.create(firstname=f"Cand{i}", lastname="X", position=p, status="Approved")
+            for i, p in enumerate(cls.positions)
+        ]
+        cls.voters = [User.objects.create_user(username=f"voter{i}", password="pw") for i in range(3)]
+
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.path = Path(tmp.name) / "votes.log"
+        overrides = override_settings(VOTE_INGEST_MODE="journal", VOTE_JOURNAL_PATH=self.path)
+        overrides.enable()
+        self.addCleanup(overrides.disable)
+
+    def ballot(self):
+        return {c.position_id: [c.id] for c in self.candidates}
+
+    def test_ballots_are_journaled_then_drained(self):
+        for voter in self.voters:
+            cast_ballot(voter, self.ballot())
+        self.assertFalse(Vote.objects.exists())
+        self.assertEqual(len(self.path.read_text().splitlines()), 3)
+
+        self.assertEqual(drain(), 6)
+        self.assertEqual(Vote.objects.count(), 6)
+        self.assertEqual(CandidateVoteCount.objects.get(candidate=self.candidates[0]).votes, 3)
+        self.assertEqual(read_offset(self.path), self.path.stat().st_size)
+
+    def test_replay_after_crash_is_exactly_once(self):
+        cast_ballot(self.voters[0], self.ballot())
+        cast_ballot(self.voters[1], self.ballot())
+        drain()
+        # Crash between the commit and the offset checkpoint: everything replays.
+        write_offset(self.path, 0)
+        self.assertEqual(drain(), 0)
+        self.assertEqual(Vote.objects.count(), 4)
+        self.assertEqual(counter_mismatches(), [])
+
+    def test_votes_stored_meanwhile_do_not_hold_up_the_drain(self):
+        cast_ballot(self.voters[0], self.ballot())
+        first = self.candidates[0]
+        with override_settings(VOTE_INGEST_MODE="sync"):
+            cast_ballot(self.voters[0], {first.position_id: [first.id]})  # e.g. a worker still in sync mode
+        self.assertEqual(drain(), 1)
+        self.assertEqual(read_offset(self.path), self.path.stat().st_size)
+
+        # Should a pair conflict despite the check, only that pair is skipped.
+        taken = Vote(voter=self.voters[0], candidate=first, position_id=first.position_id, election_id=first.election_id)
+        fresh = Vote(voter=self.voters[1], candidate=first, position_id=first.position_id, election_id=first.election_id)
+        with self.assertLogs("ops_app.journal", "WARNING"):
+            self.assertEqual(_store_pair_by_pair([taken, fresh]), [fresh])
+        self.assertEqual(counter_mismatches(), [])
+
+    def test_torn_line_is_skipped(self):
+        self.path.write_bytes(b'{"voter": 1, "vo')
+        cast_ballot(self.voters[0], self.ballot())
+        with self.assertLogs("ops_app.journal", "ERROR"):
+            self.assertEqual(drain(), 2)
+
+    def test_concurrent_appends_are_all_written(self):
+        journal = VoteJournal(self.path, batch_window=0.01)
+        threads = [threading.Thread(target=journal.append, args=({"n": i},)) for i in range(20)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(sorted(json.loads(line)["n"] for line in self.path.read_text().splitlines()), list(range(20)))
+
+
+    def test_failed_write_only_fails_its_own_batch(self):
+        journal = VoteJournal(self.path.parent / "missing" / "votes.log", batch_window=0, retry_delay=0)
+        with self.assertLogs("ops_app.journal", "ERROR"), self.assertRaises(OSError):
+            journal.append({"n": 1})
+        journal.path.parent.mkdir()
+        journal.append({"n": 2})  # the flusher is still running
+        self.assertEqual(journal.path.read_text(), '{"n":2}\n')
+
+@override_settings(PASSWORD_HASHERS=["django.contrib.auth.hashers.MD5PasswordHasher"])
+class BenchmarkTests(TransactionTestCase):
+    def test_report_covers_every_view(self):
+        report = run_benchmark(positions=2, candidates=2, voters=3, concurrency=2)
+
+        self.assertEqual(
+            set(report["views"]),
+            {"voter_login", "ballot_position", "submit_vote", "result", "admin_login", "admin_dashboard"},
+        )
+        submit = report["views"]["submit_vote"]
+        self.assertEqual((submit["requests"], submit["errors"]), (3, 0))
+        self.assertLessEqual(submit["latency_ms"]["p50"], submit["latency_ms"]["p99"])
+        self.assertGreater(submit["queries_per_request"]["mean"], 0)
+
+        # The votes went into a benchmark election, which is cleaned up afterwards.
+        self.assertEqual(LedgerEntry.objects.count(), 6)
+        self.assertFalse(Vote.objects.exists() or Position.objects.exists() or Voter.objects.exists())
+        self.assertFalse(User.objects.filter(username__startswith="bench_").exists())
+        self.assertEqual(Election.objects.get(benchmark=True).status, Election.CLOSED)
+        self.assertIsNone(Election.objects.current())
+        self.assertEqual(verify(workers=1)["problems"], [])
+
+    def test_refuses_a_server_with_real_votes(self):
+        election = Election.objects.create(name="Real")
+        position = Position.objects.create(election=election, description="President")
+        alice = Candidate.objects.create(firstname="Alice", lastname="A", position=position, status="Approved")
+        record_vote(User.objects.create_user(username="voter", password="pw"), alice)
+        with self.assertRaises(BenchmarkRefused):
+            run_benchmark(voters=1, base_url="http://127.0.0.1:9")
+        self.assertEqual(Election.objects.count(), 1)
+
+    def test_login_scenario(self):
+        report = run_benchmark(positions=1, candidates=2, voters=3, concurrency=2, scenario="login")
+
+        self.assertEqual(set(report["views"]), {"voter_login", "dashboard", "voter_dashboard", "ballot_position"})
+        self.assertEqual(sum(view["errors"] for view in report["views"].values()), 0)
+        self.assertFalse(Vote.objects.exists())
+
+
+class RequestStatsTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        position = Position.objects.create(description="President")
+        for i in range(3):
+            Candidate.objects.create(firstname=f"Cand{i}", lastname="X", position=position)
+        cls.admin = User.objects.create_superuser(username="admin", password="pw")
+
+    def setUp(self):
+        stats.reset()
+        self.client.force_login(self.admin)
+
+    def test_records_queries_render_time_and_size_per_url_name(self):
+        response = self.client.get(reverse("candidates_admin"))
+        view = stats.snapshot()["candidates_admin"]
+
+        self.assertEqual(view["requests"], 1)
+        self.assertGreater(view["queries"]["max"], 0)
+        self.assertGreater(view["render_ms"]["max"], 0)
+        self.assertEqual(view["bytes"]["max"], len(response.content))
+        self.assertEqual(sum(view["total_ms"]["histogram"].values()), 1)
+
+    def test_logs_sql_over_threshold(self):
+        with override_settings(REQUEST_STATS_QUERY_THRESHOLD=0):
+            client = Client()
+            client.force_login(self.admin)
+            with self.assertLogs("ops_app.middleware", "WARNING") as logs:
+                client.get(reverse("positions"))
+        self.assertIn("ops_app_position", logs.output[0])
+
+    def test_staff_endpoint_and_dump_command(self):
+        self.client.get(reverse("positions"))
+        response = self.client.get(reverse("request_stats"))
+        self.assertIn("positions", response.json()["views"])
+
+        publish_snapshot()
+        out = StringIO()
+        call_command("dump_request_stats", "--view=positions", stdout=out)
+        self.assertIn('"positions"', out.getvalue())
+
+        self.client.force_login(User.objects.create_user(username="voter", password="pw"))
+        self.assertEqual(self.client.get(reverse("request_stats")).status_code, 403)
+
+
+class KeysetPaginationTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.position = Position.objects.create(description="President")
+        cls.other = Position.objects.create(description="Treasurer")
+        cls.candidates = [
+            Candidate.objects.create(
+                firstname=f"Cand{i:03d}", lastname="X", position=cls.position if i % 2 else cls.other,
+                status="Approved" if i % 3 else "Pending",
+            )
+            for i in range(120)
+        ]
+        cls.admin = User.objects.create_superuser(username="admin", password="pw")
+
+    def setUp(self):
+        cache.clear()
+        self.client.force_login(self.admin)
+
+    def page(self, **params):
+        return self.client.get(reverse("candidates_admin"), params).context["candidates"]
+
+    def test_walks_forward_and_back_without_gaps(self):
+        first = self.page()
+        second = self.page(after=first.next_cursor)
+        third = self.page(after=second.next_cursor)
+
+        seen = [c.id for page in (first, second, third) for c in page]
+        self.assertEqual(seen, sorted((c.id for c in self.candidates), reverse=True))
+        self.assertIsNone(third.next_cursor)
+        self.assertIsNone(first.prev_cursor)
+        self.assertEqual([c.id for c in self.page(before=third.prev_cursor)], [c.id for c in second])
+        self.assertEqual(first.total, 120)
+
+    def test_deep_pages_cost_the_same(self):
+        first_page = self.page()
+        with CaptureQueriesContext(connection) as shallow:
+            self.page(after=first_page.next_cursor)
+        with CaptureQueriesContext(connection) as deep:
+            self.page(after=self.candidates[5].id)
+        self.assertEqual(len(shallow), len(deep))
+
+    def test_filters_and_search(self):
+        page = self.page(position=self.position.id, status="Pending")
+        self.assertTrue(all(c.position_id == self.position.id and c.status == "Pending" for c in page))
+        self.assertEqual([c.firstname for c in self.page(q="Cand007")], ["Cand007"])
+
+    def test_votes_listing_filters_by_position(self):
+        voter = User.objects.create_user(username="voter", password="pw")
+        cast_ballot(voter, {self.position.id: [self.candidates[1].id], self.other.id: [self.candidates[2].id]})
+        response = self.client.get(reverse("votes"), {"position": self.other.id})
+        self.assertEqual([v.position_id for v in response.context["votes"]], [self.other.id])
+
+
+class ExportTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.position = Position.objects.create(description="President")
+        cls.alice = Candidate.objects.create(firstname="Alice", lastname="A", position=cls.position, status="Approved")
+        for i in range(3):
+            user = User.objects.create_user(username=f"voter{i}", password="pw")
+            Voter.objects.create(user=user, firstname="V", lastname=str(i))
+            cast_ballot(user, {cls.position.id: [cls.alice.id]})
+        cls.admin = User.objects.create_superuser(username="admin", password="pw")
+
+    def export(self, dataset, **params):
+        self.client.force_login(self.admin)
+        response = self.client.get(reverse("export_results", args=[dataset]), params)
+        self.assertTrue(response.streaming)
+        return response, b"".join(response.streaming_content)
+
+    def test_votes_csv_streams_every_row(self):
+        response, body = self.export("votes")
+        self.assertEqual(response["Content-Type"], "text/csv")
+        lines = body.decode().splitlines()
+        self.assertEqual(lines[0], "id,created_at,position,candidate_id,candidate,voter")
+        self.assertEqual(len(lines), 4)
+
+    def test_gzipped_ndjson(self):
+        response, body = self.export("tallies", format="ndjson", gzip="1")
+        self.assertIn('filename="tallies.ndjson.gz"', response["Content-Disposition"])
+        rows = [json.loads(line) for line in gzip.decompress(body).splitlines()]
+        self.assertEqual(rows, [{"position": "President", "candidate_id": self.alice.id, "candidate": "Alice A", "votes": 3}])
+
+    async def test_asgi_export_streams_asynchronously(self):
+        await self.async_client.aforce_login(self.admin)
+        response = await self.async_client.get(reverse("export_results", args=["votes"]))
+        self.assertTrue(response.is_async)  # a sync iterator would be read whole before sending
+        body = b"".join([chunk async for chunk in response.streaming_content])
+        self.assertEqual(len(body.decode().splitlines()), 4)
+
+    def test_turnout_command(self):
+        out = StringIO()
+        call_command("export_results", "turnout", stdout=out)
+        self.assertIn("President,3,3,100.0", out.getvalue())
+
+    def test_voters_cannot_export(self):
+        self.client.force_login(User.objects.get(username="voter0"))
+        self.assertRedirects(
+            self.client.get(reverse("export_results", args=["votes"])), reverse("voter_dashboard"),
+            fetch_redirect_response=False,
+        )
+
+
+class QueryPlanTests(TestCase):
+    def test_hot_queries_use_indexes(self):
+        out = StringIO()
+        call_command("check_query_plans", stdout=out)
+        self.assertIn("All hot queries use an index.", out.getvalue())
+
+
+class ThumbnailTests(TestCase):
+    def setUp(self):
+        media = tempfile.TemporaryDirectory()
+        self.addCleanup(media.cleanup)
+        self.media = Path(media.name)
+        settings = override_settings(MEDIA_ROOT=media.name, MEDIA_URL="/media/", THUMBNAIL_WORKERS=0)
+        settings.enable()
+        self.addCleanup(settings.disable)
+        self.position = Position.objects.create(description="President")
+
+    def upload(self, color="red"):
+        buffer = BytesIO()
+        Image.new("RGB", (640, 480), color).save(buffer, "JPEG")
+        return SimpleUploadedFile("p1.jpg", buffer.getvalue(), content_type="image/jpeg")
+
+    def apply(self, photo):
+        with self.captureOnCommitCallbacks(execute=True):
+            return Candidate.objects.create(firstname="A", lastname="B", position=self.position, photo=photo)
+
+    def test_identical_uploads_share_one_file(self):
+        first = self.apply(self.upload())
+        second = self.apply(self.upload())
+        third = self.apply(self.upload("blue"))
+        self.assertEqual(first.photo.name, second.photo.name)
+        self.assertNotEqual(first.photo.name, third.photo.name)
+        self.assertEqual(len(list((self.media / "candidates").glob("*.jpg"))), 2)
+
+    def test_thumbnails_written_next_to_original(self):
+        candidate = self.apply(self.upload())
+        thumb = self.media / f"{candidate.photo.name}.128.webp"
+        with Image.open(thumb) as image:
+            self.assertEqual(image.size, (128, 128))
+        self.assertTrue((self.media / f"{candidate.photo.name}.256.webp").exists())
+        self.assertEqual(thumbnail_url(candidate.photo, 70), f"/media/{candidate.photo.name}.128.webp")
+        self.assertEqual(thumbnail_url(candidate.photo, 200), f"/media/{candidate.photo.name}.256.webp")
+
+    def test_falls_back_to_original_and_backfills(self):
+        candidate = Candidate.objects.create(firstname="A", lastname="B", position=self.position, photo=self.upload())
+        self.assertEqual(thumbnail_url(candidate.photo, 70), candidate.photo.url)
+        call_command("build_thumbnails", stdout=StringIO(), stderr=StringIO())
+        self.assertEqual(thumbnail_url(candidate.photo, 70), f"/media/{candidate.photo.name}.128.webp")
+
+
+class MediaServingTests(TestCase):
+    def setUp(self):
+        media = tempfile.TemporaryDirectory()
+        self.addCleanup(media.cleanup)
+        (Path(media.name) / "candidates").mkdir()
+        (Path(media.name) / "candidates" / "p1.jpg").write_bytes(bytes(range(256)) * 4)
+        (Path(media.name) / "db.sqlite3").write_bytes(b"secret")
+        settings = override_settings(MEDIA_ROOT=media.name)
+        settings.enable()
+        self.addCleanup(settings.disable)
+
+    def test_etag_revalidation(self):
+        response = self.client.get("/media/candidates/p1.jpg")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response["Content-Type"], "image/jpeg")
+        self.assertEqual(len(b"".join(response.streaming_content)), 1024)
+        self.assertIn("max-age", response["Cache-Control"])
+        again = self.client.get("/media/candidates/p1.jpg", headers={"If-None-Match": response["ETag"]})
+        self.assertEqual(again.status_code, 304)
+
+    def test_byte_ranges(self):
+        response = self.client.get("/media/candidates/p1.jpg", headers={"Range": "bytes=10-19"})
+        self.assertEqual(response.status_code, 206)
+        self.assertEqual(response["Content-Range"], "bytes 10-19/1024")
+        self.assertEqual(b"".join(response.streaming_content), bytes(range(10, 20)))
+        tail = self.client.get("/media/candidates/p1.jpg", headers={"Range": "bytes=-4"})
+        self.assertEqual(b"".join(tail.streaming_content), bytes(range(252, 256)))
+        self.assertEqual(self.client.get("/media/candidates/p1.jpg", headers={"Range": "bytes=2000-"}).status_code, 416)
+
+    def test_only_upload_dirs_are_served(self):
+        self.assertEqual(self.client.get("/media/db.sqlite3").status_code, 404)
+        self.assertEqual(self.client.get("/media/candidates/../db.sqlite3").status_code, 404)
+
+
+class StaticAssetTests(TestCase):
+    def test_vendor_assets_fall_back_to_cdn_until_fetched(self):
+        for name, (path, cdn_url) in VENDOR_ASSETS.items():
+            expected = "/static/" + path if is_vendored(name) else cdn_url
+            self.assertEqual(vendor_url(name), expected)
+        missing = [name for name in VENDOR_ASSETS if not is_vendored(name)]
+        self.assertEqual(len(check_vendor_assets(None)), len(missing))  # flagged by check --deploy
+        with override_settings(VENDOR_ASSETS_REQUIRED=True):
+            self.assertTrue(all(message.is_serious() for message in check_vendor_assets(None)))
+        with override_settings(VENDOR_ASSETS_REQUIRED=False):
+            self.assertFalse(any(message.is_serious() for message in check_vendor_assets(None)))
+
+    def test_static_files_served_by_whitenoise(self):
+        response = self.client.get("/static/logo.png")
+        self.assertEqual(response.status_code, 200)
+        self.assertIn("max-age", response["Cache-Control"])
+
+
+class CachedAuthTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username="voter0", password="pw")
+        self.voter = Voter.objects.create(user=self.user, firstname="V", lastname="0")
+
+    def tables(self, path):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(path)
+        return response, " ".join(q["sql"] for q in queries)
+
+    def test_repeat_requests_skip_user_and_voter_rows(self):
+        self.client.force_login(self.user)
+        self.tables(reverse("voter_dashboard"))
+        response, sql = self.tables(reverse("voter_dashboard"))
+        self.assertRedirects(response, reverse("ballot_position"), fetch_redirect_response=False)
+        self.assertNotIn("auth_user", sql)
+        self.assertNotIn("ops_app_voter", sql)
+
+    def test_changes_evict_the_cache(self):
+        self.client.force_login(self.user)
+        self.tables(reverse("voter_dashboard"))
+
+        self.voter.delete()
+        response, _ = self.tables(reverse("voter_dashboard"))
+        self.assertEqual(response.status_code, 200)
+
+        self.user.is_active = False
+        self.user.save()
+        response, _ = self.tables(reverse("voter_dashboard"))
+        self.assertEqual(response.status_code, 302)
+        self.assertTrue(response["Location"].startswith(reverse("voter_login")))
+
+
+FAST_HASHERS = [
+    "ops_app.hashing.CalibratedPBKDF2PasswordHasher",
+    "django.contrib.auth.hashers.MD5PasswordHasher",
+]
+
+
+@override_settings(PASSWORD_HASHERS=FAST_HASHERS, PASSWORD_HASH_COST=1000, PASSWORD_HASH_WORKERS=0)
+class PasswordHashingTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create(username="voter0", password=make_password("pw", hasher="md5"))
+
+    def login(self, password="pw"):
+        return self.client.post(reverse("voter_login"), {"username": "voter0", "password": password})
+
+    def test_login_upgrades_outdated_hash(self):
+        completed = hashing_metrics.completed
+        self.assertRedirects(self.login(), reverse("dashboard"), fetch_redirect_response=False)
+        self.user.refresh_from_db()
+        self.assertTrue(self.user.password.startswith("pbkdf2_sha256$1000$"))
+        self.assertEqual(hashing_metrics.completed, completed + 1)
+
+        self.client.logout()
+        with override_settings(PASSWORD_HASH_COST=2000):
+            self.login()
+        self.user.refresh_from_db()
+        self.assertTrue(self.user.password.startswith("pbkdf2_sha256$2000$"))
+
+    def test_wrong_password_and_full_queue(self):
+        self.assertRedirects(self.login("nope"), reverse("voter_login"), fetch_redirect_response=False)
+        with override_settings(PASSWORD_HASH_QUEUE_LIMIT=0):
+            response = self.login()
+            self.assertIsNone(authenticate(username="voter0", password="pw"))  # sync callers (admin site) too
+            self.assertIsNone(authenticate(username="nobody", password="pw"))
+        self.assertIn("Too many sign-ins", " ".join(str(m) for m in get_messages(response.wsgi_request)))
+        self.assertNotIn("_auth_user_id", self.client.session)
+
+    def test_register_hashes_with_preferred_hasher(self):
+        self.client.post(reverse("register"), {
+            "firstname": "New", "lastname": "Voter", "username": "newbie", "email": "n@example.com",
+            "password1": "s3cret-pass", "password2": "s3cret-pass", "role": "voter",
+        })
+        user = User.objects.get(username="newbie")
+        self.assertTrue(user.password.startswith("pbkdf2_sha256$1000$"))
+        self.assertTrue(user.check_password("s3cret-pass"))
+        self.assertFalse(user.is_staff)
+
+    def test_register_without_password_is_a_form_error(self):
+        response = self.client.post(reverse("register"), {"username": "newbie", "email": "n@example.com"})
+        self.assertRedirects(response, reverse("register"), fetch_redirect_response=False)
+        self.assertIn("required", " ".join(str(m) for m in get_messages(response.wsgi_request)))
+        self.assertFalse(User.objects.filter(username="newbie").exists())
+
+    @override_settings(PASSWORD_HASH_WORKERS=1)
+    def test_process_pool_round_trip(self):
+        self.addCleanup(shutdown_pool)
+        encoded = hashing.make_password("pw")
+        self.assertEqual(hashing.check_password("pw", encoded), (True, None))
+        self.assertEqual(hashing.check_password("nope", encoded), (False, None))
+        self.assertEqual(hashing_metrics.snapshot()["queue_depth"], 0)
+
+    def test_worker_functions(self):
+        paths = ["django.contrib.auth.hashers.MD5PasswordHasher"]
+        encoded = _make("pw", paths)
+        self.assertEqual(_check("pw", encoded, paths), (True, None))
+        self.assertEqual(_check("pw", "!unusable", paths), (False, None))
+
+
+class AsyncViewTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.position = Position.objects.create(description="President")
+        cls.alice = Candidate.objects.create(firstname="Alice", lastname="A", position=cls.position, status="Approved")
+        cls.admin = User.objects.create_superuser(username="admin", password="pw")
+        cls.voter = User.objects.create_user(username="voter0", password="pw")
+        record_vote(cls.voter, cls.alice)
+
+    def setUp(self):
+        cache.clear()
+        stats.reset()
+
+    async def test_admin_dashboard_under_asgi(self):
+        await self.async_client.aforce_login(self.admin)
+        response = await self.async_client.get(reverse("admin_dashboard"))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.context["total_voters"], 1)
+        self.assertEqual(response.context["voters_voted"], 1)
+        self.assertEqual(response.context["tallies"][0]["data"], [1])
+        self.assertGreater(stats.snapshot()["admin_dashboard"]["queries"]["max"], 0)
+
+    async def test_ballot_served_from_cache_without_queries(self):
+        first = await self.async_client.get(reverse("ballot_position"))
+        self.assertContains(first, "Alice")
+        stats.reset()
+        second = await self.async_client.get(reverse("ballot_position"))
+        self.assertContains(second, "Alice")
+        self.assertEqual(stats.snapshot()["ballot_position"]["queries"]["max"], 0)
+
+    async def test_read_views(self):
+        await self.async_client.aforce_login(self.voter)
+        self.assertContains(await self.async_client.get(reverse("result")), "Alice")
+        self.assertContains(await self.async_client.get(reverse("positions")), "President")
+        platform = reverse("candidate_platform", args=[self.alice.id])
+        self.assertContains(await self.async_client.get(platform), "Alice")
+        missing = reverse("candidate_platform", args=[self.alice.id + 100])
+        self.assertEqual((await self.async_client.get(missing)).status_code, 404)
+
+
+@override_settings(RATE_LIMIT_ENABLED=True, RATE_LIMIT_BACKEND="local")
+# Cheap hashes, so the login tests make their attempts well inside a minute.
+@override_settings(PASSWORD_HASHERS=FAST_HASHERS, PASSWORD_HASH_COST=1000, PASSWORD_HASH_WORKERS=0)
+class RateLimitTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username="voter0", password="pw")
+
+    def setUp(self):
+        cache.clear()
+        local_buckets.reset()
+
+    def test_bucket_refills_at_its_rate(self):
+        bucket = LocalBuckets()
+        self.assertEqual([bucket.hit("k", 1.0, 3) for _ in range(3)], [0, 0, 0])
+        retry_after = bucket.hit("k", 1.0, 3)
+        self.assertGreater(retry_after, 0.9)
+        self.assertLessEqual(retry_after, 1.0)
+
+    def test_submit_vote_limited_per_user(self):
+        self.client.force_login(self.user)
+        for _ in range(10):
+            self.assertEqual(self.client.post(reverse("submit_vote")).status_code, 302)
+        response = self.client.post(reverse("submit_vote"))
+        self.assertEqual(response.status_code, 429)
+        self.assertGreaterEqual(int(response["Retry-After"]), 1)
+        # Another user keeps their own bucket; GETs are never limited.
+        other = Client()
+        other.force_login(User.objects.create_user(username="voter1", password="pw"))
+        self.assertEqual(other.post(reverse("submit_vote")).status_code, 302)
+        self.assertEqual(self.client.get(reverse("submit_vote")).status_code, 302)
+
+    def test_failed_logins_cannot_lock_a_voter_out_from_elsewhere(self):
+        attempt = {"username": "voter0", "password": "wrong"}
+        for _ in range(10):
+            self.assertEqual(self.client.post(reverse("voter_login"), attempt).status_code, 302)
+        self.assertEqual(self.client.post(reverse("voter_login"), attempt).status_code, 429)
+        voter = Client(REMOTE_ADDR="10.0.0.2")
+        response = voter.post(reverse("voter_login"), {"username": "voter0", "password": "pw"})
+        self.assertRedirects(response, reverse("dashboard"), fetch_redirect_response=False)
+
+    def test_admin_login_is_limited_and_refusals_cost_nothing(self):
+        attempt = {"username": "admin", "password": "wrong"}
+        for _ in range(10):
+            self.client.post(reverse("admin_login"), attempt)
+        self.assertEqual(self.client.post(reverse("admin_login"), attempt).status_code, 429)
+
+        bucket = LocalBuckets()
+        self.assertEqual(bucket.hit_all([("user", 60.0, 1), ("ip", 60.0, 1)]), 0)
+        self.assertGreater(bucket.hit_all([("other-user", 60.0, 1), ("ip", 60.0, 1)]), 0)
+        self.assertEqual(bucket.hit("other-user", 60.0, 1), 0)  # the refusal by "ip" left it full
+
+    @override_settings(RATE_LIMIT_BACKEND="cache")
+    def test_cache_backend_shares_buckets(self):
+        mismatch = {"password1": "a", "password2": "b"}
+        for _ in range(10):
+            self.client.post(reverse("register"), mismatch)
+        self.assertTrue(cache.get("ratelimit:register:ip:127.0.0.1"))
+        local_buckets.reset()  # only the cache holds state
+        self.assertEqual(self.client.post(reverse("register"), mismatch).status_code, 429)
+
+    @override_settings(RATE_LIMIT_BACKEND="cache")
+    async def test_cache_backend_under_asgi(self):
+        mismatch = {"password1": "a", "password2": "b"}
+        for _ in range(10):
+            await self.async_client.post(reverse("register"), mismatch)
+        self.assertTrue(await cache.aget("ratelimit:register:ip:127.0.0.1"))
+        self.assertEqual((await self.async_client.post(reverse("register"), mismatch)).status_code, 429)
+
+    @override_settings(ADMISSION_MAX_INFLIGHT=0, ADMISSION_MAX_QUEUE=0)
+    def test_admission_sheds_when_full(self):
+        shed = admission.shed
+        response = self.client.post(reverse("voter_login"), {"username": "voter0", "password": "pw"})
+        self.assertEqual(response.status_code, 429)
+        self.assertEqual(response["Retry-After"], "1")
+        self.assertEqual(admission.shed, shed + 1)
+        self.assertEqual(admission.in_flight, 0)
+        self.assertEqual(self.client.get(reverse("voter_login")).status_code, 200)
+
+    @override_settings(ADMISSION_MAX_INFLIGHT=0, ADMISSION_QUEUE_TIMEOUT=0.05)
+    def test_admission_queue_times_out(self):
+        self.client.force_login(self.user)
+        self.assertEqual(self.client.post(reverse("vote")).status_code, 429)
+        self.assertEqual(admission.waiting, 0)
+
+
+class ElectionTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.old = Election.objects.create(name="Spring round")
+        cls.old_position = Position.objects.create(election=cls.old, description="President")
+        cls.old_alice = Candidate.objects.create(firstname="Alice", lastname="A", position=cls.old_position, status="Approved")
+        cls.new = Election.objects.create(name="Autumn round")
+        cls.position = Position.objects.create(election=cls.new, description="President")
+        cls.bob = Candidate.objects.create(firstname="Bob", lastname="B", position=cls.position, status="Approved")
+        cls.admin = User.objects.create_superuser(username="admin", password="pw")
+        cls.voter = User.objects.create_user(username="voter0", password="pw")
+        Voter.objects.create(user=cls.voter, firstname="V", lastname="0")
+        record_vote(cls.voter, cls.old_alice)
+
+    def setUp(self):
+        cache.clear()
+
+    def test_positions_go_into_a_chosen_open_election(self):
+        Election.objects.update(status=Election.CLOSED)
+        self.client.force_login(self.admin)
+        Position()
+        PositionForm()
+        response = self.client.post(reverse("add_position"), {"description": "Treasurer", "maximumvote": 1})
+        self.assertContains(response, "only be added to an open election")
+        self.assertEqual(Election.objects.count(), 3)  # the migration's, old and new: nothing created
+        self.assertFalse(Position.objects.filter(description="Treasurer").exists())
+
+        Election.objects.filter(pk=self.old.pk).update(status=Election.OPEN)
+        cache.clear()
+        response = self.client.post(reverse("add_position"), {"description": "Treasurer", "maximumvote": 1})
+        self.assertRedirects(response, reverse("positions"), fetch_redirect_response=False)
+        self.assertEqual(Position.objects.get(description="Treasurer").election, self.old)
+
+    def test_candidates_without_a_position_need_an_open_election(self):
+        Election.objects.update(status=Election.CLOSED)
+        form = CandidateForm({"firstname": "Carol", "lastname": "C"})
+        self.assertFalse(form.is_valid())
+        self.assertIn("No election is open", str(form.non_field_errors()))
+
+        Election.objects.filter(pk=self.old.pk).update(status=Election.OPEN)
+        form = CandidateForm({"firstname": "Carol", "lastname": "C"})
+        self.assertTrue(form.is_valid())
+        self.assertEqual(form.save().election, self.old)
+
+    def test_candidates_keep_to_their_election(self):
+        data = {"firstname": "Bob", "lastname": "B", "position": self.old_position.pk}
+        form = CandidateForm(data, instance=self.bob)
+        self.assertFalse(form.is_valid())
+        self.assertIn("position", form.errors)
+        self.assertTrue(CandidateForm(dict(data, position=self.position.pk), instance=self.bob).is_valid())
+        self.assertFalse(CandidateForm(data, election=self.new).is_valid())
+
+    def test_rows_are_scoped_to_their_election(self):
+        self.assertEqual(self.old_alice.election, self.old)
+        self.assertEqual(current_election(), self.new)
+        self.assertEqual(Vote.objects.get().election, self.old)
+
+        ballot = self.client.get(reverse("ballot_position"))
+        self.assertContains(ballot, "Bob B")
+        self.assertNotContains(ballot, "Alice A")
+        old_ballot = self.client.get(reverse("ballot_position"), {"election": self.old.pk})
+        self.assertContains(old_ballot, "Alice A")
+
+        self.client.force_login(self.admin)
+        dashboard = self.client.get(reverse("admin_dashboard"))
+        self.assertEqual(dashboard.context["voters_voted"], 0)
+        self.assertEqual(dashboard.context["tallies"][0]["candidates"][0]["name"], "Bob B")
+        self.assertEqual(self.client.get(reverse("admin_dashboard"), {"election": 999}).status_code, 404)
+
+    def test_same_voter_votes_once_per_election(self):
+        cast_ballot(self.voter, {self.position.id: [self.bob.id]})
+        with self.assertRaises(BallotError):
+            cast_ballot(self.voter, {self.old_position.id: [self.old_alice.id]})  # not on the current ballot
+        self.assertEqual(Vote.objects.filter(voter=self.voter).count(), 2)
+
+    def test_closed_election_takes_no_votes(self):
+        Election.objects.filter(pk=self.new.pk).update(status=Election.CLOSED)
+        self.new.refresh_from_db()
+        with self.assertRaisesMessage(BallotError, "Voting is closed."):
+            cast_ballot(self.voter, {self.position.id: [self.bob.id]}, self.new)
+
+    def test_archive_moves_rows_out_of_the_hot_tables(self):
+        with self.assertRaises(ElectionError):
+            archive_election(self.old)  # still open
+
+        self.old.status = Election.CLOSED
+        self.old.save()
+        with tempfile.TemporaryDirectory() as directory, override_settings(ELECTION_ARCHIVE_DIR=directory):
+            path = archive_election(self.old)
+            self.assertTrue(path.exists())
+            self.assertEqual(self.old.status, Election.ARCHIVED)
+            self.assertFalse(Vote.objects.filter(election=self.old).exists())
+            self.assertFalse(Position.objects.filter(election=self.old).exists())
+            self.assertTrue(Position.objects.filter(election=self.new).exists())
+
+            header, votes = read_archive(self.old)
+            self.assertEqual(header["candidates"][0]["votes"], 1)
+            self.assertEqual([vote[:3] for vote in votes], [[self.voter.pk, self.old_position.pk, self.old_alice.pk]])
+
+            self.client.force_login(self.admin)
+            dashboard = self.client.get(reverse("admin_dashboard"), {"election": self.old.pk})
+            self.assertEqual(dashboard.context["voters_voted"], 1)
+            self.assertEqual(dashboard.context["tallies"][0]["data"], [1])
+            self.assertContains(self.client.get(reverse("result"), {"election": self.old.pk}), "Alice")
+
+            with open(path, "ab") as f:
+                f.write(b"tampered")
+            cache.clear()
+            with self.assertRaises(ElectionError):
+                read_archive(self.old)
+
+
+@override_settings(ELECTION_CLOSE_GRACE_SECONDS=0)
+class ResultSnapshotTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.election = Election.objects.create(name="Board")
+        cls.board = Position.objects.create(election=cls.election, description="Board", maximumvote=2)
+        cls.chair = Position.objects.create(election=cls.election, description="Chair")
+        cls.board_members = [
+            Candidate.objects.create(firstname=name, lastname="B", position=cls.board, status="Approved")
+            for name in ("Ann", "Ben", "Cy")
+        ]
+        cls.chairs = [
+            Candidate.objects.create(firstname=name, lastname="C", position=cls.chair, status="Approved")
+            for name in ("Dee", "Eve")
+        ]
+        cls.admin = User.objects.create_superuser(username="admin", password="pw")
+        for i, (board, chair) in enumerate([(0, 0), (0, 1), (1, 0), (1, 1), (2, 0)]):
+            user = User.objects.create_user(username=f"voter{i}", password="pw")
+            Voter.objects.create(user=user, firstname="V", lastname=str(i))
+            cast_ballot(user, {cls.board.id: [cls.board_members[board].id], cls.chair.id: [cls.chairs[chair].id]})
+
+    def setUp(self):
+        cache.clear()
+        self.directory = tempfile.TemporaryDirectory()
+        self.addCleanup(self.directory.cleanup)
+        self.enterContext(override_settings(ELECTION_ARCHIVE_DIR=self.directory.name))
+
+    def test_close_freezes_winners_and_turnout(self):
+        snapshot = close_election(self.election)
+        self.election.refresh_from_db()
+        self.assertEqual(self.election.status, Election.CLOSED)
+
+        board, chair = snapshot.payload["tallies"]
+        self.assertEqual([w["name"] for w in board["winners"]], ["Ann B", "Ben B"])
+        self.assertFalse(board["tie"])
+        self.assertEqual([w["name"] for w in chair["winners"]], ["Dee C"])
+        self.assertEqual(snapshot.payload["voters_voted"], 5)
+        self.assertEqual(snapshot.payload["turnout_pct"], 100.0)
+
+        artifact = Path(self.directory.name) / snapshot.artifact
+        self.assertEqual(hashlib.sha256(artifact.read_bytes()).hexdigest(), snapshot.sha256)
+        with self.assertRaises(ValueError):
+            snapshot.save()
+        with self.assertRaises(ElectionError):
+            close_election(self.election)
+        with self.assertRaises(BallotError):
+            cast_ballot(User.objects.get(username="admin"), {self.chair.id: [self.chairs[0].id]}, self.election)
+
+    def test_stale_open_copy_in_another_worker_cannot_vote(self):
+        stale = Election.objects.get(pk=self.election.pk)  # what another worker still has cached
+        close_election(self.election)
+        cache.set(CURRENT_ELECTION_KEY, stale)
+        late = User.objects.create_user(username="late", password="pw")
+        Voter.objects.create(user=late, firstname="L", lastname="V")
+        with self.assertRaisesMessage(BallotError, "Voting is closed."):
+            cast_ballot(late, {self.chair.id: [self.chairs[1].id]}, stale)
+
+        self.client.force_login(late)
+        self.client.post(reverse("submit_vote"), {f"position_{self.chair.id}": self.chairs[1].id})
+        self.assertFalse(Vote.objects.filter(voter=late).exists())
+
+    def test_results_views_read_the_snapshot(self):
+        close_election(self.election)
+        self.election.refresh_from_db()
+        final_results(self.election)  # first read verifies and caches it
+        self.client.force_login(self.admin)
+        params = {"election": self.election.pk}
+        with CaptureQueriesContext(connection) as queries:
+            dashboard = self.client.get(reverse("admin_dashboard"), params)
+            result = self.client.get(reverse("result"), params)
+        tables = " ".join(q["sql"] for q in queries.captured_queries)
+        self.assertNotIn("COUNT(", tables)
+        self.assertNotIn("ops_app_vote", tables)
+        self.assertNotIn("ops_app_candidate", tables)
+
+        self.assertTrue(dashboard.context["final"])
+        self.assertEqual(dashboard.context["voters_voted"], 5)
+        self.assertContains(dashboard, "Ann B (2), Ben B (2)")
+        self.assertContains(result, "Dee C <strong>(elected)</strong>", html=False)
+
+    def test_tampered_snapshot_is_refused(self):
+        snapshot = close_election(self.election)
+        ResultSnapshot.objects.filter(pk=snapshot.pk).update(payload={**snapshot.payload, "votes": 0})
+        self.election.refresh_from_db()
+        with self.assertRaises(ElectionError):
+            final_results(self.election)
+
+
+@override_settings(LEDGER_SEGMENT_SIZE=2)
+class LedgerTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.position = Position.objects.create(description="Chair")
+        cls.candidates = [
+            Candidate.objects.create(firstname=name, lastname="L", position=cls.position, status="Approved")
+            for name in ("Ann", "Ben")
+        ]
+        cls.users = [User.objects.create_user(username=f"voter{i}", password="pw") for i in range(5)]
+        for i, user in enumerate(cls.users[:3]):
+            cast_ballot(user, {cls.position.id: [cls.candidates[i % 2].id]})
+
+    def test_votes_are_chained_and_checkpointed(self):
+        self.assertEqual(LedgerEntry.objects.count(), 3)
+        report = verify(workers=1)
+        self.assertEqual(report["problems"], [])
+        self.assertEqual((report["entries"], report["segments"], report["checkpoints"]), (3, 2, 2))
+
+        record_vote(self.users[3], self.candidates[0])
+        report = verify(workers=1)
+        self.assertEqual((report["entries"], report["checkpoints"], report["problems"]), (1, 1, []))
+        report = verify(full=True, workers=1)
+        self.assertEqual((report["entries"], report["problems"]), (4, []))
+
+    def test_parallel_verification(self):
+        report = verify(workers=2)
+        self.assertEqual((report["entries"], report["segments"], report["problems"]), (3, 2, []))
+
+    def test_edited_and_deleted_votes_are_detected(self):
+        verify(workers=1)
+        first, second = Vote.objects.order_by("pk")[:2]
+        Vote.objects.filter(pk=first.pk).update(candidate=self.candidates[1])
+        Vote.objects.filter(pk=second.pk)._raw_delete(connection.alias)
+        expected = [f"vote {first.pk} modified", f"vote {second.pk} deleted"]
+        report = verify(workers=1)
+        self.assertEqual([problem for _, problem in report["problems"]], expected)
+        self.assertEqual((report["entries"], report["segments"]), (0, 0))  # nothing was rehashed
+        problems = [problem for _, problem in verify(full=True, workers=1)["problems"]]
+        self.assertEqual(problems, expected)
+
+    def test_tampered_entries_are_detected(self):
+        verify(workers=1)
+        LedgerEntry.objects.filter(seq=1).update(candidate_id=self.candidates[1].id)
+        LedgerEntry.objects.filter(seq=3).delete()
+        problems = [problem for _, problem in verify(full=True, workers=1)["problems"]]
+        self.assertIn("hash chain broken", problems)
+        self.assertIn("segment #1-#2 differs from its checkpoint", problems)
+        self.assertIn("entries #3-#3 missing at the end of the ledger", problems)
+
+    def test_votes_inserted_around_the_app_are_reported(self):
+        vote = Vote.objects.create(voter=self.users[4], candidate=self.candidates[0], position=self.position)
+        with self.assertRaises(CommandError):
+            call_command("verify_ledger", "--workers=1", stdout=StringIO())
+        out = StringIO()
+        call_command("verify_ledger", "--workers=1", "--append-missing", stdout=out)
+        self.assertIn("Appended 1 vote(s)", out.getvalue())
+        self.assertEqual(LedgerEntry.objects.get(vote_id=vote.pk).seq, 4)
+
+
+@override_settings(ELIGIBILITY_RECHECK_SECONDS=60)
+class EligibilityTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.positions = [Position.objects.create(description=f"Position {i}") for i in range(2)]
+        cls.candidates = [
+            Candidate.objects.create(firstname=f"Cand{i}", lastname="X", position=p, status="Approved")
+            for i, p in enumerate(cls.positions)
+        ]
+        cls.voter = User.objects.create_user(username="voter", password="pw")
+        Voter.objects.create(user=cls.voter, firstname="V", lastname="1")
+        cls.other = User.objects.create_user(username="other", password="pw")
+
+    def setUp(self):
+        cache.clear()
+        voter_index.warm()
+
+    def test_gating_without_queries(self):
+        with self.assertNumQueries(0):
+            self.assertTrue(is_voter(self.voter))
+            self.assertEqual(voter_index.voted_positions(self.voter.pk, [p.pk for p in self.positions]), set())
+
+        with self.captureOnCommitCallbacks(execute=True):
+            cast_ballot(self.voter, {self.positions[0].pk: [self.candidates[0].pk]})
+        with self.assertNumQueries(1):  # only the confirmation before refusing
+            with self.assertRaises(BallotError):
+                cast_ballot(self.voter, {self.positions[0].pk: [self.candidates[0].pk]})
+
+    def test_stale_bits_are_checked_in_the_database(self):
+        voter_index.add_votes([(self.voter.pk, self.positions[1].pk)])  # e.g. the vote was deleted elsewhere
+        self.assertEqual(voter_index.voted_positions(self.voter.pk, [self.positions[1].pk]), set())
+        with self.assertNumQueries(0):
+            voter_index.voted_positions(self.voter.pk, [self.positions[1].pk])
+
+        Voter.objects.bulk_create([Voter(user=self.other, firstname="O", lastname="2", voterid="VOTER-X")])
+        self.assertTrue(is_voter(self.other))  # no signal for bulk inserts: found by the fallback
+        with self.assertNumQueries(0):
+            self.assertTrue(is_voter(self.other))
+
+    @override_settings(ELIGIBILITY_RECHECK_SECONDS=0)
+    def test_voter_deletion_rebuilds_every_index(self):
+        voter_index.add_voter(self.other.pk)  # a process that has not seen the deletion yet
+        self.assertTrue(is_voter(self.other))
+        Sequence.objects.reserve(GENERATION_SEQUENCE)  # ...until another process bumps the generation
+        self.assertFalse(is_voter(self.other))
+
+        with self.captureOnCommitCallbacks(execute=True):
+            Voter.objects.filter(user=self.voter).delete()
+        self.assertEqual(Sequence.objects.get(name=GENERATION_SEQUENCE).value, 2)
+        self.assertFalse(is_voter(self.voter))
+        self.client.force_login(self.voter)
+        response = self.client.post(reverse("submit_vote"), {f"position_{self.positions[0].pk}": self.candidates[0].pk})
+        self.assertRedirects(response, reverse("voter_dashboard"), fetch_redirect_response=False)
+
+
+class RollupTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.election = Election.objects.create(name="Turnout")
+        cls.positions = [Position.objects.create(election=cls.election, description=f"P{i}") for i in range(2)]
+        cls.candidates = [
+            Candidate.objects.create(firstname=f"C{i}", lastname="X", position=p, status="Approved")
+            for i, p in enumerate(cls.positions)
+        ]
+        cls.admin = User.objects.create_superuser(username="admin", password="pw")
+        cls.users = [User.objects.create_user(username=f"voter{i}", password="pw") for i in range(3)]
+
+    def setUp(self):
+        self.addCleanup(cache.clear)  # the chart request caches this class's election as the current one
+
+    def rows(self, resolution, position_id=VoteRollup.ALL_POSITIONS):
+        return list(
+            VoteRollup.objects.filter(election=self.election, resolution=resolution, position_id=position_id)
+            .order_by("bucket").values_list("votes", "voters")
+        )
+
+    def test_votes_are_counted_as_they_are_stored(self):
+        cast_ballot(self.users[0], {p.pk: [c.pk] for p, c in zip(self.positions, self.candidates)}, self.election)
+        cast_ballot(self.users[1], {self.positions[0].pk: [self.candidates[0].pk]}, self.election)
+        record_vote(self.users[1], self.candidates[1])  # second vote of the same voter
+        minute = VoteRollup.MINUTE
+        self.assertEqual(sum(v for v, _ in self.rows(minute)), 4)
+        self.assertEqual(sum(n for _, n in self.rows(minute)), 2)
+        self.assertEqual(sum(v for v, _ in self.rows(minute, self.positions[1].pk)), 2)
+
+        counted = set(VoteRollup.objects.values_list("position_id", "bucket", "votes", "voters"))
+        rebuild(self.election)
+        self.assertEqual(set(VoteRollup.objects.filter(resolution=minute).values_list(
+            "position_id", "bucket", "votes", "voters")), counted)
+
+    def test_compaction_and_series(self):
+        start = datetime(2026, 5, 1, 8, 0, tzinfo=dt_timezone.utc)
+        VoteRollup.objects.bulk_create([
+            VoteRollup(election=self.election, resolution=VoteRollup.MINUTE, bucket=start + timedelta(minutes=m),
+                       votes=2, voters=1)
+            for m in (0, 7, 61, 125)
+        ])
+        self.assertEqual(compact(now=start + timedelta(hours=2, minutes=30))[:2], (2, 0))
+        self.assertEqual(self.rows(VoteRollup.HOUR), [(4, 2), (2, 1)])
+
+        hourly = series(self.election, VoteRollup.HOUR)
+        self.assertEqual([(b.hour, v, n) for b, v, n in hourly], [(8, 4, 2), (9, 2, 1), (10, 2, 1)])
+        five_minutes = series(self.election, 5 * VoteRollup.MINUTE)
+        self.assertEqual(len(five_minutes), 26)
+        self.assertEqual(sum(v for _, v, _ in five_minutes), 8)
+
+        compact(now=start + timedelta(days=10))
+        self.assertFalse(VoteRollup.objects.filter(resolution=VoteRollup.MINUTE).exists())
+        self.assertEqual([(v, n) for _, v, n in series(self.election, VoteRollup.DAY)], [(8, 4)])
+
+    def test_chart_endpoint_reads_only_rollups(self):
+        cast_ballot(self.users[0], {self.positions[0].pk: [self.candidates[0].pk]}, self.election)
+        cast_ballot(self.users[1], {self.positions[0].pk: [self.candidates[0].pk]}, self.election)
+        self.client.force_login(self.admin)
+        url = reverse("turnout_series")
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url, {"election": self.election.pk, "tier": "minute", "step": 5})
+        self.assertNotIn('"ops_app_vote"', " ".join(q["sql"] for q in queries.captured_queries))
+        data = response.json()
+        self.assertEqual((data["resolution"], sum(data["votes"]), data["turnout"][-1]), (300, 2, 2))
+
+        self.assertEqual(self.client.get(url, {"tier": "week"}).status_code, 400)
+        self.assertEqual(self.client.get(url, {"tier": "minute", "step": 0}).status_code, 400)
+        self.client.force_login(self.users[2])
+        self.assertEqual(self.client.get(url).status_code, 403)
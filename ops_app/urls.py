@@ -1,26 +1,31 @@
 from django.urls import path
 from . import views
+from .ratelimit import rate_limit
 
 urlpatterns = [
     path('', views.home, name='home'), 
-    path('voter_login/', views.voter_login, name='voter_login'),
-    path('admin_login/', views.admin_login, name='admin_login'),
-    path('register/', views.register, name='register'),
+    path('voter_login/', rate_limit(views.voter_login, user="10/m", ip="60/m", total="50/s"), name='voter_login'),
+    path('admin_login/', rate_limit(views.admin_login, user="10/m", ip="60/m", total="50/s"), name='admin_login'),
+    path('register/', rate_limit(views.register, ip="10/m", total="20/s"), name='register'),
     path('logout/', views.user_logout, name='user_logout'),  # updated to match template
     path('dashboard/', views.dashboard, name='dashboard'),  # unified dashboard redirect
     path('admin_dashboard/', views.admin_dashboard, name='admin_dashboard'),
+    path('admin_dashboard/live/', views.live_tallies, name='live_tallies'),
+    path('admin_dashboard/turnout/', views.turnout_series, name='turnout_series'),
+    path('stats/requests/', views.request_stats, name='request_stats'),
     path('voter_dashboard/', views.voter_dashboard, name='voter_dashboard'),
-    path('vote/', views.vote, name='vote'),
+    path('vote/', rate_limit(views.vote, user="10/m", ip="300/m", total="200/s"), name='vote'),
     path('result/', views.result, name='result'),
     path('candidates_admin/',views.candidates_admin,name='candidates_admin'),
     path('positions/',views.positions,name='positions'),
     path('voters/',views.voters,name='voters'),
     path('votes/', views.votes, name='votes'),
+    path('export/<str:dataset>/', views.export_results, name='export_results'),
     path("candidate_apply/", views.candidate_apply, name="candidate_apply"),
     path("admin_ballot_positions/", views.admin_ballot_positions, name="admin_ballot_positions"),
     path("ballot_position/", views.ballot_position, name="ballot_position"),
     path("candidate_platform/<int:candidate_id>/platform/", views.candidate_platform, name="candidate_platform"),
-    path('submit_vote/', views.submit_vote, name='submit_vote'),
+    path('submit_vote/', rate_limit(views.submit_vote, user="10/m", ip="300/m", total="200/s"), name='submit_vote'),
     path("approve_candidate/<int:candidate_id>/", views.approve_candidate, name="approve_candidate"),
     path("delete_candidate/<int:candidate_id>/", views.delete_candidate, name="delete_candidate"),
     path("reject_candidate/<int:candidate_id>/reject/", views.reject_candidate, name="reject_candidate"),
@@ -1,11 +1,37 @@
-from django.shortcuts import render, redirect, get_object_or_404
+import asyncio
+import os
+from itertools import accumulate
+
+from asgiref.sync import sync_to_async
+from django.core.handlers.asgi import ASGIRequest
+from django.http import Http404, HttpResponse, HttpResponseForbidden, JsonResponse, StreamingHttpResponse
+from django.shortcuts import aget_object_or_404, render, redirect, get_object_or_404
 from django.contrib.auth.models import User
 from django.contrib import messages
-from django.contrib.auth import authenticate, login as auth_login, logout as auth_logout
+from django.contrib.auth import aauthenticate, alogin, logout as auth_logout
 from django.contrib.auth.decorators import login_required
-from django.db.models import Prefetch
-from .models import Candidate, Vote, Position, Voter
+from django.db.models import Value
+from django.db.models.functions import Coalesce
+from .models import Candidate, Election, Vote, Position, Voter, VoteRollup
 from .forms import CandidateForm, PositionForm, VoterForm
+from .ballot import (
+    BallotError,
+    aballot_version,
+    ballot_cache_seconds,
+    ballot_is_cached,
+    ballot_positions,
+    cast_ballot,
+    parse_ballot,
+)
+from .elections import aelection_for, afinal_results, election_for
+from .eligibility import is_voter
+from .exports import DATASETS, aiterate, export_stream
+from .hashing import HashQueueFull, amake_password, metrics as hashing_metrics
+from .live import tally_stream
+from .middleware import stats
+from .pagination import keyset_paginate, search
+from .rollups import TIERS, SeriesTooLong, series
+from .tally import aposition_tallies
 
 # ---------------- HOME ----------------
 def home(request):
@@ -13,47 +39,60 @@ def home(request):
 
 
 # ---------------- AUTH ----------------
-def voter_login(request):
+# Password checks and hashing run in ops_app.hashing's process pool; these views
+# are async so a worker is not tied up while a login waits for it.
+BUSY_MESSAGE = "Too many sign-ins right now. Please try again in a moment."
+
+
+async def voter_login(request):
     if request.method == "POST":
         username = request.POST.get("username")
         password = request.POST.get("password")
 
-        user = authenticate(request, username=username, password=password)
+        try:
+            user = await aauthenticate(request, username=username, password=password)
+        except HashQueueFull:
+            messages.error(request, BUSY_MESSAGE)
+            return redirect("voter_login")
 
         if user is not None:
             if user.is_superuser:
                 messages.error(request, "Admins must login from the admin page.")
                 return redirect("admin_login")
             else:
-                auth_login(request, user)
-                request.session.set_expiry(0)  # expires on browser close
+                await alogin(request, user)
+                await request.session.aset_expiry(0)  # expires on browser close
                 return redirect("dashboard")
         else:
             messages.error(request, "Invalid username or password")
             return redirect("voter_login")
 
-    return render(request, "voter_login.html")
+    return await sync_to_async(render)(request, "voter_login.html")
 
 
-def admin_login(request):
+async def admin_login(request):
     if request.method == "POST":
         username = request.POST.get("username")
         password = request.POST.get("password")
 
-        user = authenticate(request, username=username, password=password)
+        try:
+            user = await aauthenticate(request, username=username, password=password)
+        except HashQueueFull:
+            messages.error(request, BUSY_MESSAGE)
+            return redirect("admin_login")
 
         if user is not None and user.is_superuser:
-            auth_login(request, user)
-            request.session.set_expiry(0)
+            await alogin(request, user)
+            await request.session.aset_expiry(0)
             messages.success(request, "Admin login successful!")
             return redirect("dashboard")
         else:
             messages.error(request, "Invalid admin credentials")
 
-    return render(request, "admin_login.html")
+    return await sync_to_async(render)(request, "admin_login.html")
 
 
-def register(request):
+async def register(request):
     if request.method == "POST":
         firstname = request.POST.get("firstname")
         lastname = request.POST.get("lastname")
@@ -63,35 +102,43 @@ def register(request):
         password2 = request.POST.get("password2")
         role = request.POST.get("role")  # voter or admin
 
+        if not username or not password1:
+            messages.error(request, "Username and password are required")
+            return redirect("register")
+
         if password1 != password2:
             messages.error(request, "Passwords do not match")
             return redirect("register")
 
-        if User.objects.filter(username=username).exists():
+        if await User.objects.filter(username=username).aexists():
             messages.error(request, "Username already taken")
             return redirect("register")
 
-        if User.objects.filter(email=email).exists():
+        if await User.objects.filter(email=email).aexists():
             messages.error(request, "Email already registered")
             return redirect("register")
 
-        user = User.objects.create_user(
-            username=username,
-            password=password1,
-            email=email,
+        try:
+            password = await amake_password(password1)
+        except HashQueueFull:
+            messages.error(request, BUSY_MESSAGE)
+            return redirect("register")
+
+        user = User(
+            username=User.normalize_username(username),
+            password=password,
+            email=User.objects.normalize_email(email),
             first_name=firstname,
-            last_name=lastname
+            last_name=lastname,
+            is_staff=role == "admin",
+            is_superuser=role == "admin",
         )
-
-        if role == "admin":
-            user.is_staff = True
-            user.is_superuser = True
-            user.save()
+        await user.asave()
 
         messages.success(request, f"Registration successful! Account created for {username}! Please log in.")
         return redirect("voter_login")
 
-    return render(request, "register.html")
+    return await sync_to_async(render)(request, "register.html")
 
 
 @login_required
@@ -116,47 +163,101 @@ def dashboard(request):
 
 
 @login_required
-def admin_dashboard(request):
-    if not request.user.is_superuser:
+async def admin_dashboard(request):
+    user = await request.auser()
+    if not user.is_superuser:
         return redirect("voter_dashboard")
 
-    total_positions = Position.objects.count()
-    total_candidates = Candidate.objects.count()
-    total_voters = User.objects.filter(is_superuser=False).count()
-    voters_voted = Vote.objects.values("voter").distinct().count()
-
-    def get_votes_for_position(position_name):
-        candidates = Candidate.objects.filter(position__description=position_name)
-        labels = [f"{c.firstname} {c.lastname}" for c in candidates]
-        data = [Vote.objects.filter(candidate=c).count() for c in candidates]
-        return {"labels": labels, "data": data}
-
-    president_data = get_votes_for_position("President")
-    vp_data = get_votes_for_position("Vice President")
-    secretary_data = get_votes_for_position("Secretary")
-    treasurer_data = get_votes_for_position("Treasurer")
+    election = await aelection_for(request)
+    final = await afinal_results(election)
+    if final is not None:
+        tallies, total_voters, voters_voted = final["tallies"], final["total_voters"], final["voters_voted"]
+    else:
+        tallies, total_voters, voters_voted = await asyncio.gather(
+            aposition_tallies(election),
+            User.objects.filter(is_superuser=False).acount(),
+            Vote.objects.filter(election=election).values("voter").distinct().acount(),
+        )
+    total_candidates = sum(len(t["candidates"]) for t in tallies)
 
     context = {
-        "total_positions": total_positions,
+        "election": election,
+        "final": final is not None,
+        "total_positions": len(tallies),
         "total_candidates": total_candidates,
         "total_voters": total_voters,
         "voters_voted": voters_voted,
-        "president_data": president_data,
-        "vp_data": vp_data,
-        "secretary_data": secretary_data,
-        "treasurer_data": treasurer_data,
+        "tallies": tallies,
     }
 
-    return render(request, "admin_dashboard.html", context)
+    return await sync_to_async(render)(request, "admin_dashboard.html", context)
+
+
+async def live_tallies(request):
+    """Server-Sent Events feed of tally changes for the admin dashboard (ASGI only)."""
+    user = await request.auser()
+    if not user.is_superuser:
+        return HttpResponseForbidden()
+    if not isinstance(request, ASGIRequest):
+        # A WSGI worker would be pinned by the endless stream; 204 tells
+        # EventSource not to reconnect, and the dashboard stays static.
+        return HttpResponse(status=204)
+
+    return StreamingHttpResponse(
+        tally_stream(await aelection_for(request)),
+        content_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
 
 
 @login_required
-def voter_dashboard(request):
+def turnout_series(request):
+    """Chart data for the dashboard: votes and first-time voters per bucket, read from the rollups only.
+
+    ``?tier=minute|hour|day`` and ``?step=N`` pick the bucket size (e.g.
+    minute and 5), ``?position=<id>`` one position instead of all.
+    """
+    if not request.user.is_superuser:
+        return HttpResponseForbidden()
+    election = election_for(request)
     try:
-        voter = Voter.objects.get(user=request.user)
+        tier = request.GET.get("tier", "hour")
+        resolution = TIERS[tier] * int(request.GET.get("step", "1"))
+        position_id = int(request.GET.get("position", VoteRollup.ALL_POSITIONS))
+        if resolution <= 0:
+            raise ValueError
+        rows = series(election, resolution, position_id) if election else []
+    except (KeyError, ValueError) as e:
+        message = str(e) if isinstance(e, SeriesTooLong) else "Invalid tier, step or position."
+        return JsonResponse({"error": message}, status=400)
+
+    return JsonResponse({
+        "election": election.pk if election else None,
+        "resolution": resolution,
+        "position": position_id,
+        "buckets": [bucket.isoformat() for bucket, _, _ in rows],
+        "votes": [votes for _, votes, _ in rows],
+        "voters": [voters for _, _, voters in rows],
+        "turnout": list(accumulate(voters for _, _, voters in rows)),
+    })
+
+
+@login_required
+def request_stats(request):
+    """Per-URL query/timing histograms plus password hashing queue metrics (staff only)."""
+    if not request.user.is_staff:
+        return HttpResponseForbidden()
+    return JsonResponse({
+        "pid": os.getpid(),
+        "views": stats.snapshot(),
+        "password_hashing": hashing_metrics.snapshot(),
+    })
+
+
+@login_required
+def voter_dashboard(request):
+    if request.voter:
         return redirect('ballot_position')
-    except Voter.DoesNotExist:
-        voter = None
 
     if request.method == "POST":
         form = VoterForm(request.POST, request.FILES)
@@ -168,7 +269,7 @@ def voter_dashboard(request):
     else:
         form = VoterForm()
 
-    return render(request, 'voter_dashboard.html', {'form': form, 'voter_exists': voter is not None})
+    return render(request, 'voter_dashboard.html', {'form': form, 'voter_exists': False})
 
 
 # ---------------- VOTING ----------------
@@ -178,58 +279,114 @@ def vote(request):
         messages.error(request, "Admins cannot vote.")
         return redirect("admin_dashboard")
 
+    election = election_for(request)
     if request.method == "POST":
         candidate_id = request.POST.get("candidate")
 
         try:
-            candidate = Candidate.objects.get(id=candidate_id)
-        except Candidate.DoesNotExist:
+            candidate = Candidate.objects.get(id=candidate_id, election=election)
+        except (Candidate.DoesNotExist, ValueError):
             messages.error(request, "Invalid candidate selection.")
             return redirect("vote")
 
-        if Vote.objects.filter(voter=request.user).exists():
-            messages.error(request, "You have already voted!")
+        try:
+            cast_ballot(request.user, {candidate.position_id: [candidate.id]}, election)
+        except BallotError as e:
+            messages.error(request, str(e))
             return redirect("vote")
 
-        Vote.objects.create(voter=request.user, candidate=candidate)
-        candidate.vote_count += 1
-        candidate.save()
-
         messages.success(request, "Your vote has been submitted successfully!")
         return redirect("result")
 
-    candidates = Candidate.objects.all()
-    return render(request, "vote.html", {"candidates": candidates})
+    candidates = Candidate.objects.filter(election=election, status="Approved").select_related("position")
+    return render(request, "vote.html", {"candidates": candidates, "election": election})
 
 
 @login_required
-def result(request):
-    candidates = Candidate.objects.all().order_by("-vote_count")
-    return render(request, "result.html", {"candidates": candidates})
+async def result(request):
+    election = await aelection_for(request)
+    final = await afinal_results(election)
+    if final is not None:
+        candidates = final["candidates"]
+    else:
+        candidates = (
+            Candidate.objects.filter(election=election)
+            .select_related("position")
+            .annotate(vote_count=Coalesce("vote_counter__votes", Value(0)))
+            .order_by("-vote_count", "id")
+        )
+        candidates = [candidate async for candidate in candidates]
+    return await sync_to_async(render)(request, "result.html", {"candidates": candidates, "election": election})
 
 
 # ---------------- DATA VIEWS ----------------
 def candidates(request):
-    data = Candidate.objects.all()
-    return render(request, "candidates.html", {"candidates": data})
+    election = election_for(request)
+    data = search(
+        _filter_candidates(Candidate.objects.filter(election=election).select_related("position"), request.GET),
+        request.GET.get("q"),
+        ["firstname", "lastname", "email"],
+    )
+    return render(request, "candidates.html", {"candidates": keyset_paginate(data, request.GET)})
 
 
-def positions(request):
-    data = Position.objects.all()
-    return render(request, "positions.html", {"positions": data})
+async def positions(request):
+    election = await aelection_for(request)
+    data = [position async for position in Position.objects.filter(election=election)]
+    return await sync_to_async(render)(request, "positions.html", {"positions": data, "election": election})
 
 
 def voters(request):
-    data = Voter.objects.all()
-    return render(request, "voters.html", {"voters": data})
+    data = search(Voter.objects.all(), request.GET.get("q"), ["firstname", "lastname", "voterid"])
+    return render(request, "voters.html", {"voters": keyset_paginate(data, request.GET)})
 
 
 def votes(request):
-    votes = Vote.objects.select_related("position", "candidate", "voter").order_by("position__description")
-    return render(request, "votes.html", {"votes": votes})
+    election = election_for(request)
+    votes = Vote.objects.filter(election=election).select_related("position", "candidate", "voter")
+    if request.GET.get("position", "").isdigit():
+        votes = votes.filter(position_id=request.GET["position"])
+    votes = search(votes, request.GET.get("q"), ["candidate__firstname", "candidate__lastname", "voter__username"])
+    return render(request, "votes.html", {
+        "votes": keyset_paginate(votes, request.GET),
+        "positions": Position.objects.filter(election=election).order_by("description"),
+        "election": election,
+    })
+
+
+def _filter_candidates(queryset, params):
+    """Apply the ``position`` and ``status`` filters of the candidate listings."""
+    if params.get("position", "").isdigit():
+        queryset = queryset.filter(position_id=params["position"])
+    if params.get("status") in dict(Candidate.STATUS_CHOICES):
+        queryset = queryset.filter(status=params["status"])
+    return queryset
+
+@login_required
+def export_results(request, dataset):
+    """Stream votes, tallies or turnout as CSV/NDJSON, optionally gzipped."""
+    if not request.user.is_superuser:
+        return redirect("voter_dashboard")
+    if dataset not in DATASETS:
+        raise Http404("Unknown export")
+
+    fmt = "ndjson" if request.GET.get("format") == "ndjson" else "csv"
+    gzip = request.GET.get("gzip") == "1"
+    filename = f"{dataset}.{fmt}" + (".gz" if gzip else "")
+    content_type = "application/gzip" if gzip else ("text/csv" if fmt == "csv" else "application/x-ndjson")
+
+    chunks = export_stream(dataset, election_for(request), fmt, gzip)
+    if isinstance(request, ASGIRequest):
+        chunks = aiterate(chunks)  # a sync iterator would be read whole before the first byte goes out
+    return StreamingHttpResponse(
+        chunks,
+        content_type=content_type,
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'},
+    )
 
 # ---------------- CANDIDATE APPLY ----------------
 def candidate_apply(request):
+    election = election_for(request)
     if request.method == "POST":
         firstname = request.POST.get("firstname")
         lastname = request.POST.get("lastname")
@@ -240,8 +397,8 @@ def candidate_apply(request):
 
 
         try:
-            position = Position.objects.get(id=position_id)
-        except Position.DoesNotExist:
+            position = Position.objects.get(id=position_id, election=election)
+        except (Position.DoesNotExist, ValueError):
             messages.error(request, "Please select a valid position.")
             return redirect("candidate_apply")
 
@@ -257,42 +414,54 @@ def candidate_apply(request):
         messages.success(request, "Application submitted successfully!")
         return redirect("home")
 
-    positions = Position.objects.all()
-    return render(request, "candidate_apply.html", {"positions": positions})
+    positions = Position.objects.filter(election=election)
+    return render(request, "candidate_apply.html", {"positions": positions, "election": election})
 
 
 # ---------------- BALLOT ----------------
-def ballot_position(request):
-    positions = Position.objects.prefetch_related(
-        Prefetch(
-            'candidate_set',
-            queryset=Candidate.objects.filter(status="Approved"),
-            to_attr="candidates"
-        )
-    )
-    return render(request, "ballot_position.html", {"positions": positions})
+async def ballot_position(request):
+    version, election = await asyncio.gather(aballot_version(), aelection_for(request))
+    if await ballot_is_cached(version, election):
+        positions = ballot_positions(election)  # never evaluated: the fragment is served from the cache
+    else:
+        positions = [position async for position in ballot_positions(election)]
+    return await sync_to_async(render)(request, "ballot_position.html", {
+        "positions": positions,
+        "election": election,
+        "ballot_election_id": election.pk if election else None,
+        "ballot_version": version,
+        "ballot_cache_seconds": ballot_cache_seconds(),
+    })
 
 
-def candidate_platform(request, candidate_id):
-    candidate = get_object_or_404(Candidate, id=candidate_id)
-    return render(request, "candidate_platform.html", {"candidate": candidate})
+async def candidate_platform(request, candidate_id):
+    candidate = await aget_object_or_404(Candidate, id=candidate_id)
+    return await sync_to_async(render)(request, "candidate_platform.html", {"candidate": candidate})
 
 
+@login_required
 def submit_vote(request):
-    if request.method == "POST":
-        candidate_id = request.POST.get("candidate")
-        # ✅ Your logic to save the vote here
+    if request.user.is_superuser:
+        messages.error(request, "Admins cannot vote.")
+        return redirect("admin_dashboard")
 
-        # Redirect to success page with context
-        return render(request, "vote_success.html", {
-            "message": "Ballot Submitted",
-            "redirect_url": "/",  # Change to your home page URL
-            "redirect_seconds": 30
-        })
+    if request.method != "POST":
+        return redirect("ballot_position")
 
-    # Show vote form if GET
-    candidates = Candidate.objects.all()
-    return render(request, "vote_form.html", {"candidates": candidates})
+    if not is_voter(request.user):
+        return redirect("voter_dashboard")
+
+    try:
+        cast_ballot(request.user, parse_ballot(request.POST), election_for(request))
+    except BallotError as e:
+        messages.error(request, str(e))
+        return redirect("ballot_position")
+
+    return render(request, "vote_success.html", {
+        "message": "Ballot Submitted",
+        "redirect_url": "/",
+        "redirect_seconds": 30
+    })
 
 def vote_success(request):
     return render(request, "vote_success.html")
@@ -307,8 +476,18 @@ def candidates_admin(request):
     if not request.user.is_superuser:
         return redirect("voter_dashboard")
 
-    candidates = Candidate.objects.all()
-    return render(request, "candidates_admin.html", {"candidates": candidates})
+    election = election_for(request)
+    candidates = search(
+        _filter_candidates(Candidate.objects.filter(election=election).select_related("position"), request.GET),
+        request.GET.get("q"),
+        ["firstname", "lastname", "email"],
+    )
+    return render(request, "candidates_admin.html", {
+        "election": election,
+        "candidates": keyset_paginate(candidates, request.GET),
+        "positions": Position.objects.filter(election=election).order_by("description"),
+        "statuses": [status for status, _ in Candidate.STATUS_CHOICES],
+    })
 
 
 @login_required
@@ -361,8 +540,9 @@ def reject_candidate(request, candidate_id):
 
 
 def admin_ballot_positions(request):
-    positions = Position.objects.all()
-    return render(request, "admin_ballot_positions.html", {"positions": positions})
+    election = election_for(request)
+    positions = Position.objects.filter(election=election)
+    return render(request, "admin_ballot_positions.html", {"positions": positions, "election": election})
 def candidate_detail(request, candidate_id):
     if not request.user.is_superuser:
         return redirect("voter_dashboard")
@@ -371,14 +551,17 @@ def candidate_detail(request, candidate_id):
 
     return render(request, "candidate_detail.html", {"candidate": candidate})
 def add_position(request):
+    election = election_for(request)
+    if election is None or election.status != Election.OPEN:
+        return render(request, "add_position.html", {"form": None, "election": election})
     if request.method == "POST":
-        form = PositionForm(request.POST)
+        form = PositionForm(request.POST, election=election)
         if form.is_valid():
             form.save()
             return redirect("positions")
     else:
-        form = PositionForm()
-    return render(request, "add_position.html", {"form": form})
+        form = PositionForm(election=election)
+    return render(request, "add_position.html", {"form": form, "election": election})
 
 def edit_position(request, pk):
     pos = get_object_or_404(Position, pk=pk)
@@ -3,6 +3,12 @@ ASGI config for project1 project.
 
 It exposes the ASGI callable as a module-level variable named ``application``.
 
+Serve it with an ASGI server (e.g. ``uvicorn project1.asgi:application``, or
+plain ``gunicorn`` with the default profile in gunicorn.conf.py) so the async
+read views do not tie up a worker per request and the admin dashboard's live
+tally stream (``live_tallies``) works; under WSGI that endpoint answers 204
+and the dashboard falls back to static charts.
+
 For more information on this file, see
 https://docs.djangoproject.com/en/5.2/howto/deployment/asgi/
 """
@@ -10,6 +10,7 @@ For the full list of settings and their values, see
 https://docs.djangoproject.com/en/5.2/ref/settings/
 """
 
+import os
 from pathlib import Path
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
@@ -42,10 +43,13 @@ INSTALLED_APPS = [
 
 MIDDLEWARE = [
     'django.middleware.security.SecurityMiddleware',
+    'whitenoise.middleware.WhiteNoiseMiddleware',
+    'ops_app.middleware.QueryStatsMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'ops_app.middleware.VoterProfileMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
@@ -72,13 +76,92 @@ WSGI_APPLICATION = 'project1.wsgi.application'
 
 # Database
 # https://docs.djangoproject.com/en/5.2/ref/settings/#databases
+#
+# DB_ENGINE picks the profile: "sqlite" (default) or "postgres".
+
+DB_ENGINE = os.environ.get("DB_ENGINE", "sqlite")
+
+if DB_ENGINE == "postgres":
+    DATABASES = {
+        'default': {
+            'ENGINE': 'django.db.backends.postgresql',
+            'NAME': os.environ.get("DB_NAME", "ovs"),
+            'USER': os.environ.get("DB_USER", ""),
+            'PASSWORD': os.environ.get("DB_PASSWORD", ""),
+            'HOST': os.environ.get("DB_HOST", ""),
+            'PORT': os.environ.get("DB_PORT", ""),
+            'CONN_MAX_AGE': int(os.environ.get("DB_CONN_MAX_AGE", "600")),
+            'CONN_HEALTH_CHECKS': True,
+            'OPTIONS': {},
+        }
+    }
+    if os.environ.get("DB_POOL") == "1":
+        # psycopg's pool replaces persistent connections; Django refuses both at once.
+        DATABASES['default']['CONN_MAX_AGE'] = 0
+        DATABASES['default']['OPTIONS']['pool'] = {
+            'min_size': int(os.environ.get("DB_POOL_MIN", "2")),
+            'max_size': int(os.environ.get("DB_POOL_MAX", "10")),
+            'timeout': int(os.environ.get("DB_POOL_TIMEOUT", "10")),
+        }
+else:
+    SQLITE_BUSY_TIMEOUT_MS = int(os.environ.get("SQLITE_BUSY_TIMEOUT_MS", "20000"))
+    DATABASES = {
+        'default': {
+            'ENGINE': 'django.db.backends.sqlite3',
+            'NAME': os.environ.get("DB_NAME", BASE_DIR / 'db.sqlite3'),
+            'OPTIONS': {
+                'timeout': SQLITE_BUSY_TIMEOUT_MS / 1000,
+                # Take the write lock when a transaction starts so concurrent writers
+                # wait on busy_timeout instead of failing a lock upgrade mid-transaction.
+                'transaction_mode': 'IMMEDIATE',
+                'init_command': (
+                    "PRAGMA journal_mode=WAL;"
+                    f"PRAGMA busy_timeout={SQLITE_BUSY_TIMEOUT_MS};"
+                    "PRAGMA synchronous=NORMAL;"
+                    f"PRAGMA mmap_size={int(os.environ.get('SQLITE_MMAP_SIZE', 134217728))};"
+                ),
+            },
+            # WAL needs a real file, so tests run against one rather than :memory:.
+            'TEST': {
+                'NAME': BASE_DIR / 'test_db.sqlite3',
+            },
+        }
+    }
+
+
+# Cache
+# https://docs.djangoproject.com/en/5.2/topics/cache/
+#
+# CACHE_BACKEND picks the backend: "locmem" (default, per process), "file"
+# (shared by every worker on one host) or "redis" (CACHE_URL, shared across hosts).
+
+CACHE_BACKEND = os.environ.get("CACHE_BACKEND", "locmem")
 
-DATABASES = {
-    'default': {
-        'ENGINE': 'django.db.backends.sqlite3',
-        'NAME': BASE_DIR / 'db.sqlite3',
+if CACHE_BACKEND == "redis":
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': os.environ.get("CACHE_URL", "redis://127.0.0.1:6379/1"),
+        }
+    }
+elif CACHE_BACKEND == "file":
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+            'LOCATION': os.environ.get("CACHE_DIR", BASE_DIR / '.cache'),
+        }
+    }
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        }
     }
-}
+
+# The rendered ballot is cached until a Position, Candidate or Election change
+# bumps its version. Under locmem the bump only reaches the worker that made
+# it, so each worker keeps its copy just BALLOT_CACHE_SECONDS.
+BALLOT_CACHE_SECONDS = int(os.environ.get("BALLOT_CACHE_SECONDS", "5" if CACHE_BACKEND == "locmem" else "86400"))
 
 
 # Password validation
@@ -100,6 +183,34 @@ AUTH_PASSWORD_VALIDATORS = [
 ]
 
 
+# Password hashing (ops_app.hashing)
+#
+# PASSWORD_HASH_PROFILE picks the preferred hasher: "pbkdf2" (default), "scrypt"
+# or "argon2" (needs argon2-cffi). PASSWORD_HASH_COST overrides its cost
+# (PBKDF2 iterations, log2 of the scrypt work factor, Argon2 passes); calibrate
+# it with `manage.py calibrate_password_hasher`. Hashes made with any other
+# listed hasher or cost are upgraded on the next login. Hashing runs in
+# PASSWORD_HASH_WORKERS processes (0 = inline) with at most
+# PASSWORD_HASH_QUEUE_LIMIT jobs in flight per web process.
+
+PASSWORD_HASH_PROFILE = os.environ.get("PASSWORD_HASH_PROFILE", "pbkdf2")
+PASSWORD_HASH_COST = int(os.environ["PASSWORD_HASH_COST"]) if os.environ.get("PASSWORD_HASH_COST") else None
+_PREFERRED_HASHERS = {
+    "pbkdf2": "ops_app.hashing.CalibratedPBKDF2PasswordHasher",
+    "scrypt": "ops_app.hashing.CalibratedScryptPasswordHasher",
+    "argon2": "ops_app.hashing.CalibratedArgon2PasswordHasher",
+}
+PASSWORD_HASHERS = [_PREFERRED_HASHERS[PASSWORD_HASH_PROFILE]] + [
+    'django.contrib.auth.hashers.PBKDF2PasswordHasher',
+    'django.contrib.auth.hashers.PBKDF2SHA1PasswordHasher',
+    'django.contrib.auth.hashers.ScryptPasswordHasher',
+    'django.contrib.auth.hashers.Argon2PasswordHasher',
+    'django.contrib.auth.hashers.BCryptSHA256PasswordHasher',
+]
+PASSWORD_HASH_WORKERS = int(os.environ.get("PASSWORD_HASH_WORKERS", os.cpu_count() or 1))
+PASSWORD_HASH_QUEUE_LIMIT = int(os.environ.get("PASSWORD_HASH_QUEUE_LIMIT", "64"))
+
+
 # Internationalization
 # https://docs.djangoproject.com/en/5.2/topics/i18n/
 
@@ -113,6 +224,119 @@ USE_TZ = True
 
 SESSION_EXPIRE_AT_BROWSER_CLOSE = True
 
+# Sessions and auth lookups
+#
+# SESSION_BACKEND: "cached_db" (default; reads hit the cache, writes go through
+# to the DB), "signed_cookies" (no server-side storage at all) or "db".
+# User and Voter rows of logged-in users are cached for AUTH_CACHE_SECONDS.
+
+SESSION_ENGINE = {
+    "db": "django.contrib.sessions.backends.db",
+    "cached_db": "django.contrib.sessions.backends.cached_db",
+    "signed_cookies": "django.contrib.sessions.backends.signed_cookies",
+}[os.environ.get("SESSION_BACKEND", "cached_db")]
+AUTHENTICATION_BACKENDS = ["ops_app.auth.CachedModelBackend"]
+AUTH_CACHE_SECONDS = int(os.environ.get("AUTH_CACHE_SECONDS", "60"))
+
+# Ballot gating (ops_app.eligibility)
+#
+# Each process keeps bit arrays of registered voters and of who voted for
+# which position. It re-reads the generation number in the database (bumped
+# when a Voter is deleted) at most every ELIGIBILITY_RECHECK_SECONDS.
+
+ELIGIBILITY_RECHECK_SECONDS = float(os.environ.get("ELIGIBILITY_RECHECK_SECONDS", "1"))
+
+# Rate limiting and admission control (ops_app.ratelimit)
+#
+# The rates per endpoint live next to the routes in ops_app/urls.py.
+# RATE_LIMIT_BACKEND: "local" (buckets per process) or "cache" (buckets in the
+# default cache, shared by all workers when CACHE_BACKEND=redis). Behind a
+# proxy set RATE_LIMIT_TRUST_FORWARDED_FOR=1 so clients are told apart by
+# X-Forwarded-For. Each process admits ADMISSION_MAX_INFLIGHT limited requests
+# at a time, queues up to ADMISSION_MAX_QUEUE more for ADMISSION_QUEUE_TIMEOUT
+# seconds and answers 429 to the rest. The test runner turns it off.
+
+RATE_LIMIT_ENABLED = os.environ.get("RATE_LIMIT_ENABLED", "1") == "1"
+RATE_LIMIT_BACKEND = os.environ.get("RATE_LIMIT_BACKEND", "local")
+RATE_LIMIT_TRUST_FORWARDED_FOR = os.environ.get("RATE_LIMIT_TRUST_FORWARDED_FOR", "0") == "1"
+ADMISSION_MAX_INFLIGHT = int(os.environ.get("ADMISSION_MAX_INFLIGHT", "32"))
+ADMISSION_MAX_QUEUE = int(os.environ.get("ADMISSION_MAX_QUEUE", "128"))
+ADMISSION_QUEUE_TIMEOUT = float(os.environ.get("ADMISSION_QUEUE_TIMEOUT", "2"))
+
+
+
+# Vote ingestion
+#
+# "sync" (default) writes Vote rows inside the request. "journal" appends each
+# accepted ballot to VOTE_JOURNAL_PATH (fsync-batched every
+# VOTE_JOURNAL_BATCH_MS) and leaves the inserts to `manage.py drain_vote_journal`.
+
+VOTE_INGEST_MODE = os.environ.get("VOTE_INGEST_MODE", "sync")
+VOTE_JOURNAL_PATH = os.environ.get("VOTE_JOURNAL_PATH", BASE_DIR / 'vote_journal.log')
+VOTE_JOURNAL_BATCH_MS = int(os.environ.get("VOTE_JOURNAL_BATCH_MS", "5"))
+
+
+# Live tallies (ops_app.live)
+#
+# Each worker pushes the counts of the votes it stores to its own SSE streams;
+# every stream also gets a fresh snapshot every LIVE_RESYNC_SECONDS, which
+# brings in the votes stored by other workers.
+
+LIVE_RESYNC_SECONDS = float(os.environ.get("LIVE_RESYNC_SECONDS", "5"))
+
+# Elections (ops_app.elections)
+#
+# Views show the newest open election unless ?election=<id> picks another;
+# each process caches which one that is for ELECTION_CACHE_SECONDS.
+# `manage.py close_election <id>` stops voting (in journal mode after waiting
+# ELECTION_CLOSE_GRACE_SECONDS for ballots already in flight), and freezes the
+# results in a checksummed snapshot (DB row + JSON file in
+# ELECTION_ARCHIVE_DIR) that every results view then serves.
+# `manage.py archive_election <id>` moves a closed election's rows into a
+# checksummed, gzipped file in the same folder.
+
+ELECTION_ARCHIVE_DIR = os.environ.get("ELECTION_ARCHIVE_DIR", BASE_DIR / 'archives')
+ELECTION_CACHE_SECONDS = int(os.environ.get("ELECTION_CACHE_SECONDS", "5"))
+ELECTION_CLOSE_GRACE_SECONDS = float(os.environ.get("ELECTION_CLOSE_GRACE_SECONDS", "2"))
+
+
+# Vote ledger (ops_app.ledger)
+#
+# Every stored vote is also appended to a hash-chained ledger.
+# `manage.py verify_ledger` rehashes the entries added since the last
+# checkpoint in segments of LEDGER_SEGMENT_SIZE, one process per core, and
+# checkpoints each segment that passes with its Merkle root; --full re-checks
+# the checkpointed segments too.
+
+LEDGER_SEGMENT_SIZE = int(os.environ.get("LEDGER_SEGMENT_SIZE", "10000"))
+
+
+# Turnout charts (ops_app.rollups)
+#
+# Votes are counted per minute as they are stored. `manage.py
+# compact_vote_rollups --follow` folds them into hourly and daily rows and
+# drops minute rows older than VOTE_ROLLUP_MINUTE_RETENTION_DAYS.
+
+VOTE_ROLLUP_MINUTE_RETENTION_DAYS = int(os.environ.get("VOTE_ROLLUP_MINUTE_RETENTION_DAYS", "7"))
+
+
+# Request instrumentation (ops_app.middleware.QueryStatsMiddleware)
+#
+# Requests running more than REQUEST_STATS_QUERY_THRESHOLD queries log their SQL.
+
+REQUEST_STATS_WINDOW = int(os.environ.get("REQUEST_STATS_WINDOW", "1000"))
+REQUEST_STATS_QUERY_THRESHOLD = int(os.environ.get("REQUEST_STATS_QUERY_THRESHOLD", "30"))
+REQUEST_STATS_PUBLISH_SECONDS = int(os.environ.get("REQUEST_STATS_PUBLISH_SECONDS", "30"))
+
+
+# Photo thumbnails (ops_app.images)
+#
+# Square thumbnails of every uploaded photo are written next to it by a pool of
+# THUMBNAIL_WORKERS threads (0 = inline). THUMBNAIL_FORMAT is WEBP or JPEG.
+
+THUMBNAIL_SIZES = (128, 256)
+THUMBNAIL_FORMAT = os.environ.get("THUMBNAIL_FORMAT", "WEBP")
+THUMBNAIL_WORKERS = int(os.environ.get("THUMBNAIL_WORKERS", "2"))
 
 
 # Static files (CSS, JavaScript, Images)
@@ -133,10 +357,30 @@ DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 LOGIN_URL = 'voter_login'         # where Django sends users if not logged in
 LOGIN_REDIRECT_URL = 'voter_dashboard'  # where to go after successful login
 LOGOUT_REDIRECT_URL = 'voter_login'     # fallback after logout
-import os
-
 STATIC_URL = '/static/'  # URL prefix for static files
 STATIC_ROOT = os.path.join(BASE_DIR, 'staticfiles')  # Folder for collectstatic
+
+# collectstatic fingerprints every file and writes .gz/.br siblings; WhiteNoise
+# serves the hashed names with "Cache-Control: immutable". Tests run without
+# collectstatic; project1.test_runner swaps in the plain storage for them.
+STORAGES = {
+    "default": {"BACKEND": "django.core.files.storage.FileSystemStorage"},
+    "staticfiles": {"BACKEND": "whitenoise.storage.CompressedManifestStaticFilesStorage"},
+}
+TEST_RUNNER = "project1.test_runner.TestRunner"
+WHITENOISE_MAX_AGE = 24 * 60 * 60  # unhashed paths only
+
+# Bootstrap and Chart.js belong in ops_app/static/vendor (manage.py
+# fetch_vendor_assets). While any still comes from the CDN, "check --deploy"
+# fails in production and only warns with DEBUG on.
+VENDOR_ASSETS_REQUIRED = os.environ.get("VENDOR_ASSETS_REQUIRED", "0" if DEBUG else "1") == "1"
+
+# Uploaded photos live in candidates/ and voter_images/ at the project root and
+# are served by ops_app.media.serve_media (ETag, Range, immutable hashed names).
+MEDIA_ROOT = BASE_DIR
+MEDIA_URL = '/media/'
+MEDIA_SERVE_DIRS = ('candidates/', 'voter_images/')
+MEDIA_MAX_AGE = 24 * 60 * 60
 BASE_DIR = Path(__file__).resolve().parent.parent
 
 
@@ -0,0 +1,29 @@
+from django.conf import settings
+from django.test.runner import DiscoverRunner
+from django.test.utils import override_settings
+
+
+class TestRunner(DiscoverRunner):
+    """``DiscoverRunner`` with the settings the suite needs.
+
+    Tests run without collectstatic, so static files use the plain storage and
+    are served from the app folders. Every test client shares one address, so
+    rate limits are off; the rate limit tests switch them back on.
+    """
+
+    def setup_test_environment(self, **kwargs):
+        super().setup_test_environment(**kwargs)
+        self.test_settings = override_settings(
+            RATE_LIMIT_ENABLED=False,
+            STATIC_ROOT=None,
+            WHITENOISE_USE_FINDERS=True,
+            STORAGES={
+                **settings.STORAGES,
+                "staticfiles": {"BACKEND": "django.contrib.staticfiles.storage.StaticFilesStorage"},
+            },
+        )
+        self.test_settings.enable()
+
+    def teardown_test_environment(self, **kwargs):
+        self.test_settings.disable()
+        super().teardown_test_environment(**kwargs)
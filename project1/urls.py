@@ -17,12 +17,12 @@ Including another URLconf
 from django.contrib import admin
 from django.urls import path,include
 from django.conf import settings
-from django.conf.urls.static import static
+
+from ops_app.media import serve_media
 
 urlpatterns = [
     path('admin/', admin.site.urls),
  
+    path(settings.MEDIA_URL.lstrip('/') + '<path:path>', serve_media, name='media'),
     path('', include('ops_app.urls')),
 ]
-if settings.DEBUG:
-    urlpatterns += static(settings.MEDIA_URL, document_root=settings.MEDIA_ROOT)
\ No newline at end of file